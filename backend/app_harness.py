@@ -0,0 +1,54 @@
+"""
+The API app over an in-memory SQLite database, for tests that go through
+its endpoints. Import this before anything that imports database or main.
+
+Startup is not run: no MySQL, no ingestion workers. Everything main writes
+to disk goes to a scratch directory, and request sessions run on threads.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+scratch = tempfile.mkdtemp()
+os.environ.setdefault("DB_ASYNC_ENABLED", "false")
+os.environ["CHROMA_PERSIST_DIR"] = os.path.join(scratch, "chroma")
+os.environ["UPLOAD_DIR"] = os.path.join(scratch, "uploads")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(scratch, "embeddings.sqlite3")
+os.environ["LEXICAL_INDEX_PATH"] = os.path.join(scratch, "bm25.sqlite3")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import database
+import models
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+database.SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+import auth
+import main
+
+client = TestClient(main.app)
+
+def reset_database():
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    auth.user_cache = type(auth.user_cache)()
+
+def session():
+    return database.SessionLocal(expire_on_commit=False)
+
+def add_user(email: str, is_admin: bool = False, **columns):
+    with session() as db:
+        user = models.User(email=email, name=email.split("@")[0], hashed_password="x",
+                           is_admin=int(is_admin), **columns)
+        db.add(user)
+        db.commit()
+        return user
+
+def headers_for(user):
+    return {"Authorization": f"Bearer {auth.create_access_token(data={'sub': user.email})}"}
@@ -5,12 +5,23 @@ from passlib.context import CryptContext
 from config import settings
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 import models
-from database import get_db
+from database import get_db, AsyncSession
+from services.password_hasher import PasswordHasher
+from services.user_cache import UserCache
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST_KIB,
+    argon2__parallelism=settings.ARGON2_PARALLELISM
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+# Request handlers hash through this pool; the sync helpers below are for scripts and startup
+password_hasher = PasswordHasher(pwd_context)
+user_cache = UserCache()
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -28,7 +39,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -42,9 +53,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+
+    user = await db.scalar(select(models.User).where(models.User.email == email))
     if user is None:
         raise credentials_exception
+    # Detached so a commit in this request cannot expire the copy other requests share
+    db.expunge(user)
+    user_cache.put(email, user)
     return user
 
 async def get_current_admin(current_user: models.User = Depends(get_current_user)):
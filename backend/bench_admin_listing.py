@@ -0,0 +1,110 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+import models
+
+PAGE_SIZE = 50
+
+def seed(engine, documents: int, users: int):
+    models.Base.metadata.create_all(engine, tables=[models.User.__table__, models.Document.__table__])
+    started = datetime(2023, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"email": f"user{i}@example.com", "name": f"User {i}", "hashed_password": "$argon2id$" + "x" * 80}
+            for i in range(users)
+        ])
+        conn.execute(insert(models.Document), [
+            {"user_id": 1 + i % users, "filename": f"report-{i}.pdf", "file_path": f"./uploaded_files/{i:064x}.pdf",
+             "content_hash": f"{i:064x}", "chunk_set_id": f"{i:064x}", "page_count": 40, "chunk_count": 300,
+             "status": models.DocumentStatus.FAILED if i % 50 == 0 else models.DocumentStatus.READY,
+             "created_at": started + timedelta(minutes=i)}
+            for i in range(documents)
+        ])
+    # Measured without the new indexes first, as existing tables were
+    models.document_status_index.drop(bind=engine)
+    models.document_created_index.drop(bind=engine)
+
+def list_all(db):
+    """
+    The listing before: every document and its owner as ORM objects.
+    """
+    docs = db.execute(
+        select(models.Document, models.User.name.label("owner_name"), models.User.email.label("owner_email"))
+        .join(models.User, models.Document.user_id == models.User.id)
+    ).all()
+    return [{"id": doc.id, "filename": doc.filename, "status": doc.status, "created_at": doc.created_at,
+             "owner": {"name": owner_name, "email": owner_email}} for doc, owner_name, owner_email in docs]
+
+def list_page(db, conditions, before=None):
+    """
+    The listing after: projected columns, a keyset page and, on the first
+    page, a count.
+    """
+    query = select(
+        models.Document.id, models.Document.filename, models.Document.status, models.Document.created_at,
+        models.User.name.label("owner_name"), models.User.email.label("owner_email")
+    ).join(models.User, models.Document.user_id == models.User.id).where(*conditions)
+    if before is not None:
+        query = query.where(models.Document.id < before)
+    rows = db.execute(query.order_by(models.Document.id.desc()).limit(PAGE_SIZE + 1)).all()
+    page = [{"id": row.id, "filename": row.filename, "status": row.status.value, "created_at": row.created_at,
+             "owner": {"name": row.owner_name, "email": row.owner_email}} for row in rows[:PAGE_SIZE]]
+    total = None
+    if before is None:
+        total = db.scalar(select(func.count()).select_from(models.Document).where(*conditions))
+    return {"documents": page, "total": total}
+
+def measure(session_factory, listing):
+    db = session_factory()
+    tracemalloc.start()
+    started = time.perf_counter()
+    body = json.dumps(jsonable_encoder(listing(db)))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.close()
+    return elapsed_ms, peak / 2**20, len(body) / 2**20
+
+def bench_admin_listing(documents: int = 200_000, users: int = 2_000):
+    path = os.path.join(tempfile.mkdtemp(), "admin.sqlite3")
+    engine = create_engine(f"sqlite:///{path}")
+    seed(engine, documents, users)
+    SessionLocal = sessionmaker(bind=engine)
+    middle = documents // 2
+    week = (datetime(2023, 1, 1) + timedelta(minutes=middle), datetime(2023, 1, 1) + timedelta(minutes=middle, days=7))
+
+    print(f"{documents} documents, {users} owners, page size {PAGE_SIZE}")
+    print(f"{'listing':>26} {'indexes':>8} {'ms':>9} {'peak MB':>8} {'response MB':>12}")
+    elapsed_ms, peak_mb, size_mb = measure(SessionLocal, list_all)
+    print(f"{'everything (before)':>26} {'no':>8} {elapsed_ms:>9.0f} {peak_mb:>8.1f} {size_mb:>12.2f}")
+    cases = [
+        ("first page + total", lambda db: list_page(db, [])),
+        ("page at 50%", lambda db: list_page(db, [], before=middle)),
+        ("failed, first page + total", lambda db: list_page(db, [models.Document.status == models.DocumentStatus.FAILED])),
+        ("one owner + total", lambda db: list_page(db, [models.Document.user_id == 7])),
+        ("one week + total", lambda db: list_page(db, [models.Document.created_at >= week[0],
+                                                       models.Document.created_at < week[1]])),
+    ]
+    for indexed in (False, True):
+        if indexed:
+            models.document_status_index.create(bind=engine)
+            models.document_created_index.create(bind=engine)
+            with engine.connect() as conn:
+                conn.execute(text("ANALYZE"))
+        for label, listing in cases:
+            elapsed_ms, peak_mb, size_mb = measure(SessionLocal, listing)
+            print(f"{label:>26} {'yes' if indexed else 'no':>8} {elapsed_ms:>9.1f} {peak_mb:>8.2f} {size_mb:>12.3f}")
+
+if __name__ == "__main__":
+    bench_admin_listing()
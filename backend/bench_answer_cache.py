@@ -0,0 +1,105 @@
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench_answer_cache_"))
+
+from services.answer_cache import SemanticAnswerCache
+from services.embedding_service import EmbeddingService
+from services.rag_engine import RAGEngine
+
+LLM_LATENCY = 0.4
+DIMENSIONS = 384
+
+TOPICS = [
+    "leave policy", "travel reimbursement", "remote work rules", "health insurance plan",
+    "performance review cycle", "notice period", "expense approval limit", "parental leave",
+    "holiday calendar", "laptop refresh policy", "relocation support", "overtime compensation",
+]
+TEMPLATES = [
+    "what is the {topic}?",
+    "What is the {topic}",
+    "what's the {topic}?",
+    "can you explain the {topic}",
+    "summarise the {topic} for me",
+]
+
+class BagOfWordsModel:
+    """
+    Stands in for the sentence-transformer: hashed bag of words. It only
+    matches near-verbatim rephrasings, so a real model will hit more often.
+    """
+
+    def encode(self, texts, batch_size, convert_to_numpy):
+        vectors = np.zeros((len(texts), DIMENSIONS))
+        for row, text in enumerate(texts):
+            for word in re.findall(r"[a-z']+", text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % DIMENSIONS] += 1
+        return vectors
+
+class ScriptedAsyncGroq:
+    """Answers after LLM_LATENCY with the topic the question is about."""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, model):
+        self.calls += 1
+        await asyncio.sleep(LLM_LATENCY)
+        question = messages[-1]["content"].rsplit("Question: ", 1)[-1]
+        topic = next(topic for topic in TOPICS if topic in question)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"About {topic}"))])
+
+def workload(requests: int, scopes: int, seed: int = 0):
+    """
+    (scope, topic, question) triples; topics follow a Zipf-like popularity
+    curve, as a handful of questions dominate real traffic.
+    """
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, len(TOPICS) + 1)
+    weights /= weights.sum()
+    for _ in range(requests):
+        topic = TOPICS[rng.choice(len(TOPICS), p=weights)]
+        question = TEMPLATES[rng.integers(len(TEMPLATES))].format(topic=topic)
+        yield f"scope-{rng.integers(scopes)}", topic, question
+
+async def run(engine, requests: int, scopes: int):
+    engine.async_groq_client = ScriptedAsyncGroq()
+    wrong = 0
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for chunk_set, topic, question in workload(requests, scopes):
+        result = await engine.aquery(question, scope={"pdf_documents": [chunk_set]})
+        wrong += topic not in result["answer"]
+    return loop.time() - started, engine.async_groq_client.calls, wrong
+
+def bench_answer_cache(requests: int = 300, scopes: int = 3, thresholds=(0.8, 0.9, 0.95)):
+    embedding_service = EmbeddingService(device="cpu")
+    embedding_service._load_model = BagOfWordsModel
+    engine = RAGEngine(embedding_service)
+    for scope in range(scopes):
+        engine.add_document("policies.pdf", [
+            {"page_number": page + 1, "text": f"The {topic} is described on this page."}
+            for page, topic in enumerate(TOPICS)
+        ], chunk_set=f"scope-{scope}")
+
+    print(f"{requests} questions over {scopes} scopes, {len(TOPICS)} topics x {len(TEMPLATES)} phrasings, "
+          f"simulated LLM {LLM_LATENCY * 1000:.0f} ms")
+    print(f"{'threshold':>10} {'hit rate':>9} {'LLM calls':>10} {'wrong':>6} {'mean s':>7} {'saved LLM s':>12}")
+    for threshold in (None,) + tuple(thresholds):
+        engine.answer_cache = SemanticAnswerCache(threshold=threshold) if threshold else None
+        elapsed, calls, wrong = asyncio.run(run(engine, requests, scopes))
+        stats = engine.answer_cache.stats() if engine.answer_cache else {"hit_rate": 0.0, "saved_llm_ms": 0.0}
+        print(f"{threshold or 'off':>10} {stats['hit_rate']:>9.1%} {calls:>10} {wrong:>6} "
+              f"{elapsed / requests:>7.3f} {stats['saved_llm_ms'] / 1000:>12.1f}")
+
+if __name__ == "__main__":
+    bench_answer_cache()
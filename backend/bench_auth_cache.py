@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import auth
+import models
+from database import AsyncSession, ThreadedSession, get_db
+from services.user_cache import UserCache
+
+# Round trip to a MySQL server on the same network; SQLite itself answers in microseconds
+DB_ROUND_TRIP_MS = 1.0
+
+def build_app():
+    """
+    An app with the status-poll route's shape: authenticate, then one
+    documents query. The database adds DB_ROUND_TRIP_MS per statement.
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def round_trip(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(DB_ROUND_TRIP_MS / 1000)
+
+    models.Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    db = SessionLocal()
+    users = [models.User(email=f"user{i}@example.com", name=f"User {i}", hashed_password="x") for i in range(50)]
+    db.add_all(users)
+    db.commit()
+    db.add_all([models.Document(user_id=user.id, filename="report.pdf", status=models.DocumentStatus.PROCESSING)
+                for user in users])
+    db.commit()
+    tokens = [(auth.create_access_token({"sub": user.email}), user.id) for user in users]
+    db.close()
+
+    async def session():
+        async with ThreadedSession(SessionLocal(expire_on_commit=False)) as db:
+            yield db
+
+    app = FastAPI()
+    app.dependency_overrides[get_db] = session
+
+    @app.get("/api/documents/{document_id}/status")
+    async def status(document_id: int, db: AsyncSession = Depends(get_db),
+                     current_user: models.User = Depends(auth.get_current_user)):
+        doc = await db.scalar(select(models.Document).where(
+            models.Document.id == document_id,
+            models.Document.user_id == current_user.id
+        ))
+        return {"status": doc.status.value}
+
+    return app, tokens
+
+async def poll(app, tokens, pollers: int, seconds: float):
+    """
+    Each poller is one browser tab polling its document's status back to back.
+    """
+    transport = httpx.ASGITransport(app=app)
+    deadline = time.perf_counter() + seconds
+    counts = [0] * pollers
+
+    async def tab(index):
+        token, document_id = tokens[index % len(tokens)]
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            while time.perf_counter() < deadline:
+                response = await client.get(f"/api/documents/{document_id}/status", headers=headers)
+                assert response.status_code == 200, response.text
+                counts[index] += 1
+
+    await asyncio.gather(*(tab(i) for i in range(pollers)))
+    return sum(counts)
+
+def bench_auth_cache(pollers: int = 100, seconds: float = 5.0):
+    app, tokens = build_app()
+    print(f"{pollers} tabs polling status for {seconds:.0f}s, {len(tokens)} users, "
+          f"{DB_ROUND_TRIP_MS} ms per database round trip")
+    print(f"{'user cache':>11} {'polls/s':>9} {'hit rate':>9} {'speedup':>8}")
+    baseline = None
+    for ttl in (0, 30):
+        auth.user_cache = UserCache(ttl_seconds=ttl)
+        polls = asyncio.run(poll(app, tokens, pollers, seconds))
+        rate = polls / seconds
+        baseline = baseline or rate
+        label = f"{ttl}s TTL" if ttl else "off"
+        print(f"{label:>11} {rate:>9.0f} {auth.user_cache.stats()['hit_rate']:>9.1%} {rate / baseline:>7.2f}x")
+
+if __name__ == "__main__":
+    bench_auth_cache()
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench_batch_upload_"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from bench_chunking import BagOfWordsModel
+from bench_pdf_extract import make_synthetic_pdf
+from services import ingestion
+from services.embedding_service import EmbeddingService
+from services.pdf_processor import PDFProcessor
+from services.rag_engine import RAGEngine
+
+# Roughly all-MiniLM-L6-v2 on a laptop CPU: a fixed cost per forward pass plus a cost per text
+ENCODE_MS_PER_CALL = 15.0
+ENCODE_MS_PER_TEXT = 2.0
+
+class TimedModel(BagOfWordsModel):
+    """Bag of words that takes as long as the real model would."""
+
+    def encode(self, texts, batch_size, convert_to_numpy):
+        time.sleep((ENCODE_MS_PER_CALL + len(texts) * ENCODE_MS_PER_TEXT) / 1000)
+        return super().encode(texts, batch_size, convert_to_numpy)
+
+def make_folder(num_files: int, seed: int = 0):
+    """
+    Writes num_files distinct PDFs of 1-20 pages, like a folder of mixed
+    reports, and returns their paths.
+    """
+    rng = np.random.default_rng(seed)
+    folder = tempfile.mkdtemp(prefix="bench_batch_upload_pdfs_")
+    paths = []
+    for index in range(num_files):
+        path = os.path.join(folder, f"report{index}.pdf")
+        with open(path, "wb") as f:
+            f.write(make_synthetic_pdf(int(rng.integers(1, 21)), words_per_page=150, label=f"doc{index}p"))
+        paths.append(path)
+    return paths
+
+async def ingest_folder(paths: list, rag_engine, concurrent_documents: int):
+    """
+    Queues one document per path, as /api/documents/upload-batch does, and
+    returns (seconds until all are READY, documents READY).
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(engine)
+    ingestion.SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+    queue = ingestion.IngestionQueue(PDFProcessor(), rag_engine, max_depth=len(paths),
+                                     concurrent_documents=concurrent_documents)
+    await queue.start()
+    try:
+        db = ingestion.SessionLocal()
+        run = f"run{concurrent_documents}"
+        for path in paths:
+            content_hash = f"{run}:{os.path.basename(path)}"
+            db.add(models.Document(user_id=1, filename=os.path.basename(path), file_path=path,
+                                   content_hash=content_hash, chunk_set_id=content_hash,
+                                   status=models.DocumentStatus.PROCESSING))
+        db.commit()
+
+        started = time.perf_counter()
+        for (document_id,) in db.query(models.Document.id).all():
+            queue.enqueue(document_id)
+        await queue._queue.join()
+        elapsed = time.perf_counter() - started
+
+        ready = db.query(models.Document).filter(models.Document.status == models.DocumentStatus.READY).count()
+        db.close()
+        return elapsed, ready
+    finally:
+        await queue.stop()
+
+def bench_batch_upload(num_files: int = 200, concurrency=(1, 2, 4, 8)):
+    paths = make_folder(num_files)
+    embedding_service = EmbeddingService(device="cpu")
+    try:
+        import sentence_transformers  # noqa: F401
+        model = embedding_service.model_name
+    except ImportError:
+        embedding_service._load_model = TimedModel
+        model = f"simulated, {ENCODE_MS_PER_CALL} ms per batch + {ENCODE_MS_PER_TEXT} ms per chunk"
+    rag_engine = RAGEngine(embedding_service)
+
+    print(f"{num_files} PDFs, embeddings: {model}")
+    print(f"{'documents at once':>18} {'seconds':>8} {'docs/min':>9} {'mean batch':>11} {'speedup':>8}")
+    baseline = None
+    for concurrent_documents in concurrency:
+        embedding_service.batch_sizes = type(embedding_service.batch_sizes)()
+        elapsed, ready = asyncio.run(ingest_folder(paths, rag_engine, concurrent_documents))
+        assert ready == num_files, f"only {ready} of {num_files} documents indexed"
+        baseline = baseline or elapsed
+        print(f"{concurrent_documents:>18} {elapsed:>8.1f} {num_files / elapsed * 60:>9.0f} "
+              f"{embedding_service.batch_sizes.snapshot()['mean']:>11.1f} {baseline / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    bench_batch_upload()
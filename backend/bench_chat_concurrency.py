@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench_chat_"))
+
+import httpx
+from fastapi import FastAPI
+
+from services.embedding_service import EmbeddingService
+from services.rag_engine import RAGEngine
+
+LLM_LATENCY = 0.5
+DIMENSIONS = 384
+
+class HashModel:
+    """Stands in for the sentence-transformer: deterministic vectors, no weights."""
+
+    def encode(self, texts, batch_size, convert_to_numpy):
+        return np.array([np.random.default_rng(abs(hash(text)) % 2 ** 32).normal(size=DIMENSIONS) for text in texts])
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+class SlowGroq:
+    """Groq stand-in answering after LLM_LATENCY, blocking like the sync client."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, model):
+        time.sleep(LLM_LATENCY)
+        return completion("answer")
+
+class SlowAsyncGroq(SlowGroq):
+    async def create(self, messages, model):
+        await asyncio.sleep(LLM_LATENCY)
+        return completion("answer")
+
+def build_engine():
+    embedding_service = EmbeddingService(device="cpu")
+    embedding_service._load_model = HashModel
+    engine = RAGEngine(embedding_service)
+    engine.groq_client = SlowGroq()
+    engine.async_groq_client = SlowAsyncGroq()
+    chunks = [{"page_number": i // 5 + 1, "text": f"policy section {i} covers leave and travel"} for i in range(2000)]
+    engine.add_document("bench.pdf", chunks, chunk_set="bench-set")
+    return engine
+
+def build_app(engine):
+    app = FastAPI()
+    scope = {"pdf_documents": ["bench-set"]}
+
+    @app.post("/blocking")
+    async def blocking():
+        # The original handler: a synchronous query inside an async endpoint
+        return engine.query("what is the leave policy?", scope=scope)
+
+    @app.post("/async")
+    async def non_blocking():
+        return await engine.aquery("what is the leave policy?", scope=scope)
+
+    return app
+
+async def load(app, path: str, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        async def one():
+            async with semaphore:
+                response = await client.post(path)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    # Per-request latency is not reported: a blocked event loop also stalls the
+    # in-process client's clock, which would make the blocking handler look fast
+    return requests / elapsed
+
+def bench_chat(requests: int = 100, concurrency_levels=(1, 10, 50)):
+    engine = build_engine()
+    app = build_app(engine)
+    print(f"One worker, simulated LLM latency {LLM_LATENCY * 1000:.0f} ms, {requests} requests per run")
+    print(f"{'handler':>9} {'concurrency':>12} {'req/s':>8}")
+    for concurrency in concurrency_levels:
+        for label, path in (("blocking", "/blocking"), ("async", "/async")):
+            throughput = asyncio.run(load(app, path, requests, concurrency))
+            print(f"{label:>9} {concurrency:>12} {throughput:>8.2f}")
+
+if __name__ == "__main__":
+    bench_chat()
@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select, text, tuple_
+from sqlalchemy.orm import sessionmaker
+
+import models
+from services.metrics import RollingStats
+
+PAGE_SIZE = 50
+RECENT = 30
+
+def seed(engine, messages: int, other_conversations: int):
+    """
+    One long conversation interleaved with many short ones, as in a shared
+    messages table.
+    """
+    models.Base.metadata.create_all(engine, tables=[models.Message.__table__])
+    started = datetime(2024, 1, 1)
+    rows = []
+    for i in range(messages):
+        created_at = started + timedelta(seconds=i)
+        rows.append({"conversation_id": 1, "role": models.Role.USER if i % 2 == 0 else models.Role.ASSISTANT,
+                     "content": f"Message {i}: " + "lorem ipsum dolor sit amet " * 8, "created_at": created_at})
+        if i % 2 == 0:
+            rows.append({"conversation_id": 2 + i % other_conversations, "role": models.Role.USER,
+                         "content": "short question", "created_at": created_at})
+    with engine.begin() as conn:
+        conn.execute(insert(models.Message), rows)
+    # Measured without the index first, as existing tables were
+    models.message_history_index.drop(bind=engine)
+
+def timed(session_factory, build, repeat: int):
+    """
+    Runs a query and serializes its rows as the endpoint would; returns
+    (latency stats in ms, response bytes).
+    """
+    latency_ms = RollingStats()
+    size = 0
+    for _ in range(repeat):
+        db = session_factory()
+        started = time.perf_counter()
+        rows = db.scalars(build()).all()
+        size = len(json.dumps(jsonable_encoder(rows)))
+        latency_ms.observe((time.perf_counter() - started) * 1000)
+        db.close()
+    return latency_ms.snapshot(), size
+
+def history_page(before=None):
+    query = select(models.Message).where(models.Message.conversation_id == 1)
+    if before:
+        created_at, message_id = before
+        query = query.where(tuple_(models.Message.created_at, models.Message.id) < (created_at, message_id))
+    return query.order_by(models.Message.created_at.desc(), models.Message.id.desc()).limit(PAGE_SIZE + 1)
+
+def bench_chat_history(messages: int = 100_000, other_conversations: int = 500, repeat: int = 5):
+    path = os.path.join(tempfile.mkdtemp(), "history.sqlite3")
+    engine = create_engine(f"sqlite:///{path}")
+    seed(engine, messages, other_conversations)
+    SessionLocal = sessionmaker(bind=engine)
+    with SessionLocal() as db:
+        middle = db.execute(select(models.Message.created_at, models.Message.id).where(
+            models.Message.conversation_id == 1).order_by(models.Message.id).offset(messages // 2).limit(1)).one()
+
+    cases = [
+        ("full history (before)", lambda: select(models.Message).where(
+            models.Message.conversation_id == 1).order_by(models.Message.created_at.asc())),
+        (f"last {RECENT} for chat", lambda: select(models.Message).where(
+            models.Message.conversation_id == 1).order_by(
+            models.Message.created_at.desc(), models.Message.id.desc()).limit(RECENT)),
+        ("newest page", lambda: history_page()),
+        ("page at 50%", lambda: history_page(tuple(middle))),
+    ]
+    print(f"{messages} messages in one conversation, with and without "
+          f"idx_messages_conversation_created, page size {PAGE_SIZE}")
+    print(f"{'query':>22} {'index':>6} {'p50 ms':>9} {'max ms':>9} {'response KB':>12}")
+    for indexed in (False, True):
+        if indexed:
+            models.message_history_index.create(bind=engine)
+            with engine.connect() as conn:
+                conn.execute(text("ANALYZE"))
+        for label, build in cases:
+            stats, size = timed(SessionLocal, build, repeat)
+            print(f"{label:>22} {'yes' if indexed else 'no':>6} {stats['p50']:>9.1f} {stats['max']:>9.1f} "
+                  f"{size / 1024:>12.1f}")
+
+if __name__ == "__main__":
+    bench_chat_history()
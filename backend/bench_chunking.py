@@ -0,0 +1,107 @@
+import os
+import re
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench_chunking_"))
+
+from services.chunking import create_chunker
+from services.embedding_service import EmbeddingService
+from services.lexical_index import LexicalIndex
+from services.rag_engine import RAGEngine
+
+DIMENSIONS = 384
+FILLER = [
+    "The committee reviewed the quarterly figures and agreed to revisit the forecast next month.",
+    "Several teams reported delays caused by supplier changes during the reporting period.",
+    "Staff are reminded to keep records up to date in the shared document system.",
+    "The board noted that the overall budget remains within the approved limits.",
+    "Training sessions will continue to be offered to new members of the department.",
+    "Any questions about this section should be raised with the responsible manager.",
+]
+SYLLABLES = ["ka", "lo", "mi", "ren", "tu", "vos", "zel", "qua", "dri", "nem"]
+
+class BagOfWordsModel:
+    """Stands in for the sentence-transformer when it is not installed: hashed bag of words."""
+
+    def encode(self, texts, batch_size, convert_to_numpy):
+        vectors = np.zeros((len(texts), DIMENSIONS))
+        for row, text in enumerate(texts):
+            for word in re.findall(r"[a-z0-9']+", text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % DIMENSIONS] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+def make_corpus(num_pages: int, facts_per_page: int = 3, seed: int = 0):
+    """
+    Returns (page_texts, facts) for a synthetic report. Each fact is one
+    sentence naming a project and its code; pages break between words at a
+    fixed length, so some facts continue onto the next page as in real PDFs.
+    """
+    rng = np.random.default_rng(seed)
+    facts, sentences, names = [], [], set()
+    while len(facts) < num_pages * facts_per_page:
+        name = "".join(rng.choice(SYLLABLES, 4))
+        if name in names:
+            continue
+        names.add(name)
+        code = f"{rng.integers(1000, 9999)}"
+        facts.append((name, code))
+        paragraph = [FILLER[i] for i in rng.choice(len(FILLER), 3, replace=False)]
+        paragraph.insert(rng.integers(4), f"The approval code for project {name} is {code}.")
+        sentences.append(" ".join(paragraph))
+    text = "\n\n".join(sentences)
+    page_length = len(text) // num_pages + 1
+    pages, start = [], 0
+    while start < len(text):
+        end = text.find(" ", start + page_length)
+        end = len(text) if end == -1 else end + 1
+        pages.append(text[start:end])
+        start = end
+    return pages, facts
+
+def bench_chunking(num_pages: int = 100, n_results: int = 3,
+                   strategies=(("fixed", 500, 50), ("sentence", 500, 50), ("token", 128, 16))):
+    pages, facts = make_corpus(num_pages)
+    embedding_service = EmbeddingService(device="cpu")
+    try:
+        import sentence_transformers  # noqa: F401
+        model = embedding_service.model_name
+    except ImportError:
+        # Hit rates from the stand-in only compare strategies with each other
+        embedding_service._load_model = BagOfWordsModel
+        model = "hashed bag of words"
+    # Hybrid retrieval, as served by default
+    engine = RAGEngine(embedding_service, lexical_index=LexicalIndex(
+        os.path.join(os.environ["CHROMA_PERSIST_DIR"], "bm25.sqlite3")
+    ))
+
+    print(f"{num_pages} pages, {len(facts)} facts, top {n_results} chunks per question, embeddings: {model}")
+    print(f"{'strategy':>10} {'size':>5} {'chunks':>7} {'split facts':>12} {'chunk ms':>9} {'ingest s':>9} {'hit rate':>9}")
+    for strategy, chunk_size, chunk_overlap in strategies:
+        started = time.perf_counter()
+        chunker = create_chunker(strategy, chunk_size, chunk_overlap)
+        chunks = chunker.feed(pages[:num_pages // 2], 0) + chunker.feed(pages[num_pages // 2:], num_pages // 2)
+        chunks += chunker.finish()
+        chunk_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        engine.add_document("report.pdf", chunks, chunk_set=strategy)
+        ingest_s = time.perf_counter() - started
+
+        texts = [chunk["text"] for chunk in chunks]
+        split = sum(not any(f"project {name} is {code}" in text for text in texts) for name, code in facts)
+        hits = 0
+        for name, code in facts:
+            results = engine.retrieve(f"What is the approval code for project {name}?", n_results,
+                                      scope={"pdf_documents": [strategy]})
+            hits += any(name in text and code in text for text in results["documents"])
+        print(f"{strategy:>10} {chunk_size:>5} {len(chunks):>7} {split:>12} {chunk_ms:>9.1f} "
+              f"{ingest_s:>9.2f} {hits / len(facts):>9.1%}")
+
+if __name__ == "__main__":
+    bench_chunking()
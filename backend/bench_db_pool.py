@@ -0,0 +1,130 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import PoolStats, ThreadedSession, TimedQueuePool
+from services.metrics import RollingStats
+
+# Round trip to a MySQL server on the same network; SQLite itself answers in microseconds
+DB_ROUND_TRIP_MS = 2.0
+# Short, so a run that exhausts the pool fails requests instead of stalling for long
+POOL_TIMEOUT_SECONDS = 2
+
+def build_app(path: str, threaded: bool, pool_size: int, max_overflow: int):
+    """
+    A route with the document status poll's queries: the user, then their
+    document. Either a sync session blocking the event loop, as get_db and
+    the handlers were before, or ThreadedSession, the data layer's fallback
+    when no async driver is installed.
+    """
+    engine = create_engine(f"sqlite:///{path}", poolclass=TimedQueuePool, pool_size=pool_size,
+                           max_overflow=max_overflow, pool_timeout=POOL_TIMEOUT_SECONDS, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def round_trip(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(DB_ROUND_TRIP_MS / 1000)
+
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    app = FastAPI()
+
+    if threaded:
+        async def session():
+            async with ThreadedSession(SessionLocal()) as db:
+                yield db
+
+        @app.get("/status/{user_id}")
+        async def status(user_id: int, db=Depends(session)):
+            user = await db.get(models.User, user_id)
+            doc = await db.scalar(select(models.Document).where(models.Document.user_id == user.id))
+            return {"status": doc.status.value}
+    else:
+        def session():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        @app.get("/status/{user_id}")
+        async def status(user_id: int, db=Depends(session)):
+            user = db.get(models.User, user_id)
+            doc = db.scalar(select(models.Document).where(models.Document.user_id == user.id))
+            return {"status": doc.status.value}
+
+    return app, engine
+
+def seed(path: str, users: int):
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    rows = [models.User(email=f"user{i}@example.com", name=f"User {i}", hashed_password="x") for i in range(users)]
+    db.add_all(rows)
+    db.commit()
+    db.add_all([models.Document(user_id=user.id, filename="report.pdf", status=models.DocumentStatus.READY)
+                for user in rows])
+    db.commit()
+    db.close()
+    engine.dispose()
+
+async def load(app, clients: int, users: int, seconds: float):
+    """
+    clients poll back to back; returns (requests served, requests failed,
+    latency ms, event loop lag ms).
+    """
+    latency_ms, lag_ms = RollingStats(), RollingStats()
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    deadline = time.perf_counter() + seconds
+    served = failed = 0
+
+    async def client(index):
+        nonlocal served, failed
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await http.get(f"/status/{index % users + 1}")
+                if response.status_code != 200:
+                    failed += 1
+                    continue
+                latency_ms.observe((time.perf_counter() - started) * 1000)
+                served += 1
+
+    async def ticker():
+        while True:
+            tick = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag_ms.observe((time.perf_counter() - tick - 0.01) * 1000)
+
+    ticks = asyncio.create_task(ticker())
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    ticks.cancel()
+    return served, failed, latency_ms.snapshot(), lag_ms.snapshot()
+
+def bench_db_pool(clients: int = 100, users: int = 50, seconds: float = 5.0):
+    path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    seed(path, users)
+    print(f"{clients} clients for {seconds:.0f}s, 2 queries per request, {DB_ROUND_TRIP_MS} ms per database round trip")
+    print(f"{'session':>9} {'pool':>6} {'req/s':>7} {'p95 ms':>8} {'loop lag p95 ms':>16} "
+          f"{'checkout wait p95 ms':>21} {'failed':>7}")
+    for threaded, pool_size, max_overflow in ((False, 5, 10), (True, 5, 10), (True, 10, 20)):
+        TimedQueuePool.stats = ThreadedSession.stats = PoolStats()
+        ThreadedSession.max_sessions = pool_size + max_overflow
+        app, engine = build_app(path, threaded, pool_size, max_overflow)
+        served, failed, latency_ms, lag_ms = asyncio.run(load(app, clients, users, seconds))
+        engine.dispose()
+        stats = ThreadedSession.stats if threaded else TimedQueuePool.stats
+        print(f"{'threaded' if threaded else 'blocking':>9} {f'{pool_size}+{max_overflow}':>6} {served / seconds:>7.0f} "
+              f"{latency_ms['p95']:>8.1f} {lag_ms['p95']:>16.1f} {stats.checkout_wait_ms.snapshot()['p95']:>21.2f} "
+              f"{failed:>7}")
+
+if __name__ == "__main__":
+    bench_db_pool()
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+import auth
+from services.metrics import RollingStats
+from services.password_hasher import PasswordHasher, PasswordHashingBusy
+
+PASSWORD = "correct horse battery staple"
+
+def build_app(hashed_password: str):
+    """
+    Two login routes over the same user: one verifying on the event loop,
+    as before, and one through the hashing pool.
+    """
+    app = FastAPI()
+
+    @app.post("/login/inline")
+    async def login_inline():
+        if not auth.verify_password(PASSWORD, hashed_password):
+            return JSONResponse(status_code=401, content={"message": "Invalid credentials"})
+        return {"ok": True}
+
+    @app.post("/login/pooled")
+    async def login_pooled():
+        try:
+            verified, _ = await auth.password_hasher.verify_and_update(PASSWORD, hashed_password)
+        except PasswordHashingBusy:
+            return JSONResponse(status_code=503, content={"message": "Busy"})
+        if not verified:
+            return JSONResponse(status_code=401, content={"message": "Invalid credentials"})
+        return {"ok": True}
+
+    return app
+
+async def burst(app, route: str, logins: int):
+    """
+    Sends logins sign-ins at once. Returns (time to each successful login,
+    event loop lag, 503 responses); the lag is how late a 10 ms timer fires,
+    which is what every other request on the worker waits for.
+    """
+    login_ms, lag_ms = RollingStats(), RollingStats()
+    rejected = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def login():
+            nonlocal rejected
+            response = await client.post(route)
+            if response.status_code == 503:
+                rejected += 1
+                return
+            assert response.status_code == 200, response.text
+            login_ms.observe((time.perf_counter() - started) * 1000)
+
+        async def ticker():
+            while True:
+                tick = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lag_ms.observe((time.perf_counter() - tick - 0.01) * 1000)
+
+        ticks = asyncio.create_task(ticker())
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        # Let a timer held up by the burst fire and record its lag
+        await asyncio.sleep(0.02)
+        ticks.cancel()
+    return login_ms.snapshot(), lag_ms.snapshot(), rejected
+
+def bench_login_burst(logins: int = 20, max_pending: int = 16):
+    hashed_password = auth.get_password_hash(PASSWORD)
+    app = build_app(hashed_password)
+    auth.password_hasher = PasswordHasher(auth.pwd_context, max_pending=max_pending)
+
+    print(f"{logins} simultaneous logins, {hashed_password.split('$')[3]}, "
+          f"{auth.password_hasher.workers} hashing threads, queue limit {max_pending}")
+    print(f"{'login':>7} {'login p50 ms':>13} {'login p95 ms':>13} {'loop lag p95 ms':>16} {'lag max ms':>11} {'503s':>5}")
+    for route in ("/login/inline", "/login/pooled"):
+        login_ms, lag_ms, rejected = asyncio.run(burst(app, route, logins))
+        print(f"{route.rsplit('/', 1)[1]:>7} {login_ms['p50']:>13.0f} {login_ms['p95']:>13.0f} "
+              f"{lag_ms['p95']:>16.1f} {lag_ms['max']:>11.1f} {rejected:>5}")
+
+if __name__ == "__main__":
+    bench_login_burst()
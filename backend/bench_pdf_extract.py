@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.pdf_processor import PDFProcessor
+
+def make_synthetic_pdf(num_pages: int, words_per_page: int = 300, label: str = "page"):
+    """
+    Builds an uncompressed PDF with a Helvetica text layer on every page;
+    label prefixes every word, so PDFs with different labels differ.
+    """
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    page_ids = []
+    for page in range(num_pages):
+        page_id, content_id = 4 + page * 2, 5 + page * 2
+        page_ids.append(page_id)
+
+        words = " ".join(f"{label}{page}word{i}" for i in range(words_per_page))
+        lines = [
+            f"BT /F1 9 Tf 20 {780 - row * 11} Td ({words[start:start + 110]}) Tj ET"
+            for row, start in enumerate(range(0, len(words), 110))
+        ]
+        stream = "\n".join(lines).encode()
+
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode()
+        objects[content_id] = f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[2] = f"<< /Type /Pages /Kids [{kids}] /Count {num_pages} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += f"{obj_id} 0 obj\n".encode() + objects[obj_id] + b"\nendobj\n"
+
+    xref_offset = len(out)
+    size = max(objects) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode()
+    for obj_id in range(1, size):
+        out += f"{offsets[obj_id]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(out)
+
+def bench_extract(num_pages: int = 500, worker_counts=(1, 2, 4, 8)):
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(make_synthetic_pdf(num_pages))
+        pdf_path = f.name
+
+    print(f"Synthetic PDF: {num_pages} pages, {os.path.getsize(pdf_path) / 1024:.0f} KiB")
+    print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+    try:
+        baseline = None
+        for workers in worker_counts:
+            processor = PDFProcessor(extract_workers=workers, parallel_min_pages=1)
+            # Warm pool so process start-up is not counted against extraction
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                list(pool.map(abs, range(workers)))
+                start = time.perf_counter()
+                pages = processor.extract_pages(pdf_path, executor=pool if workers > 1 else None)
+                elapsed = time.perf_counter() - start
+
+            assert len(pages) == num_pages
+            assert pages[-1].startswith(f"page{num_pages - 1}word0")
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {num_pages / elapsed:>9.1f} {baseline / elapsed:>7.2f}x")
+    finally:
+        os.remove(pdf_path)
+
+if __name__ == "__main__":
+    bench_extract()
@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench_reindex_"))
+
+from bench_chunking import BagOfWordsModel, make_corpus
+from services.chunking import create_chunker
+from services.embedding_service import EmbeddingService
+from services.rag_engine import RAGEngine
+
+# Roughly all-MiniLM-L6-v2 on a laptop CPU
+ENCODE_MS_PER_TEXT = 2.0
+
+class TimedModel(BagOfWordsModel):
+    """Bag of words that takes as long as the real model would and counts its inputs."""
+
+    def __init__(self):
+        self.texts = 0
+
+    def encode(self, texts, batch_size, convert_to_numpy):
+        self.texts += len(texts)
+        time.sleep(len(texts) * ENCODE_MS_PER_TEXT / 1000)
+        return super().encode(texts, batch_size, convert_to_numpy)
+
+def edit(pages, edits: int, seed: int = 1):
+    """
+    Rewrites `edits` sentences and inserts one paragraph, then re-paginates,
+    as a corrected PDF would.
+    """
+    rng = np.random.default_rng(seed)
+    text = "".join(pages)
+    sentences = text.split(". ")
+    for index in rng.choice(len(sentences), edits, replace=False):
+        sentences[index] = f"Revised: {sentences[index]}"
+    text = ". ".join(sentences)
+    middle = text.find("\n\n", len(text) // 2)
+    text = text[:middle] + "\n\nA paragraph added in this version of the report." + text[middle:]
+    page_length = len(text) // len(pages) + 1
+    edited, start = [], 0
+    while start < len(text):
+        end = text.find(" ", start + page_length)
+        end = len(text) if end == -1 else end + 1
+        edited.append(text[start:end])
+        start = end
+    return edited
+
+def bench_reindex(num_pages: int = 200, edits=(1, 5, 20), strategies=("fixed", "sentence")):
+    pages, _ = make_corpus(num_pages)
+    model = TimedModel()
+    embedding_service = EmbeddingService(device="cpu")
+    embedding_service._load_model = lambda: model
+    engine = RAGEngine(embedding_service)
+
+    print(f"{num_pages} pages, simulated model {ENCODE_MS_PER_TEXT} ms per chunk")
+    print(f"{'strategy':>10} {'edits':>6} {'chunks':>7} {'embedded':>9} {'full s':>7} {'incremental s':>14} {'speedup':>8}")
+    for strategy in strategies:
+        original = f"{strategy}-v1"
+        engine.add_document("report.pdf", create_chunker(strategy).chunk_pages(pages), chunk_set=original)
+        for count in edits:
+            chunks = create_chunker(strategy).chunk_pages(edit(pages, count))
+
+            started = time.perf_counter()
+            engine.add_document("report.pdf", chunks, chunk_set=f"{strategy}-full-{count}")
+            full_s = time.perf_counter() - started
+
+            model.texts = 0
+            started = time.perf_counter()
+            engine.add_document("report.pdf", chunks, chunk_set=f"{strategy}-v2-{count}",
+                                reuse_from=(original, None))
+            incremental_s = time.perf_counter() - started
+            print(f"{strategy:>10} {count:>6} {len(chunks):>7} {model.texts:>9} {full_s:>7.2f} "
+                  f"{incremental_s:>14.2f} {full_s / incremental_s:>7.1f}x")
+
+if __name__ == "__main__":
+    bench_reindex()
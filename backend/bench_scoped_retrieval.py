@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import chromadb
+
+from services.rag_engine import RAGEngine
+
+DIMENSIONS = 384
+
+def build_collection(path: str, users: int, docs_per_user: int, chunks_per_doc: int, seed: int = 0):
+    """
+    Fills a collection with random unit vectors clustered around a shared set
+    of topics, so every document has chunks close to every query, as happens
+    when many users upload similar material.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(32, DIMENSIONS))
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_or_create_collection(name="bench_scoped", embedding_function=None)
+
+    vectors, chunk_sets = [], []
+    document_id = 0
+    for user_id in range(1, users + 1):
+        for _ in range(docs_per_user):
+            document_id += 1
+            chunk_set = f"set-{document_id}"
+            embeddings = topics[rng.integers(len(topics), size=chunks_per_doc)]
+            embeddings = embeddings + rng.normal(scale=0.6, size=embeddings.shape)
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+            ids = [f"{chunk_set}:{i}" for i in range(chunks_per_doc)]
+            metadatas = [
+                {"chunk_set": chunk_set, "document_id": document_id, "user_id": user_id, "page": i}
+                for i in range(chunks_per_doc)
+            ]
+            collection.add(ids=ids, embeddings=embeddings.tolist(), metadatas=metadatas)
+            vectors.append(embeddings)
+            chunk_sets.extend([chunk_set] * chunks_per_doc)
+    return collection, np.vstack(vectors), np.array(chunk_sets), topics
+
+def percentile(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+def bench_scoped(users: int = 50, docs_per_user: int = 10, chunks_per_doc: int = 100,
+                 queries: int = 200, k: int = 5, seed: int = 0):
+    rng = np.random.default_rng(seed + 1)
+    with tempfile.TemporaryDirectory() as path:
+        collection, vectors, chunk_sets, topics = build_collection(path, users, docs_per_user, chunks_per_doc, seed)
+        total_docs = users * docs_per_user
+        print(f"Collection: {users} users, {total_docs} documents, {len(vectors)} chunks")
+
+        results = {"unfiltered": ([], []), "chunk_set filter": ([], [])}
+        for _ in range(queries):
+            target = f"set-{rng.integers(1, total_docs + 1)}"
+            query = topics[rng.integers(len(topics))] + rng.normal(scale=0.6, size=DIMENSIONS)
+            query /= np.linalg.norm(query)
+
+            # Ground truth: exact top-k by distance within the chatted document
+            in_scope = np.flatnonzero(chunk_sets == target)
+            distances = np.linalg.norm(vectors[in_scope] - query, axis=1)
+            truth = {f"{target}:{i}" for i in np.argsort(distances)[:k]}
+
+            for label, where in (("unfiltered", None),
+                                 ("chunk_set filter", RAGEngine.scope_filter(chunk_sets=[target]))):
+                start = time.perf_counter()
+                hits = collection.query(query_embeddings=[query.tolist()], n_results=k, where=where, include=[])
+                latencies, recalls = results[label]
+                latencies.append(time.perf_counter() - start)
+                recalls.append(len(truth & set(hits["ids"][0])) / k)
+
+        print(f"{'retrieval':>18} {'p50 ms':>8} {'p95 ms':>8} {f'recall@{k}':>9}")
+        for label, (latencies, recalls) in results.items():
+            print(f"{label:>18} {percentile(latencies, 50):>8.2f} {percentile(latencies, 95):>8.2f} "
+                  f"{np.mean(recalls):>9.3f}")
+
+if __name__ == "__main__":
+    bench_scoped()
@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import chromadb
+
+from services.rag_engine import RAGEngine
+
+INSERT_BATCH = 5000
+
+def random_vectors(rng, topics, count: int):
+    vectors = topics[rng.integers(len(topics), size=count)] + rng.normal(scale=0.6, size=(count, topics.shape[1]))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def build_corpus(path: str, total_chunks: int, chunks_per_folder: int, docs_per_folder: int,
+                 dimensions: int, seed: int = 0):
+    """
+    Writes the same synthetic corpus twice: once into a single shared
+    collection and once with one collection per folder, as the folder
+    routing strategy lays it out.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(32, dimensions))
+    client = chromadb.PersistentClient(path=path)
+    shared = client.get_or_create_collection(name="bench_single", embedding_function=None)
+
+    folders = total_chunks // chunks_per_folder
+    chunks_per_doc = chunks_per_folder // docs_per_folder
+    for folder in range(folders):
+        sharded = client.get_or_create_collection(name=f"folder_{folder}", embedding_function=None)
+        ids, metadatas = [], []
+        for doc in range(docs_per_folder):
+            chunk_set = f"set-{folder}-{doc}"
+            ids.extend(f"{chunk_set}:{i}" for i in range(chunks_per_doc))
+            metadatas.extend({"chunk_set": chunk_set, "folder_id": folder, "page": i} for i in range(chunks_per_doc))
+        embeddings = random_vectors(rng, topics, len(ids)).tolist()
+        for start in range(0, len(ids), INSERT_BATCH):
+            batch = slice(start, start + INSERT_BATCH)
+            shared.add(ids=ids[batch], embeddings=embeddings[batch], metadatas=metadatas[batch])
+            sharded.add(ids=ids[batch], embeddings=embeddings[batch], metadatas=metadatas[batch])
+    return client, shared, folders, topics
+
+def bench_sharding(total_chunk_counts=(10_000, 1_000_000), chunks_per_folder: int = 1000,
+                   docs_per_folder: int = 10, dimensions: int = 384, queries: int = 200, k: int = 5):
+    print(f"Folder chat: {docs_per_folder} documents, {chunks_per_folder} chunks per folder, {dimensions} dimensions")
+    print(f"{'total chunks':>13} {'layout':>14} {'p50 ms':>8} {'p99 ms':>8}")
+    for total_chunks in total_chunk_counts:
+        rng = np.random.default_rng(1)
+        with tempfile.TemporaryDirectory() as path:
+            client, shared, folders, topics = build_corpus(
+                path, total_chunks, chunks_per_folder, docs_per_folder, dimensions
+            )
+            latencies = {"single": [], "per-folder": []}
+            for _ in range(queries):
+                folder = int(rng.integers(folders))
+                where = RAGEngine.scope_filter([f"set-{folder}-{doc}" for doc in range(docs_per_folder)])
+                query = random_vectors(rng, topics, 1).tolist()
+
+                for layout, collection in (("single", shared),
+                                           ("per-folder", client.get_collection(name=f"folder_{folder}"))):
+                    start = time.perf_counter()
+                    collection.query(query_embeddings=query, n_results=k, where=where, include=[])
+                    latencies[layout].append(time.perf_counter() - start)
+
+            for layout, samples in latencies.items():
+                print(f"{total_chunks:>13} {layout:>14} {np.percentile(samples, 50) * 1000:>8.2f} "
+                      f"{np.percentile(samples, 99) * 1000:>8.2f}")
+
+if __name__ == "__main__":
+    bench_sharding()
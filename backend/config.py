@@ -7,21 +7,100 @@ load_dotenv()
 class Settings(BaseSettings):
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
     GROQ_MODEL: str = os.getenv("GROQ_MODEL", "mixtral-8x7b-32768")
+    GROQ_MAX_CONNECTIONS: int = int(os.getenv("GROQ_MAX_CONNECTIONS", 100))
+    CHAT_TIMEOUT_SECONDS: float = float(os.getenv("CHAT_TIMEOUT_SECONDS", 60))
+    RETRIEVAL_WORKERS: int = int(os.getenv("RETRIEVAL_WORKERS", 8))
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+    ANSWER_CACHE_TTL_SECONDS: float = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 3600))
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 5000))
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", 10000))
+    HYBRID_SEARCH_ENABLED: bool = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", 20))
+    RRF_K: int = int(os.getenv("RRF_K", 60))
+    LEXICAL_INDEX_PATH: str = os.getenv("LEXICAL_INDEX_PATH", "./lexical_index/bm25.sqlite3")
+    RERANK_ENABLED: bool = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANKER_MODEL: str = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES: int = int(os.getenv("RERANK_CANDIDATES", 50))
+    RERANK_BATCH_SIZE: int = int(os.getenv("RERANK_BATCH_SIZE", 32))
+    # Skip re-ranking when the queued work would exceed this; 0 disables the budget
+    RERANK_LATENCY_BUDGET_MS: float = float(os.getenv("RERANK_LATENCY_BUDGET_MS", 300))
+    RERANK_CACHE_MAX_ENTRIES: int = int(os.getenv("RERANK_CACHE_MAX_ENTRIES", 50000))
+    # Prompt assembly; counts use TOKENIZER_MODEL, so point it at the chat model's tokenizer for exact budgets
+    TOKENIZER_MODEL: str = os.getenv("TOKENIZER_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    PROMPT_MAX_TOKENS: int = int(os.getenv("PROMPT_MAX_TOKENS", 6000))
+    HISTORY_MAX_TOKENS: int = int(os.getenv("HISTORY_MAX_TOKENS", 1500))
+    HISTORY_SUMMARY_MAX_TOKENS: int = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", 300))
+    CHAT_HISTORY_MESSAGES: int = int(os.getenv("CHAT_HISTORY_MESSAGES", 30))
+    # Messages per page of GET /api/chat/history; clients may ask for up to the max
+    CHAT_HISTORY_PAGE_SIZE: int = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", 50))
+    CHAT_HISTORY_MAX_PAGE_SIZE: int = int(os.getenv("CHAT_HISTORY_MAX_PAGE_SIZE", 200))
+    # Rows per page of the admin user and document listings; clients may ask for up to the max
+    ADMIN_PAGE_SIZE: int = int(os.getenv("ADMIN_PAGE_SIZE", 50))
+    ADMIN_MAX_PAGE_SIZE: int = int(os.getenv("ADMIN_MAX_PAGE_SIZE", 500))
     
     CHROMA_PERSIST_DIR: str = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+    # Collection routing: single, user, folder or hash
+    VECTOR_SHARDING: str = os.getenv("VECTOR_SHARDING", "single")
+    VECTOR_HASH_SHARDS: int = int(os.getenv("VECTOR_HASH_SHARDS", 16))
+    VECTOR_COLLECTION_CACHE_SIZE: int = int(os.getenv("VECTOR_COLLECTION_CACHE_SIZE", 256))
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    EMBEDDING_DEVICE: str = os.getenv("EMBEDDING_DEVICE", "auto")
+    EMBEDDING_MAX_BATCH_SIZE: int = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", 64))
+    EMBEDDING_MAX_WAIT_MS: float = float(os.getenv("EMBEDDING_MAX_WAIT_MS", 5))
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 200000))
     
     MYSQL_HOST: str = os.getenv("MYSQL_HOST", "localhost")
     MYSQL_USER: str = os.getenv("MYSQL_USER", "root")
     MYSQL_PASSWORD: str = os.getenv("MYSQL_PASSWORD", "12345")
     MYSQL_DATABASE: str = os.getenv("MYSQL_DATABASE", "pdf_chatbot")
+    # Request handlers use an async engine on this driver (asyncmy or aiomysql); when disabled
+    # they run the sync engine's queries on worker threads instead
+    DB_ASYNC_ENABLED: bool = os.getenv("DB_ASYNC_ENABLED", "true").lower() == "true"
+    DB_ASYNC_DRIVER: str = os.getenv("DB_ASYNC_DRIVER", "asyncmy")
+    # Per engine: the async engine serves requests, the sync one ingestion, startup and the CLI
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 10))
+    # Below MySQL's wait_timeout, so idle connections are replaced before the server drops them
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
 
+    # Chunking: fixed, sentence or token. Sizes are characters, or tokens for "token",
+    # which should stay within the embedding model's input limit (256 for all-MiniLM-L6-v2)
+    CHUNK_STRATEGY: str = os.getenv("CHUNK_STRATEGY", "sentence")
     MAX_CHUNK_SIZE: int = int(os.getenv("MAX_CHUNK_SIZE", 500))
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", 50))
 
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "./uploaded_files")
+    INGEST_QUEUE_MAX_DEPTH: int = int(os.getenv("INGEST_QUEUE_MAX_DEPTH", 100))
+    INGEST_PARSE_WORKERS: int = int(os.getenv("INGEST_PARSE_WORKERS", 2))
+    # Documents indexed at once; their embedding batches share the model's micro-batches
+    INGEST_CONCURRENT_DOCUMENTS: int = int(os.getenv("INGEST_CONCURRENT_DOCUMENTS", 4))
+    UPLOAD_BATCH_MAX_FILES: int = int(os.getenv("UPLOAD_BATCH_MAX_FILES", 50))
+    INGEST_EMBED_BATCH_SIZE: int = int(os.getenv("INGEST_EMBED_BATCH_SIZE", 64))
+    # Progress is written to the document row at most this often, so every worker's status endpoint sees it
+    INGEST_PROGRESS_SAVE_SECONDS: float = float(os.getenv("INGEST_PROGRESS_SAVE_SECONDS", 2))
+    # A document whose ingesting process has not reported for this long is recovered by another worker
+    INGEST_LEASE_SECONDS: int = int(os.getenv("INGEST_LEASE_SECONDS", 300))
+
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 50))
+
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+    # Argon2id cost (passlib defaults); existing hashes are upgraded at their next login
+    ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", 3))
+    ARGON2_MEMORY_COST_KIB: int = int(os.getenv("ARGON2_MEMORY_COST_KIB", 65536))
+    ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", 4))
+    # Threads hashing passwords, and operations queued or running before sign-ins get a 503
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+    # Authenticated users are reused for this long without a users query; 0 disables the cache
+    AUTH_USER_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", 30))
+    AUTH_USER_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", 10000))
 
     class Config:
         env_file = ".env"
@@ -50,10 +50,25 @@ def create_tables():
         folder_id INT NULL,
         filename VARCHAR(255),
         file_path VARCHAR(500),
+        content_hash CHAR(64) NULL,
+        chunk_set_id VARCHAR(64) NULL,
+        vector_collection VARCHAR(128) NULL,
+        pending_file_path VARCHAR(500) NULL,
+        pending_content_hash CHAR(64) NULL,
         chroma_collection_id VARCHAR(100) UNIQUE,
         page_count INT,
+        pages_parsed INT DEFAULT 0,
+        chunk_count INT DEFAULT 0,
+        chunks_embedded INT DEFAULT 0,
         status ENUM('PROCESSING', 'READY', 'FAILED') DEFAULT 'PROCESSING',
+        error_message VARCHAR(500) NULL,
+        ingest_owner VARCHAR(64) NULL,
+        ingest_heartbeat_at DATETIME NULL,
         created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_documents_content_hash (content_hash),
+        INDEX idx_documents_chunk_set_id (chunk_set_id),
+        INDEX idx_documents_status (status),
+        INDEX idx_documents_created_at (created_at),
         FOREIGN KEY (user_id) REFERENCES users(id),
         FOREIGN KEY (folder_id) REFERENCES folders(id) ON DELETE SET NULL
     )
@@ -82,6 +97,7 @@ def create_tables():
         content TEXT,
         tokens_used INT,
         created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_messages_conversation_created (conversation_id, created_at),
         FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
     )
     """)
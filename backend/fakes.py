@@ -0,0 +1,27 @@
+"""
+Stand-ins for models and services the tests do not measure.
+"""
+import threading
+
+
+class FakeArray(list):
+    """What the model's encode returns, as far as EmbeddingService uses it."""
+    def tolist(self):
+        return list(self)
+
+
+class GatedModel:
+    """
+    Stands in for the sentence-transformers model: encode signals `encoding`
+    and holds every batch until the test opens `gate`. A text embeds to
+    [len(text), 1.0, 0.0].
+    """
+    def __init__(self, timeout: float = 10):
+        self.encoding = threading.Event()
+        self.gate = threading.Event()
+        self.timeout = timeout
+
+    def encode(self, texts, batch_size, convert_to_numpy):
+        self.encoding.set()
+        self.gate.wait(timeout=self.timeout)
+        return FakeArray([[float(len(text)), 1.0, 0.0] for text in texts])
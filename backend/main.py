@@ -1,15 +1,31 @@
 from fastapi import FastAPI, Depends, UploadFile, File, Request
-from typing import Optional
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, select, tuple_
+from datetime import datetime
+import asyncio
+import base64
+import functools
+import json
 import logging
+import os
 import time
 import models
 from config import settings
-from database import engine, Base, get_db
+from database import engine, Base, get_db, AsyncSession, AsyncSessionLocal, pool_metrics
 from services.pdf_processor import PDFProcessor
 from services.rag_engine import RAGEngine
+from services.embedding_service import EmbeddingService
+from services.embedding_cache import EmbeddingCache
+from services.answer_cache import SemanticAnswerCache
+from services.retrieval_cache import RetrievalCache
+from services.lexical_index import LexicalIndex
+from services.reranker import CrossEncoderReranker
+from services.ingestion import IngestionQueue, IngestionQueueFull
+from services.password_hasher import PasswordHashingBusy
+from services import document_store
 from pydantic import BaseModel, EmailStr
 import auth
 
@@ -58,13 +74,22 @@ app.add_middleware(
 
 # Services Initialization
 pdf_processor = PDFProcessor()
-rag_engine = RAGEngine()
+embedding_service = EmbeddingService(cache=EmbeddingCache())
+rag_engine = RAGEngine(
+    embedding_service,
+    answer_cache=SemanticAnswerCache() if settings.ANSWER_CACHE_ENABLED else None,
+    retrieval_cache=RetrievalCache() if settings.RETRIEVAL_CACHE_MAX_ENTRIES > 0 else None,
+    lexical_index=LexicalIndex() if settings.HYBRID_SEARCH_ENABLED else None,
+    reranker=CrossEncoderReranker() if settings.RERANK_ENABLED else None
+)
+ingestion_queue = IngestionQueue(pdf_processor, rag_engine)
 
 @app.on_event("startup")
 async def startup_event():
     # Create database tables
     try:
         models.Base.metadata.create_all(bind=engine)
+        models.migrate_schema(engine)
         logger.info("Database tables created or verified.")
     except Exception as e:
         logger.error(f"Could not create database tables: {e}")
@@ -91,6 +116,105 @@ async def startup_event():
     finally:
         db.close()
 
+    # Chat is scoped by chunk set, so documents indexed before chunk sets are unsearchable until migrated
+    db = SessionLocal()
+    try:
+        unmigrated = db.query(models.Document).filter(
+            models.Document.status == models.DocumentStatus.READY,
+            models.Document.chunk_set_id.is_(None)
+        ).count()
+        if unmigrated:
+            logger.warning(f"{unmigrated} document(s) have no chunk set; run 'python cli.py migrate-metadata'.")
+    except Exception as e:
+        logger.warning(f"Could not check vector metadata migration: {e}")
+    finally:
+        db.close()
+
+    # Start background ingestion and pick up uploads interrupted by a restart
+    await ingestion_queue.start()
+    try:
+        recovered = ingestion_queue.recover()
+        if recovered:
+            logger.info(f"Re-enqueued {recovered} document(s) left in PROCESSING.")
+    except Exception as e:
+        logger.warning(f"Could not recover pending ingestions: {e}")
+
+    # Load the prompt tokenizer in the background rather than on the first chat request
+    asyncio.get_running_loop().run_in_executor(None, rag_engine.context_builder.token_counter.count, "warm up")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await ingestion_queue.stop()
+    await rag_engine.aclose()
+
+class ClientDisconnected(Exception):
+    pass
+
+async def until_disconnected(http_request: Request, awaitable, poll_interval: float = 0.5):
+    """
+    Awaits awaitable, cancelling it and raising ClientDisconnected if the
+    client goes away first so no LLM time is spent on an answer nobody reads.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def enqueue_upload(file: UploadFile, user_id: int, folder_id: Optional[int], db: AsyncSession):
+    """
+    Persists the upload and a PROCESSING document row, then hands it to the ingestion queue.
+    Returns the document, or a JSONResponse when the upload is rejected.
+    """
+    if ingestion_queue.is_full():
+        return JSONResponse(status_code=429, content={"message": "Too many documents are being processed. Please retry shortly."})
+
+    try:
+        file_path, content_hash = await pdf_processor.save_upload(file, settings.UPLOAD_DIR)
+    except Exception as e:
+        logger.error(f"PDF upload failed: {e}")
+        return JSONResponse(status_code=400, content={"message": "Invalid PDF file."})
+
+    db_doc = models.Document(
+        user_id=user_id,
+        folder_id=folder_id,
+        filename=file.filename,
+        file_path=file_path,
+        content_hash=content_hash,
+        chunk_set_id=content_hash,
+        status=models.DocumentStatus.PROCESSING
+    )
+    db_doc.vector_collection = rag_engine.router.route(db_doc)
+
+    # Identical bytes already indexed: share that chunk set instead of re-ingesting
+    duplicate = await db.run_sync(document_store.find_indexed_duplicate, content_hash)
+    if duplicate:
+        document_store.link_to_duplicate(db_doc, duplicate)
+        os.remove(file_path)
+
+    db.add(db_doc)
+    await db.commit()
+    await db.refresh(db_doc)
+    if duplicate:
+        logger.info(f"Upload {db_doc.id} deduplicated against document {duplicate.id}.")
+        return db_doc
+
+    try:
+        ingestion_queue.enqueue(db_doc.id)
+    except IngestionQueueFull:
+        await db.delete(db_doc)
+        await db.commit()
+        os.remove(file_path)
+        return JSONResponse(status_code=429, content={"message": "Too many documents are being processed. Please retry shortly."})
+
+    return db_doc
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to AI-Powered PDF Chatbot API"}
@@ -99,6 +223,17 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/api/metrics")
+async def metrics(admin: models.User = Depends(auth.get_current_admin)):
+    return {
+        "embedding": embedding_service.metrics(),
+        "chat": rag_engine.metrics(),
+        "vector_collections": rag_engine.router.stats(),
+        "auth_user_cache": auth.user_cache.stats(),
+        "password_hashing": auth.password_hasher.metrics(),
+        "database": pool_metrics()
+    }
+
 # --- Auth ---
 
 class SignupRequest(BaseModel):
@@ -110,29 +245,49 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
+def hashing_busy_response():
+    return JSONResponse(
+        status_code=503,
+        content={"message": "Too many sign-ins are being processed. Please retry shortly."},
+        headers={"Retry-After": "1"}
+    )
+
 @app.post("/api/auth/signup")
-async def signup(request: SignupRequest, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == request.email).first()
+async def signup(request: SignupRequest, db: AsyncSession = Depends(get_db)):
+    db_user = await db.scalar(select(models.User).where(models.User.email == request.email))
     if db_user:
         return JSONResponse(status_code=400, content={"message": "Email already registered"})
     
-    hashed_pwd = auth.get_password_hash(request.password)
+    try:
+        hashed_pwd = await auth.password_hasher.hash(request.password)
+    except PasswordHashingBusy:
+        return hashing_busy_response()
     new_user = models.User(
         email=request.email,
         name=request.name,
         hashed_password=hashed_pwd
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return {"message": "User created successfully", "user_id": new_user.id}
 
 @app.post("/api/auth/login")
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == request.email).first()
-    if not user or not auth.verify_password(request.password, user.hashed_password):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == request.email))
+    if not user:
         return JSONResponse(status_code=401, content={"message": "Invalid credentials"})
-    
+    try:
+        verified, new_hash = await auth.password_hasher.verify_and_update(request.password, user.hashed_password)
+    except PasswordHashingBusy:
+        return hashing_busy_response()
+    if not verified:
+        return JSONResponse(status_code=401, content={"message": "Invalid credentials"})
+    if new_hash:
+        # Stored with older Argon2 cost settings
+        user.hashed_password = new_hash
+        await db.commit()
+
     access_token = auth.create_access_token(data={"sub": user.email})
     return {
         "access_token": access_token, 
@@ -146,85 +301,174 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
 
 # --- Admin ---
 
+def admin_page_limit(limit: int) -> int:
+    return max(1, min(limit, settings.ADMIN_MAX_PAGE_SIZE))
+
+async def count_rows(db: AsyncSession, model, conditions):
+    return await db.scalar(select(func.count()).select_from(model).where(*conditions))
+
 @app.get("/api/admin/users")
-async def admin_list_users(db: Session = Depends(get_db), admin: models.User = Depends(auth.get_current_admin)):
-    return db.query(models.User).all()
+async def admin_list_users(
+    limit: int = settings.ADMIN_PAGE_SIZE,
+    after: Optional[int] = None,
+    search: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    db: AsyncSession = Depends(get_db),
+    admin: models.User = Depends(auth.get_current_admin)
+):
+    """
+    Users in id order, a page at a time and without password hashes. Pass
+    next_cursor back as `after` for the next page; total comes with the
+    first page only.
+    """
+    limit = admin_page_limit(limit)
+    conditions = []
+    if search:
+        # A prefix match, so the unique index on email serves it
+        conditions.append(models.User.email.startswith(search, autoescape=True))
+    if is_active is not None:
+        conditions.append(models.User.is_active == int(is_active))
+
+    query = select(
+        models.User.id, models.User.email, models.User.name,
+        models.User.is_active, models.User.is_admin, models.User.created_at
+    ).where(*conditions)
+    if after is not None:
+        query = query.where(models.User.id > after)
+    rows = (await db.execute(query.order_by(models.User.id).limit(limit + 1))).all()
+    page = rows[:limit]
+    return {
+        "users": [row._asdict() for row in page],
+        "next_cursor": page[-1].id if len(rows) > limit else None,
+        "total": await count_rows(db, models.User, conditions) if after is None else None
+    }
 
 @app.patch("/api/admin/users/{user_id}/status")
 async def admin_toggle_user_status(
     user_id: int, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     admin: models.User = Depends(auth.get_current_admin)
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Toggle 1 and 0
     user.is_active = 0 if user.is_active == 1 else 1
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    auth.user_cache.invalidate(user.email)
     return {"message": f"User status updated to {'Active' if user.is_active else 'Inactive'}", "is_active": bool(user.is_active)}
 
+def admin_document_filters(status, user_id, created_from, created_to):
+    conditions = []
+    if status is not None:
+        conditions.append(models.Document.status == status)
+    if user_id is not None:
+        conditions.append(models.Document.user_id == user_id)
+    if created_from is not None:
+        conditions.append(models.Document.created_at >= created_from)
+    if created_to is not None:
+        conditions.append(models.Document.created_at < created_to)
+    return conditions
+
+def admin_documents_query(conditions, before: Optional[int], limit: int):
+    # Only the listed columns, with the owner joined for display
+    query = select(
+        models.Document.id, models.Document.filename, models.Document.status, models.Document.created_at,
+        models.User.name.label("owner_name"), models.User.email.label("owner_email")
+    ).join(models.User, models.Document.user_id == models.User.id).where(*conditions)
+    if before is not None:
+        query = query.where(models.Document.id < before)
+    return query.order_by(models.Document.id.desc()).limit(limit)
+
+def admin_document_row(row):
+    return {
+        "id": row.id,
+        "filename": row.filename,
+        "status": row.status.value,
+        "created_at": row.created_at,
+        "owner": {"name": row.owner_name, "email": row.owner_email}
+    }
+
 @app.get("/api/admin/documents")
-async def admin_list_all_documents(db: Session = Depends(get_db), admin: models.User = Depends(auth.get_current_admin)):
-    # Join with User to show who owns the file
-    docs = db.query(models.Document, models.User.name.label("owner_name"), models.User.email.label("owner_email"))\
-             .join(models.User, models.Document.user_id == models.User.id)\
-             .all()
-    
-    result = []
-    for doc, owner_name, owner_email in docs:
-        result.append({
-            "id": doc.id,
-            "filename": doc.filename,
-            "status": doc.status,
-            "created_at": doc.created_at,
-            "owner": {"name": owner_name, "email": owner_email}
-        })
-    return result
+async def admin_list_all_documents(
+    limit: int = settings.ADMIN_PAGE_SIZE,
+    before: Optional[int] = None,
+    status: Optional[models.DocumentStatus] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    admin: models.User = Depends(auth.get_current_admin)
+):
+    """
+    Documents newest first, a page at a time, filtered by status, owner and
+    upload time (created_from inclusive, created_to exclusive). Pass
+    next_cursor back as `before` for the next page; total comes with the
+    first page only.
+    """
+    limit = admin_page_limit(limit)
+    conditions = admin_document_filters(status, user_id, created_from, created_to)
+    rows = (await db.execute(admin_documents_query(conditions, before, limit + 1))).all()
+    page = rows[:limit]
+    return {
+        "documents": [admin_document_row(row) for row in page],
+        "next_cursor": page[-1].id if len(rows) > limit else None,
+        "total": await count_rows(db, models.Document, conditions) if before is None else None
+    }
+
+@app.get("/api/admin/documents/export")
+async def admin_export_documents(
+    status: Optional[models.DocumentStatus] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    admin: models.User = Depends(auth.get_current_admin)
+):
+    """
+    Every matching document as newline-delimited JSON, read a page at a time
+    so neither the server nor a connection holds the whole listing.
+    """
+    conditions = admin_document_filters(status, user_id, created_from, created_to)
+
+    async def lines():
+        before = None
+        while True:
+            # A short session per page rather than one held for the whole download
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(
+                    admin_documents_query(conditions, before, settings.ADMIN_MAX_PAGE_SIZE)
+                )).all()
+            for row in rows:
+                yield json.dumps(jsonable_encoder(admin_document_row(row))) + "\n"
+            if len(rows) < settings.ADMIN_MAX_PAGE_SIZE:
+                return
+            before = rows[-1].id
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @app.post("/api/admin/upload-for-user")
 async def admin_upload_for_user(
     user_id: int,
     folder_id: Optional[int] = None,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     admin: models.User = Depends(auth.get_current_admin)
 ):
-    target_user = db.query(models.User).filter(models.User.id == user_id).first()
+    target_user = await db.get(models.User, user_id)
     if not target_user:
         return JSONResponse(status_code=404, content={"message": "Target user not found"})
 
-    try:
-        result = await pdf_processor.process_pdf(file)
-    except Exception as e:
-        logger.error(f"Admin PDF processing failed: {e}")
-        return JSONResponse(status_code=400, content={"message": "Invalid PDF file."})
+    db_doc = await enqueue_upload(file, user_id, folder_id, db)
+    if isinstance(db_doc, JSONResponse):
+        return db_doc
 
-    filename = result["filename"]
-    db_doc = models.Document(
-        user_id=user_id,
-        folder_id=folder_id,
-        filename=filename,
-        file_path=filename,
-        page_count=result["total_pages"],
-        status=models.DocumentStatus.PROCESSING
-    )
-    db.add(db_doc)
-    db.commit()
-    db.refresh(db_doc)
-
-    try:
-        rag_engine.add_document(filename, result["chunks"], folder_id=folder_id)
-        db_doc.status = models.DocumentStatus.READY
-        db.commit()
-    except Exception as e:
-        logger.error(f"Admin Indexing failed for {filename}: {e}")
-        db_doc.status = models.DocumentStatus.FAILED
-        db.commit()
-
-    return {"message": f"PDF uploaded for user {target_user.name}", "document_id": db_doc.id}
+    return {
+        "message": f"PDF uploaded for user {target_user.name}",
+        "document_id": db_doc.id,
+        "status": db_doc.status.value
+    }
 
 # --- Folders ---
 
@@ -232,29 +476,37 @@ class FolderCreate(BaseModel):
     name: str
 
 @app.post("/api/folders")
-async def create_folder(folder: FolderCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def create_folder(folder: FolderCreate, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
     db_folder = models.Folder(user_id=current_user.id, name=folder.name)
     db.add(db_folder)
-    db.commit()
-    db.refresh(db_folder)
+    await db.commit()
+    await db.refresh(db_folder)
     return db_folder
 
 @app.get("/api/folders")
-async def list_folders(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    return db.query(models.Folder).filter(models.Folder.user_id == current_user.id).all()
+async def list_folders(db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    return (await db.scalars(select(models.Folder).where(models.Folder.user_id == current_user.id))).all()
 
 @app.get("/api/folders/{folder_id}/documents")
-async def list_folder_documents(folder_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Document).filter(models.Document.folder_id == folder_id).all()
+async def list_folder_documents(folder_id: int, db: AsyncSession = Depends(get_db)):
+    return (await db.scalars(select(models.Document).where(models.Document.folder_id == folder_id))).all()
 
 @app.delete("/api/folders/{folder_id}")
-async def delete_folder(folder_id: int, db: Session = Depends(get_db)):
-    folder = db.query(models.Folder).filter(models.Folder.id == folder_id).first()
+async def delete_folder(folder_id: int, db: AsyncSession = Depends(get_db)):
+    folder = await db.get(models.Folder, folder_id)
     if not folder:
         return JSONResponse(status_code=404, content={"message": "Folder not found"})
     
-    db.delete(folder)
-    db.commit()
+    # Documents become uncategorized rather than deleted, so only the folder tag goes
+    collections = (await db.scalars(
+        select(models.Document.vector_collection).where(models.Document.folder_id == folder_id).distinct()
+    )).all()
+    # Re-tagging every vector in the folder can take a while; keep it off the event loop
+    await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(rag_engine.clear_folder, folder_id, collections=list(collections))
+    )
+    await db.delete(folder)
+    await db.commit()
     return {"message": "Folder deleted successfully"}
 
 # --- Document Management ---
@@ -263,81 +515,155 @@ async def delete_folder(folder_id: int, db: Session = Depends(get_db)):
 async def upload_pdf(
     file: UploadFile = File(...), 
     folder_id: int = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    try:
-        result = await pdf_processor.process_pdf(file)
-    except Exception as e:
-        logger.error(f"PDF processing failed: {e}")
-        return JSONResponse(status_code=400, content={"message": "Invalid PDF file or processing error."})
-    
-    filename = result["filename"]
-    page_count = result["total_pages"]
-    
-    db_doc = models.Document(
-        user_id=current_user.id, 
-        folder_id=folder_id,
-        filename=filename,
-        file_path=filename,
-        page_count=page_count,
-        status=models.DocumentStatus.PROCESSING
-    )
-    db.add(db_doc)
-    db.commit()
-    db.refresh(db_doc)
-    
-    try:
-        rag_engine.add_document(filename, result["chunks"], folder_id=folder_id)
-        db_doc.status = models.DocumentStatus.READY
-        db.commit()
-    except Exception as e:
-        logger.error(f"Indexing failed for {filename}: {e}")
-        db_doc.status = models.DocumentStatus.FAILED
-        db.commit()
-    
+    db_doc = await enqueue_upload(file, current_user.id, folder_id, db)
+    if isinstance(db_doc, JSONResponse):
+        return db_doc
+
     return {
         "message": "PDF uploaded successfully",
         "document_id": db_doc.id,
-        "filename": filename,
+        "filename": db_doc.filename,
         "status": db_doc.status.value
     }
 
+@app.post("/api/documents/upload-batch")
+async def upload_pdf_batch(
+    files: List[UploadFile] = File(...),
+    folder_id: int = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Uploads several PDFs in one request. They are indexed side by side, so
+    their chunks share the embedding model's batches; each file gets its own
+    document id to poll for status, or the reason it was rejected.
+    """
+    if len(files) > settings.UPLOAD_BATCH_MAX_FILES:
+        return JSONResponse(
+            status_code=400,
+            content={"message": f"At most {settings.UPLOAD_BATCH_MAX_FILES} files can be uploaded at once."}
+        )
+
+    results = []
+    for file in files:
+        db_doc = await enqueue_upload(file, current_user.id, folder_id, db)
+        if isinstance(db_doc, JSONResponse):
+            results.append({
+                "filename": file.filename,
+                "status": "rejected",
+                "error": json.loads(db_doc.body)["message"]
+            })
+            continue
+        results.append({
+            "filename": db_doc.filename,
+            "document_id": db_doc.id,
+            "status": db_doc.status.value,
+            "status_url": f"/api/documents/{db_doc.id}/status"
+        })
+
+    accepted = sum(result["status"] != "rejected" for result in results)
+    return {"message": f"{accepted} of {len(files)} PDFs uploaded", "documents": results}
+
 @app.get("/api/documents")
-async def list_documents(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    return db.query(models.Document).filter(models.Document.user_id == current_user.id).all()
+async def list_documents(db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    return (await db.scalars(select(models.Document).where(models.Document.user_id == current_user.id))).all()
 
 @app.get("/api/documents/{document_id}")
-async def get_document(document_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    doc = db.query(models.Document).filter(
+async def get_document(document_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    doc = await db.scalar(select(models.Document).where(
         models.Document.id == document_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not doc:
         return JSONResponse(status_code=404, content={"message": "Document not found"})
     return doc
 
 @app.get("/api/documents/{document_id}/status")
-async def get_document_status(document_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    doc = db.query(models.Document).filter(
+async def get_document_status(document_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    doc = await db.scalar(select(models.Document).where(
+        models.Document.id == document_id,
+        models.Document.user_id == current_user.id
+    ))
+    if not doc:
+        return JSONResponse(status_code=404, content={"message": "Document not found"})
+
+    # Live progress when this worker is ingesting the document, stored counters otherwise
+    live = ingestion_queue.progress(doc.id)
+    return {
+        "status": doc.status.value,
+        "total_pages": doc.page_count,
+        "pages_parsed": live["pages_parsed"] if live else doc.pages_parsed,
+        "total_chunks": live["total_chunks"] if live and live["total_chunks"] is not None else doc.chunk_count,
+        "chunks_embedded": live["chunks_embedded"] if live else doc.chunks_embedded,
+        "chunks_reused": live["chunks_reused"] if live else None,
+        "replacement_pending": doc.pending_content_hash is not None,
+        "error": doc.error_message
+    }
+
+@app.put("/api/documents/{document_id}")
+async def replace_document(
+    document_id: int,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Uploads a new version of a document. Chat keeps using the current version
+    until the new one is indexed; only chunks whose text changed are embedded.
+    """
+    doc = await db.scalar(select(models.Document).where(
         models.Document.id == document_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not doc:
         return JSONResponse(status_code=404, content={"message": "Document not found"})
-    return {"status": doc.status.value}
+    if doc.status != models.DocumentStatus.READY or doc.pending_content_hash:
+        return JSONResponse(status_code=409, content={"message": "Document is still being processed."})
+    if ingestion_queue.is_full():
+        return JSONResponse(status_code=429, content={"message": "Too many documents are being processed. Please retry shortly."})
+
+    try:
+        file_path, content_hash = await pdf_processor.save_upload(file, settings.UPLOAD_DIR)
+    except Exception as e:
+        logger.error(f"PDF upload failed: {e}")
+        return JSONResponse(status_code=400, content={"message": "Invalid PDF file."})
+
+    if content_hash == doc.content_hash:
+        os.remove(file_path)
+        return {"message": "Document is unchanged", "document_id": doc.id, "status": doc.status.value}
+
+    doc.pending_file_path = file_path
+    doc.pending_content_hash = content_hash
+    await db.commit()
+    try:
+        ingestion_queue.enqueue(doc.id)
+    except IngestionQueueFull:
+        doc.pending_file_path = doc.pending_content_hash = None
+        await db.commit()
+        os.remove(file_path)
+        return JSONResponse(status_code=429, content={"message": "Too many documents are being processed. Please retry shortly."})
+
+    return {
+        "message": "New version uploaded; the document switches to it once indexed",
+        "document_id": doc.id,
+        "status": doc.status.value
+    }
 
 @app.delete("/api/documents/{document_id}")
-async def delete_document(document_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    doc = db.query(models.Document).filter(
+async def delete_document(document_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    doc = await db.scalar(select(models.Document).where(
         models.Document.id == document_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not doc:
         return JSONResponse(status_code=404, content={"message": "Document not found"})
     
-    db.delete(doc)
-    db.commit()
+    unreferenced = await db.run_sync(document_store.delete_document, doc)
+    # The async session runs run_sync on the event loop, so the Chroma deletes go to the executor
+    await asyncio.get_running_loop().run_in_executor(None, document_store.drop_unreferenced, rag_engine, unreferenced)
     return {"message": "Document deleted successfully"}
 
 # --- Chat ---
@@ -347,44 +673,65 @@ class ChatRequest(BaseModel):
     document_id: Optional[int] = None
     folder_id: Optional[int] = None
 
-@app.post("/api/chat/ask")
-async def chat(request: ChatRequest, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def prepare_chat(request: ChatRequest, db: AsyncSession, current_user: models.User):
+    """
+    Resolves the conversation and retrieval scope for a question, adds the
+    user message and loads recent history. Returns (conversation, scope,
+    history, documents), or a JSONResponse when the request is rejected;
+    documents are the (chunk_set_id, id, filename, folder_id) rows sources
+    are attributed to.
+    """
     if not request.document_id and not request.folder_id:
         return JSONResponse(status_code=400, content={"message": "Must provide document_id or folder_id"})
 
     if request.document_id:
-        doc = db.query(models.Document).filter(models.Document.id == request.document_id).first()
+        doc = await db.get(models.Document, request.document_id)
         if not doc:
             return JSONResponse(status_code=404, content={"message": "Document not found"})
         if doc.status != models.DocumentStatus.READY:
             return JSONResponse(status_code=400, content={"message": "Document is not ready for chat yet."})
+        if not doc.chunk_set_id:
+            logger.warning(f"Document {doc.id} has no chunk set; run 'python cli.py migrate-metadata'.")
+        scope = document_store.chat_scope([(doc.chunk_set_id, doc.vector_collection)])
+        documents = [(doc.chunk_set_id, doc.id, doc.filename, doc.folder_id)]
         
-        conv = db.query(models.Conversation).filter(
+        conv = await db.scalar(select(models.Conversation).where(
             models.Conversation.document_id == request.document_id,
             models.Conversation.user_id == current_user.id
-        ).first()
+        ))
         if not conv:
             conv = models.Conversation(user_id=current_user.id, document_id=request.document_id)
             db.add(conv)
-            db.commit()
-            db.refresh(conv)
+            await db.commit()
+            await db.refresh(conv)
     else:
-        folder = db.query(models.Folder).filter(
+        folder = await db.scalar(select(models.Folder).where(
             models.Folder.id == request.folder_id,
             models.Folder.user_id == current_user.id
-        ).first()
+        ))
         if not folder:
             return JSONResponse(status_code=404, content={"message": "Folder not found"})
+        rows = (await db.execute(
+            select(models.Document.chunk_set_id, models.Document.vector_collection, models.Document.id,
+                   models.Document.filename, models.Document.folder_id).where(
+                models.Document.folder_id == request.folder_id,
+                models.Document.status == models.DocumentStatus.READY,
+                models.Document.chunk_set_id.isnot(None)
+            ).order_by(models.Document.id)
+        )).all()
+        scope = document_store.chat_scope((chunk_set_id, collection) for chunk_set_id, collection, *_ in rows)
+        documents = [(chunk_set_id, document_id, filename, folder_id)
+                     for chunk_set_id, _, document_id, filename, folder_id in rows]
         
-        conv = db.query(models.Conversation).filter(
+        conv = await db.scalar(select(models.Conversation).where(
             models.Conversation.folder_id == request.folder_id,
             models.Conversation.user_id == current_user.id
-        ).first()
+        ))
         if not conv:
             conv = models.Conversation(user_id=current_user.id, folder_id=request.folder_id)
             db.add(conv)
-            db.commit()
-            db.refresh(conv)
+            await db.commit()
+            await db.refresh(conv)
     
     user_msg = models.Message(
         conversation_id=conv.id,
@@ -393,23 +740,53 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db), current_user
     )
     db.add(user_msg)
     
-    # Fetch recent chat history (last 10 messages)
-    history_msgs = db.query(models.Message).filter(
+    # Fetch recent chat history; the context builder fits it to the prompt budget
+    history_msgs = (await db.scalars(select(models.Message).where(
         models.Message.conversation_id == conv.id
-    ).order_by(models.Message.created_at.desc()).limit(10).all()
+    ).order_by(models.Message.created_at.desc(), models.Message.id.desc()).limit(settings.CHAT_HISTORY_MESSAGES))).all()
     
     # Reverse to get chronological order and format for Groq
     chat_history = []
     for m in reversed(history_msgs):
         chat_history.append({"role": m.role.name, "content": m.content})
 
+    return conv, scope, chat_history, documents
+
+async def save_assistant_message(conversation_id: int, content: str, tokens_used: int = None):
+    """
+    Persists an answer from a fresh session, since a streaming response
+    outlives the request's own session.
+    """
+    async with AsyncSessionLocal() as db:
+        message = models.Message(
+            conversation_id=conversation_id, role="assistant", content=content, tokens_used=tokens_used
+        )
+        db.add(message)
+        await db.commit()
+        return message.id
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/chat/ask")
+async def chat(request: ChatRequest, http_request: Request, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    prepared = await prepare_chat(request, db, current_user)
+    if isinstance(prepared, JSONResponse):
+        return prepared
+    conv, scope, chat_history, documents = prepared
+
     try:
-        result = rag_engine.query(
-            request.question, 
-            folder_id=request.folder_id,
-            document_id=request.document_id,
-            history=chat_history
+        result = await until_disconnected(
+            http_request,
+            rag_engine.aquery(request.question, history=chat_history, scope=scope)
         )
+    except ClientDisconnected:
+        logger.info(f"Client disconnected, answer for conversation {conv.id} cancelled.")
+        await db.rollback()
+        return JSONResponse(status_code=499, content={"message": "Client closed request."})
+    except asyncio.TimeoutError:
+        logger.warning(f"Chat query for conversation {conv.id} timed out after {settings.CHAT_TIMEOUT_SECONDS}s.")
+        return JSONResponse(status_code=504, content={"message": "The answer took too long to generate. Please try again."})
     except Exception as e:
         logger.error(f"Chat query failed: {e}")
         return JSONResponse(status_code=500, content={"message": "Failed to generate answer."})
@@ -417,30 +794,110 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db), current_user
     assistant_msg = models.Message(
         conversation_id=conv.id,
         role="assistant",
-        content=result["answer"]
+        content=result["answer"],
+        tokens_used=result["prompt_tokens"]
     )
     db.add(assistant_msg)
-    db.commit()
+    await db.commit()
     
     return {
         "answer": result["answer"],
-        "sources": result["sources"],
+        "sources": document_store.own_sources(result["sources"], documents, current_user.id),
         "conversation_id": conv.id
     }
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """
+    Server-Sent Events version of /api/chat/ask: a `sources` event once
+    retrieval is done, `token` events as the answer is generated, then
+    `done` (or `error`). The answer is saved when the stream completes, and
+    whatever was sent so far is saved if the client aborts.
+    """
+    prepared = await prepare_chat(request, db, current_user)
+    if isinstance(prepared, JSONResponse):
+        return prepared
+    conv, scope, chat_history, documents = prepared
+    # The user turn is kept even if the stream is aborted
+    await db.commit()
+    conversation_id = conv.id
+
+    async def events():
+        parts = []
+        prompt_tokens = None
+        saved = False
+        try:
+            async for kind, payload in rag_engine.astream(request.question, history=chat_history, scope=scope):
+                if kind == "sources":
+                    yield sse_event("sources", document_store.own_sources(payload, documents, current_user.id))
+                elif kind == "prompt_tokens":
+                    prompt_tokens = payload
+                else:
+                    parts.append(payload)
+                    yield sse_event("token", {"text": payload})
+            message_id = await save_assistant_message(conversation_id, "".join(parts), prompt_tokens)
+            saved = True
+            yield sse_event("done", {"conversation_id": conversation_id, "message_id": message_id})
+        except Exception as e:
+            logger.error(f"Streaming chat query failed: {e}")
+            yield sse_event("error", {"message": "Failed to generate answer."})
+        finally:
+            if parts and not saved:
+                logger.info(f"Stream for conversation {conversation_id} ended early; saving partial answer.")
+                # The response task is being cancelled; shielded, the save still completes
+                await asyncio.shield(save_assistant_message(conversation_id, "".join(parts), prompt_tokens))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def encode_history_cursor(message: models.Message) -> str:
+    return base64.urlsafe_b64encode(f"{message.created_at.isoformat()}|{message.id}".encode()).decode()
+
+def decode_history_cursor(cursor: str):
+    created_at, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), int(message_id)
+
 @app.get("/api/chat/history/{id}")
-async def get_chat_history(id: int, is_folder: bool = False, db: Session = Depends(get_db)):
+async def get_chat_history(
+    id: int,
+    is_folder: bool = False,
+    limit: int = settings.CHAT_HISTORY_PAGE_SIZE,
+    before: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Returns a conversation's most recent messages, oldest first. next_cursor,
+    when set, is passed back as `before` to fetch the page of messages
+    preceding these.
+    """
+    limit = max(1, min(limit, settings.CHAT_HISTORY_MAX_PAGE_SIZE))
     if is_folder:
-        conv = db.query(models.Conversation).filter(models.Conversation.folder_id == id).first()
+        conv = await db.scalar(select(models.Conversation).where(models.Conversation.folder_id == id).limit(1))
     else:
-        conv = db.query(models.Conversation).filter(models.Conversation.document_id == id).first()
+        conv = await db.scalar(select(models.Conversation).where(models.Conversation.document_id == id).limit(1))
     
     if not conv:
-        return []
-    
-    return db.query(models.Message).filter(
-        models.Message.conversation_id == conv.id
-    ).order_by(models.Message.created_at.asc()).all()
+        return {"messages": [], "next_cursor": None}
+
+    query = select(models.Message).where(models.Message.conversation_id == conv.id)
+    if before:
+        try:
+            created_at, message_id = decode_history_cursor(before)
+        except ValueError:
+            return JSONResponse(status_code=400, content={"message": "Invalid history cursor."})
+        query = query.where(tuple_(models.Message.created_at, models.Message.id) < (created_at, message_id))
+    # One extra row tells whether older messages remain
+    page = (await db.scalars(
+        query.order_by(models.Message.created_at.desc(), models.Message.id.desc()).limit(limit + 1)
+    )).all()
+    messages = page[:limit]
+    return {
+        "messages": list(reversed(messages)),
+        "next_cursor": encode_history_cursor(messages[-1]) if len(page) > limit else None
+    }
 
 class FeedbackRequest(BaseModel):
     message_id: int
@@ -448,6 +905,6 @@ class FeedbackRequest(BaseModel):
     comment: str = None
 
 @app.post("/api/chat/feedback")
-async def chat_feedback(request: FeedbackRequest, db: Session = Depends(get_db)):
+async def chat_feedback(request: FeedbackRequest, db: AsyncSession = Depends(get_db)):
     logger.info(f"Feedback received for message {request.message_id}: {request.rating} - {request.comment}")
     return {"message": "Feedback recorded successfully"}
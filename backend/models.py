@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index, inspect, text
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -40,14 +40,31 @@ class Document(Base):
     folder_id = Column(Integer, ForeignKey("folders.id"), nullable=True)
     filename = Column(String(255))
     file_path = Column(String(500))
+    content_hash = Column(String(64), index=True)
+    chunk_set_id = Column(String(64), index=True)
+    vector_collection = Column(String(128), nullable=True)  # NULL: the original shared collection
+    # Set while a replacement upload is being indexed; the current version keeps serving until it is ready
+    pending_file_path = Column(String(500), nullable=True)
+    pending_content_hash = Column(String(64), nullable=True)
     chroma_collection_id = Column(String(100), unique=True)
     page_count = Column(Integer)
+    pages_parsed = Column(Integer, default=0)
+    chunk_count = Column(Integer, default=0)
+    chunks_embedded = Column(Integer, default=0)
     status = Column(Enum(DocumentStatus), default=DocumentStatus.PROCESSING)
+    error_message = Column(String(500), nullable=True)
+    # The process ingesting the document and when it last reported; a stale heartbeat frees it for recovery
+    ingest_owner = Column(String(64), nullable=True)
+    ingest_heartbeat_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="documents")
     folder = relationship("Folder", back_populates="documents")
 
+# The admin listing's status and date filters and their counts; InnoDB appends the id, its sort key
+document_status_index = Index("idx_documents_status", Document.status)
+document_created_index = Index("idx_documents_created_at", Document.created_at)
+
 # User.documents = relationship("Document", order_by=Document.id, back_populates="user")
 
 class Conversation(Base):
@@ -72,3 +89,46 @@ class Message(Base):
     content = Column(Text)
     tokens_used = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+# History pages and the recent turns sent with each question seek this index by
+# (created_at, id) within a conversation; InnoDB appends the id to every secondary index
+message_history_index = Index("idx_messages_conversation_created", Message.conversation_id, Message.created_at)
+
+# Added after the tables' first release; startup adds them to existing databases
+ADDED_COLUMNS = (
+    Document.content_hash, Document.chunk_set_id, Document.vector_collection,
+    Document.pending_file_path, Document.pending_content_hash,
+    Document.pages_parsed, Document.chunk_count, Document.chunks_embedded, Document.error_message,
+    Document.ingest_owner, Document.ingest_heartbeat_at,
+)
+ADDED_INDEXES = (
+    message_history_index, document_status_index, document_created_index,
+    *(index for index in Document.__table__.indexes if index.columns.keys() in (["content_hash"], ["chunk_set_id"])),
+)
+
+def migrate_schema(bind):
+    """
+    Brings tables created by an earlier release up to date: create_all skips
+    tables that already exist, so columns and indexes added since are added
+    here. Indexes are matched by their columns as well as by name, since
+    create_tables.py names them differently.
+    """
+    inspector = inspect(bind)
+    preparer = bind.dialect.identifier_preparer
+    for attribute in ADDED_COLUMNS:
+        column = attribute.property.columns[0]
+        existing = {c["name"] for c in inspector.get_columns(column.table.name)}
+        if column.name in existing:
+            continue
+        ddl = f"ALTER TABLE {preparer.format_table(column.table)} ADD COLUMN {preparer.format_column(column)} " \
+              f"{column.type.compile(dialect=bind.dialect)}"
+        if column.default is not None and column.default.is_scalar:
+            ddl += f" DEFAULT {column.default.arg}"
+        with bind.begin() as conn:
+            conn.execute(text(ddl))
+
+    for index in ADDED_INDEXES:
+        existing = inspector.get_indexes(index.table.name)
+        if any(i["name"] == index.name or i["column_names"] == index.columns.keys() for i in existing):
+            continue
+        index.create(bind=bind)
@@ -0,0 +1,128 @@
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import settings
+
+
+def scope_key(scope: dict):
+    """
+    Stable key for a chat scope. Chunk sets are content-addressed, so the key
+    changes whenever a document is added to or removed from the scope.
+    """
+    parts = sorted(f"{collection}/{chunk_set}" for collection, chunk_sets in scope.items() for chunk_set in chunk_sets)
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """
+    In-memory cache of generated answers, looked up by question similarity.
+
+    Entries are grouped by scope key; a question is answered from the cache
+    when its embedding has cosine similarity of at least `threshold` with a
+    cached question asked over the same scope. Entries expire after
+    ttl_seconds and the least recently used ones are evicted beyond
+    max_entries. invalidate() drops every entry whose scope includes a chunk
+    set, for re-indexing that keeps the chunk set id.
+    """
+
+    def __init__(self, threshold: float = settings.ANSWER_CACHE_THRESHOLD,
+                 ttl_seconds: float = settings.ANSWER_CACHE_TTL_SECONDS,
+                 max_entries: int = settings.ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.saved_llm_ms = 0.0
+        self._ids = itertools.count()
+        self._entries = OrderedDict()  # entry id -> entry, least recently used first
+        self._by_scope = {}  # scope key -> {entry id: normalised question vector}
+        self._lock = threading.Lock()
+
+    def get(self, scope: dict, embedding):
+        """
+        Returns the cached {"answer", "sources"} for the closest matching
+        question, or None.
+        """
+        key = scope_key(scope)
+        query = self._normalise(embedding)
+        now = time.time()
+        with self._lock:
+            candidates = self._by_scope.get(key, {})
+            for entry_id in [entry_id for entry_id in candidates if self._entries[entry_id]["expires"] <= now]:
+                self._remove(entry_id)
+                self.expirations += 1
+
+            best_id, best_score = None, self.threshold
+            if candidates:
+                ids = list(candidates)
+                scores = np.stack([candidates[entry_id] for entry_id in ids]) @ query
+                index = int(np.argmax(scores))
+                if scores[index] >= best_score:
+                    best_id, best_score = ids[index], float(scores[index])
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            entry = self._entries[best_id]
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            self.saved_llm_ms += entry["llm_ms"]
+            return {"answer": entry["answer"], "sources": entry["sources"], "similarity": best_score}
+
+    def put(self, scope: dict, embedding, answer: str, sources: list, llm_ms: float):
+        key = scope_key(scope)
+        chunk_sets = {chunk_set for chunk_sets in scope.values() for chunk_set in chunk_sets}
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = {
+                "scope": key,
+                "chunk_sets": chunk_sets,
+                "answer": answer,
+                "sources": sources,
+                "llm_ms": llm_ms,
+                "expires": time.time() + self.ttl_seconds,
+            }
+            self._by_scope.setdefault(key, {})[entry_id] = self._normalise(embedding)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, chunk_set: str):
+        with self._lock:
+            for entry_id in [entry_id for entry_id, entry in self._entries.items() if chunk_set in entry["chunk_sets"]]:
+                self._remove(entry_id)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "saved_llm_ms": round(self.saved_llm_ms, 1),
+        }
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        scope_entries = self._by_scope[entry["scope"]]
+        del scope_entries[entry_id]
+        if not scope_entries:
+            del self._by_scope[entry["scope"]]
+
+    @staticmethod
+    def _normalise(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import models
+from config import settings
+from services.chunking import create_chunker
+from services.document_store import find_indexed_duplicate, link_to_duplicate
+from services.pdf_processor import MAX_SHARD_PAGES, UPLOAD_READ_SIZE, extract_page_range, open_pdf
+
+logger = logging.getLogger("pdf-chatbot")
+
+
+def find_pdfs(directory: str):
+    """
+    Every PDF under directory, in a stable order.
+    """
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+    return paths
+
+
+def parse_pdf(file_path: str, chunk_strategy: str, chunk_size: int, chunk_overlap: int):
+    """
+    Hashes, extracts and chunks one PDF. Runs in a pool process, so only the
+    path goes in and only the chunks come back.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while data := f.read(UPLOAD_READ_SIZE):
+            digest.update(data)
+
+    with open_pdf(file_path) as pdf_reader:
+        total_pages = len(pdf_reader.pages)
+    chunker = create_chunker(chunk_strategy, chunk_size, chunk_overlap)
+    chunks = []
+    for start in range(0, total_pages, MAX_SHARD_PAGES):
+        chunks.extend(chunker.feed(extract_page_range(file_path, start, min(start + MAX_SHARD_PAGES, total_pages)), start))
+    chunks.extend(chunker.finish())
+    return {"content_hash": digest.hexdigest(), "total_pages": total_pages, "chunks": chunks}
+
+
+class Checkpoint:
+    """
+    Append-only JSON lines file with one record per finished PDF, so an
+    interrupted run picks up where it stopped. The last record for a path
+    wins; failed PDFs are tried again by the next run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by the interruption
+                    self.done[record["path"]] = record
+
+    def record(self, path: str, **fields):
+        record = {"path": path, **fields}
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        self.done[path] = record
+
+    def is_finished(self, path: str):
+        return self.done.get(path, {}).get("status") in ("indexed", "duplicate")
+
+
+class BulkIngester:
+    """
+    Indexes a directory tree of PDFs straight into Chroma and the documents
+    table, without going through the API.
+
+    PDFs are hashed, parsed and chunked on a process pool. Up to
+    concurrent_documents of them are embedded and written at once, so their
+    batches share the EmbeddingService micro-batches. Each finished PDF is
+    recorded in the checkpoint; identical files become documents linked to
+    the already indexed chunk set, as with uploads.
+    """
+
+    def __init__(self, session_factory, rag_engine, user_id: int, folder_id: int = None,
+                 parse_workers: int = settings.PDF_EXTRACT_WORKERS,
+                 concurrent_documents: int = settings.INGEST_CONCURRENT_DOCUMENTS,
+                 upload_dir: str = settings.UPLOAD_DIR,
+                 chunk_strategy: str = settings.CHUNK_STRATEGY,
+                 chunk_size: int = settings.MAX_CHUNK_SIZE,
+                 chunk_overlap: int = settings.CHUNK_OVERLAP):
+        self.session_factory = session_factory
+        self.rag_engine = rag_engine
+        self.user_id = user_id
+        self.folder_id = folder_id
+        self.parse_workers = max(1, parse_workers)
+        self.concurrent_documents = max(1, concurrent_documents)
+        self.upload_dir = upload_dir
+        # Fail on a bad strategy or sizes before starting the pool
+        create_chunker(chunk_strategy, chunk_size, chunk_overlap)
+        self.chunk_options = (chunk_strategy, chunk_size, chunk_overlap)
+
+    def run(self, paths: list, checkpoint: Checkpoint, on_progress=None, progress_interval: float = 10.0):
+        """
+        Ingests every path not indexed according to the checkpoint, including
+        ones that failed last time (a transient database or memory error, say). on_progress(report)
+        is called at most every progress_interval seconds; returns the final
+        report.
+        """
+        report = {
+            "files": len(paths), "skipped": 0, "indexed": 0, "duplicates": 0, "failed": 0,
+            "pages": 0, "chunks": 0, "seconds": 0.0, "failures": [],
+        }
+        todo = [path for path in paths if not checkpoint.is_finished(path)]
+        report["skipped"] = len(paths) - len(todo)
+
+        started = last_progress = time.perf_counter()
+        queued = iter(todo)
+        parsing, indexing = {}, {}
+        # spawn avoids forking a process that already holds Chroma/model threads
+        with ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=multiprocessing.get_context("spawn")) as parse_pool, \
+                ThreadPoolExecutor(max_workers=self.concurrent_documents, thread_name_prefix="bulk-index") as index_pool:
+            while True:
+                # Parsed PDFs waiting for an index thread count against the parse window
+                while len(parsing) + len(indexing) < self.parse_workers * 2 + self.concurrent_documents:
+                    path = next(queued, None)
+                    if path is None:
+                        break
+                    parsing[parse_pool.submit(parse_pdf, path, *self.chunk_options)] = path
+                if not parsing and not indexing:
+                    break
+
+                done, _ = wait([*parsing, *indexing], return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in parsing:
+                        path = parsing.pop(future)
+                        try:
+                            parsed = future.result()
+                        except Exception as e:
+                            logger.error(f"Could not parse {path}: {e}")
+                            self._finish(checkpoint, report, path, {"status": "failed", "error": f"Invalid PDF file: {e}"})
+                            continue
+                        indexing[index_pool.submit(self._index_file, path, parsed)] = path
+                    else:
+                        self._finish(checkpoint, report, indexing.pop(future), future.result())
+
+                now = time.perf_counter()
+                report["seconds"] = now - started
+                if on_progress and now - last_progress >= progress_interval:
+                    last_progress = now
+                    on_progress(report)
+
+        report["seconds"] = time.perf_counter() - started
+        return report
+
+    def _finish(self, checkpoint: Checkpoint, report: dict, path: str, result: dict):
+        checkpoint.record(path, **result)
+        report[{"indexed": "indexed", "duplicate": "duplicates", "failed": "failed"}[result["status"]]] += 1
+        report["pages"] += result.get("pages", 0)
+        report["chunks"] += result.get("chunks", 0)
+        if result["status"] == "failed":
+            report["failures"].append((path, result["error"]))
+
+    def _index_file(self, path: str, parsed: dict):
+        """
+        Creates the document row and indexes its chunks; returns the checkpoint record.
+        """
+        db = self.session_factory()
+        try:
+            content_hash, total_pages = parsed["content_hash"], parsed["total_pages"]
+            # A row left by an interrupted or failed run is indexed again rather than duplicated
+            doc = db.query(models.Document).filter(
+                models.Document.user_id == self.user_id,
+                models.Document.content_hash == content_hash,
+                models.Document.status.in_([models.DocumentStatus.PROCESSING, models.DocumentStatus.FAILED])
+            ).first()
+            if doc:
+                doc.status = models.DocumentStatus.PROCESSING
+                doc.error_message = None
+            else:
+                doc = models.Document(
+                    user_id=self.user_id,
+                    folder_id=self.folder_id,
+                    filename=os.path.basename(path),
+                    content_hash=content_hash,
+                    chunk_set_id=content_hash,
+                    page_count=total_pages,
+                    status=models.DocumentStatus.PROCESSING
+                )
+                duplicate = find_indexed_duplicate(db, content_hash)
+                if duplicate:
+                    link_to_duplicate(doc, duplicate)
+                    db.add(doc)
+                    db.commit()
+                    return {"status": "duplicate", "document_id": doc.id}
+                doc.file_path = self._store(path)
+                doc.vector_collection = self.rag_engine.router.route(doc)
+                db.add(doc)
+                db.commit()
+
+            # Keeps a running server's ingestion recovery off the row while it is indexed here
+            doc.ingest_owner, doc.ingest_heartbeat_at = f"bulk-ingest:{os.getpid()}", datetime.utcnow()
+            db.commit()
+            try:
+                added = self.rag_engine.add_document(
+                    doc.filename, parsed["chunks"], folder_id=doc.folder_id, chunk_set=doc.chunk_set_id,
+                    document_id=doc.id, user_id=doc.user_id, collection=doc.vector_collection
+                )
+            except Exception as e:
+                logger.error(f"Indexing failed for {path}: {e}")
+                doc.status = models.DocumentStatus.FAILED
+                doc.error_message = "Indexing failed."
+                doc.ingest_owner = doc.ingest_heartbeat_at = None
+                db.commit()
+                return {"status": "failed", "document_id": doc.id, "error": f"Indexing failed: {e}"}
+
+            doc.pages_parsed = total_pages
+            doc.chunk_count = doc.chunks_embedded = added
+            doc.status = models.DocumentStatus.READY
+            doc.ingest_owner = doc.ingest_heartbeat_at = None
+            db.commit()
+            return {"status": "indexed", "document_id": doc.id, "pages": total_pages, "chunks": added}
+        finally:
+            db.close()
+
+    def _store(self, path: str):
+        """
+        Copies the PDF into the upload directory, as an upload would be saved,
+        so deleting the document never touches the source tree.
+        """
+        os.makedirs(self.upload_dir, exist_ok=True)
+        file_path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex}.pdf")
+        shutil.copyfile(path, file_path)
+        return file_path
@@ -0,0 +1,240 @@
+import re
+import zlib
+from collections import namedtuple
+
+from config import settings
+from services.token_counter import TokenCounter
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+# A page whose text ends in anything else stops mid-sentence and continues on the next page
+SENTENCE_END = re.compile(r"[.!?:;][\"')\]]*$")
+# In a long paragraph, roughly one sentence in BOUNDARY_PERIOD ends a chunk that is a third full (see SentenceChunker)
+BOUNDARY_PERIOD = 4
+
+# A sentence (or piece of one) with the page it starts on and the separator that precedes it
+Unit = namedtuple("Unit", "text page separator length")
+
+
+class Chunker:
+    """
+    Turns page texts into chunks of {"page_number", "text"}, plus "page_end"
+    when a chunk spans pages. An instance holds the state of one document:
+    feed() it page shards in page order, then call finish().
+    """
+
+    def __init__(self, chunk_size: int = settings.MAX_CHUNK_SIZE,
+                 chunk_overlap: int = settings.CHUNK_OVERLAP):
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(f"CHUNK_OVERLAP must be at least 0 and below MAX_CHUNK_SIZE ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def feed(self, page_texts: list, first_page: int = 0):
+        """
+        Chunks the next pages; returns the chunks completed so far.
+        """
+        raise NotImplementedError
+
+    def finish(self):
+        """
+        Returns the chunks still held back at the end of the document.
+        """
+        return []
+
+    def chunk_pages(self, page_texts: list, first_page: int = 0):
+        return self.feed(page_texts, first_page) + self.finish()
+
+
+class FixedChunker(Chunker):
+    """
+    The original strategy: chunk_size-character slices of each page,
+    overlapping by chunk_overlap characters.
+    """
+
+    def feed(self, page_texts: list, first_page: int = 0):
+        chunks = []
+        for offset, text in enumerate(page_texts):
+            for start in range(0, len(text or ""), self.chunk_size - self.chunk_overlap):
+                chunks.append({"page_number": first_page + offset + 1, "text": text[start:start + self.chunk_size]})
+        return chunks
+
+
+class SentenceChunker(Chunker):
+    """
+    Packs whole sentences into chunks of at most chunk_size characters,
+    starting a new chunk at a paragraph break rather than splitting a
+    paragraph that would fit in one. Consecutive chunks share their last
+    sentences up to chunk_overlap, and text flows across page breaks, with a
+    sentence that continues onto the next page kept whole.
+
+    Only a sentence longer than chunk_size is split, at word boundaries.
+
+    Within a paragraph too long for one chunk, once a chunk is a third full,
+    a sentence whose hash falls in a fixed residue class ends it early.
+    Boundaries then depend on the text around them rather than on everything
+    before, so an edit only changes the chunks near it and re-indexing a
+    revised document can reuse the rest.
+    """
+
+    def __init__(self, chunk_size: int = settings.MAX_CHUNK_SIZE,
+                 chunk_overlap: int = settings.CHUNK_OVERLAP):
+        super().__init__(chunk_size, chunk_overlap)
+        self._units = []
+        self._size = 0
+        self._fresh = 0  # units not carried over from the previous chunk
+        self._pending = []  # sentences of the paragraph at the end of the last page fed
+        self._continued = False  # part of that paragraph has been added already
+        self._separator_length = self.length(" ")
+
+    def length(self, text: str):
+        return len(text)
+
+    def feed(self, page_texts: list, first_page: int = 0):
+        chunks = []
+        for offset, text in enumerate(page_texts):
+            page = first_page + offset
+            paragraphs = [" ".join(p.split()) for p in PARAGRAPH_BREAK.split(text or "") if p.strip()]
+            for index, paragraph in enumerate(paragraphs):
+                # A page break is not a paragraph break, so chunk text does not depend on pagination
+                sentences = [(sentence, page, "\n" if position == 0 and index > 0 else " ")
+                             for position, sentence in enumerate(SENTENCE_BREAK.split(paragraph))]
+                if index == 0 and self._pending:
+                    held, self._pending = self._pending, []
+                    if not SENTENCE_END.search(held[-1][0]):
+                        text_before, page_before, separator = held.pop()
+                        sentences[0] = (f"{text_before} {sentences[0][0]}", page_before, separator)
+                    sentences = held + sentences
+                if index == len(paragraphs) - 1:
+                    self._hold(sentences, chunks)
+                else:
+                    self._add_paragraph(sentences, chunks)
+                    self._continued = False
+        return chunks
+
+    def finish(self):
+        chunks = []
+        if self._pending:
+            self._add_paragraph(self._pending, chunks)
+            self._pending = []
+        if self._fresh:
+            chunks.append(self._chunk())
+        self._units, self._size, self._fresh, self._continued = [], 0, 0, False
+        return chunks
+
+    def _hold(self, sentences: list, chunks: list):
+        """
+        Keeps the last paragraph of a page back, since it may continue on the
+        next one. Once it is too long to start a chunk of its own, all but its
+        last sentence are added straight away.
+        """
+        held = sum(self.length(text) + self._separator_length for text, _, _ in sentences)
+        if held <= self.chunk_size - self.chunk_overlap:
+            self._pending = sentences
+            return
+        self._continued = True
+        last = sentences[-1]
+        if self.length(last[0]) < self.chunk_size:
+            sentences, self._pending = sentences[:-1], [last]
+        self._add_paragraph(sentences, chunks)
+
+    def _add_paragraph(self, sentences: list, chunks: list):
+        units = []
+        for text, page, separator in sentences:
+            for position, piece in enumerate(self._split_long(text)):
+                units.append(self._unit(piece, page, separator if position == 0 else " "))
+        total = sum(unit.length for unit in units)
+        fits = not self._continued and total <= self.chunk_size - self.chunk_overlap
+        # Start a paragraph that fits in a chunk of its own on a fresh chunk
+        if fits and self._fresh and self._size + total > self.chunk_size:
+            chunks.append(self._close())
+        for unit in units:
+            if self._size + unit.length > self.chunk_size:
+                if self._fresh:
+                    chunks.append(self._close())
+                if self._size + unit.length > self.chunk_size:
+                    self._units, self._size = [], 0
+            self._units.append(unit)
+            self._size += unit.length
+            self._fresh += 1
+            if not fits and self._size * 3 >= self.chunk_size and zlib.crc32(unit.text.encode("utf-8")) % BOUNDARY_PERIOD == 0:
+                chunks.append(self._close())
+
+    def _unit(self, text: str, page: int, separator: str):
+        return Unit(text, page, separator, self.length(text) + self._separator_length)
+
+    def _split_long(self, text: str):
+        """
+        Splits a sentence longer than chunk_size at word boundaries.
+        """
+        if self.length(text) + self._separator_length <= self.chunk_size:
+            return [text]
+        pieces, words, size = [], [], 0
+        for word in text.split(" "):
+            word_length = self.length(word) + self._separator_length
+            if word_length > self.chunk_size:
+                # A single word longer than a chunk: slice it, as the fixed chunker would
+                pieces.extend([" ".join(words)] if words else [])
+                step = max(1, self.chunk_size - self._separator_length)
+                pieces.extend(word[start:start + step] for start in range(0, len(word), step))
+                words, size = [], 0
+                continue
+            if size + word_length > self.chunk_size:
+                pieces.append(" ".join(words))
+                words, size = [], 0
+            words.append(word)
+            size += word_length
+        if words:
+            pieces.append(" ".join(words))
+        return pieces
+
+    def _close(self):
+        """
+        Emits the current chunk and keeps its trailing sentences, up to
+        chunk_overlap, to start the next one.
+        """
+        chunk = self._chunk()
+        carry, size = [], 0
+        for unit in reversed(self._units[1:]):
+            if size + unit.length > self.chunk_overlap:
+                break
+            carry.append(unit)
+            size += unit.length
+        self._units, self._size, self._fresh = carry[::-1], size, 0
+        return chunk
+
+    def _chunk(self):
+        units = self._units
+        chunk = {
+            "page_number": units[0].page + 1,
+            "text": units[0].text + "".join(unit.separator + unit.text for unit in units[1:]),
+        }
+        if units[-1].page != units[0].page:
+            chunk["page_end"] = units[-1].page + 1
+        return chunk
+
+
+class TokenChunker(SentenceChunker):
+    """
+    SentenceChunker with chunk_size and chunk_overlap counted in tokens of
+    TOKENIZER_MODEL rather than characters, so chunks line up with the
+    embedding model's input limit.
+    """
+
+    def __init__(self, chunk_size: int = settings.MAX_CHUNK_SIZE,
+                 chunk_overlap: int = settings.CHUNK_OVERLAP, token_counter: TokenCounter = None):
+        self.token_counter = token_counter or TokenCounter()
+        super().__init__(chunk_size, chunk_overlap)
+
+    def length(self, text: str):
+        return self.token_counter.count(text)
+
+
+CHUNKERS = {"fixed": FixedChunker, "sentence": SentenceChunker, "token": TokenChunker}
+
+
+def create_chunker(strategy: str = settings.CHUNK_STRATEGY, chunk_size: int = settings.MAX_CHUNK_SIZE,
+                   chunk_overlap: int = settings.CHUNK_OVERLAP):
+    if strategy not in CHUNKERS:
+        raise ValueError(f"Unknown CHUNK_STRATEGY '{strategy}', expected one of {tuple(CHUNKERS)}")
+    return CHUNKERS[strategy](chunk_size, chunk_overlap)
@@ -0,0 +1,102 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from config import settings
+
+logger = logging.getLogger("pdf-chatbot")
+
+DEFAULT_COLLECTION = "pdf_documents"
+STRATEGIES = ("single", "user", "folder", "hash")
+
+
+class CollectionRouter:
+    """
+    Decides which Chroma collection a document's vectors live in and keeps
+    open handles to recently used collections.
+
+    Strategies:
+      single - everything in the shared pdf_documents collection
+      user   - one collection per user
+      folder - one collection per folder, uncategorized documents per user
+      hash   - chunk sets spread over hash_shards collections
+
+    The chosen collection is recorded on the document (vector_collection), so
+    changing the strategy only affects new uploads until the vectors are
+    redistributed with `python cli.py reshard`.
+    """
+
+    def __init__(self, client, strategy: str = settings.VECTOR_SHARDING,
+                 hash_shards: int = settings.VECTOR_HASH_SHARDS,
+                 cache_size: int = settings.VECTOR_COLLECTION_CACHE_SIZE):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown VECTOR_SHARDING strategy '{strategy}', expected one of {STRATEGIES}")
+        self.client = client
+        self.strategy = strategy
+        self.hash_shards = hash_shards
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def collection_name(self, user_id: int = None, folder_id: int = None, chunk_set: str = None):
+        if self.strategy == "user":
+            return f"user_{user_id}"
+        if self.strategy == "folder":
+            return f"folder_{folder_id}" if folder_id else f"user_{user_id}"
+        if self.strategy == "hash":
+            shard = int(hashlib.sha256(chunk_set.encode("utf-8")).hexdigest()[:8], 16) % self.hash_shards
+            return f"shard_{shard:03d}"
+        return DEFAULT_COLLECTION
+
+    def route(self, doc):
+        """
+        Collection a new document's vectors should be written to.
+        """
+        return self.collection_name(doc.user_id, doc.folder_id, doc.chunk_set_id)
+
+    def get(self, name: str = None):
+        """
+        Returns a handle to the named collection, creating it on first use.
+        """
+        name = name or DEFAULT_COLLECTION
+        with self._lock:
+            handle = self._handles.get(name)
+            if handle is not None:
+                self._handles.move_to_end(name)
+                self.hits += 1
+                return handle
+            self.misses += 1
+
+        handle = self.client.get_or_create_collection(name=name, embedding_function=None)
+        with self._lock:
+            self._handles[name] = handle
+            self._handles.move_to_end(name)
+            while len(self._handles) > self.cache_size:
+                self._handles.popitem(last=False)
+        return handle
+
+    def names(self):
+        """
+        Every collection that currently exists in the Chroma store.
+        """
+        return [getattr(collection, "name", collection) for collection in self.client.list_collections()]
+
+    def drop(self, name: str):
+        with self._lock:
+            self._handles.pop(name, None)
+        self.client.delete_collection(name=name)
+        logger.info(f"Dropped empty vector collection {name}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "strategy": self.strategy,
+            "open_handles": len(self._handles),
+            "cache_size": self.cache_size,
+            "handle_hits": self.hits,
+            "handle_misses": self.misses,
+            "handle_hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
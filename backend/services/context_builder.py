@@ -0,0 +1,154 @@
+from config import settings
+from services.token_counter import TokenCounter, MESSAGE_OVERHEAD_TOKENS
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant. Use the provided context to answer the user's question. "
+    "If the answer is not in the context, say you don't know.\n\n"
+    "Format your response for maximum readability:\n"
+    "1. Use **bold text** for all key terms, names, dates, and important concepts.\n"
+    "2. Use bullet points or numbered lists for steps or multiple items.\n"
+    "3. Use tables for comparisons.\n"
+    "4. Ensure your response is well-structured and easy to scan."
+)
+NO_CONTEXT = "No relevant context found in the document."
+# Shorter shared edges between chunks are treated as coincidence, not overlap
+MIN_OVERLAP_CHARS = 20
+# Each summarised turn keeps at most this many tokens of its message
+SUMMARY_LINE_TOKENS = 40
+
+
+def overlap_length(first: str, second: str, min_chars: int = MIN_OVERLAP_CHARS):
+    """
+    Length of the longest suffix of first that is also a prefix of second,
+    as left by overlapping chunking; 0 when shorter than min_chars.
+    """
+    if len(first) < min_chars or len(second) < min_chars:
+        return 0
+    probe = second[:min_chars]
+    position = first.find(probe, max(0, len(first) - len(second)))
+    while position != -1:
+        if second.startswith(first[position:]):
+            return len(first) - position
+        position = first.find(probe, position + 1)
+    return 0
+
+
+class ContextBuilder:
+    """
+    Assembles the chat prompt within a token budget.
+
+    History gets up to history_tokens: the most recent turns verbatim and,
+    when older turns do not fit, a short extractive summary of them. The
+    retrieved chunks then fill what is left of max_prompt_tokens in rank
+    order. Chunks whose edges overlap an already packed chunk are joined
+    into one passage, so text shared by neighbouring chunks is sent once.
+    """
+
+    def __init__(self, token_counter: TokenCounter = None,
+                 max_prompt_tokens: int = settings.PROMPT_MAX_TOKENS,
+                 history_tokens: int = settings.HISTORY_MAX_TOKENS,
+                 summary_tokens: int = settings.HISTORY_SUMMARY_MAX_TOKENS):
+        self.token_counter = token_counter or TokenCounter()
+        self.max_prompt_tokens = max_prompt_tokens
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+
+    def build(self, query_text: str, results: dict, history: list = None):
+        """
+        Returns {"messages", "prompt_tokens", "used"}, where used lists the
+        indexes of the retrieved chunks that made it into the prompt.
+        """
+        count = self.token_counter.count
+        budget = (self.max_prompt_tokens - count(SYSTEM_PROMPT) - count(f"Context:\n\n\nQuestion: {query_text}")
+                  - 2 * MESSAGE_OVERHEAD_TOKENS)
+
+        history_messages = self.compact_history(history or [], max(0, min(self.history_tokens, budget)))
+        budget -= self.token_counter.count_messages(history_messages)
+        context, used = self.pack_context(results["documents"], budget)
+
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, *history_messages, {
+            "role": "user", "content": f"Context:\n{context or NO_CONTEXT}\n\nQuestion: {query_text}"
+        }]
+        return {"messages": messages, "prompt_tokens": self.token_counter.count_messages(messages), "used": used}
+
+    def compact_history(self, history: list, budget: int):
+        """
+        Chat messages for history, oldest first: as many recent turns as fit
+        in budget, preceded by a summary of the older ones if any are left out.
+        """
+        messages = [{"role": turn["role"].lower(), "content": turn["content"]} for turn in history]
+        if self.token_counter.count_messages(messages) <= budget:
+            return messages
+
+        summary_budget = min(self.summary_tokens, budget // 4)
+        recent, spent = [], 0
+        for message in reversed(messages):
+            cost = self.token_counter.count(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+            if spent + cost > budget - summary_budget:
+                break
+            recent.append(message)
+            spent += cost
+        recent.reverse()
+
+        summary = self.summarize(messages[:len(messages) - len(recent)], summary_budget - MESSAGE_OVERHEAD_TOKENS)
+        if summary:
+            return [{"role": "system", "content": summary}, *recent]
+        return recent
+
+    def summarize(self, messages: list, budget: int):
+        """
+        Extractive summary of older turns: the opening of each message,
+        newest turns kept first when the budget runs out.
+        """
+        header = "Summary of the earlier conversation:"
+        spent = self.token_counter.count(header)
+        lines = []
+        for message in reversed(messages):
+            text = " ".join(message["content"].split())
+            excerpt = self.token_counter.clip(text, SUMMARY_LINE_TOKENS)
+            if len(excerpt) < len(text):
+                excerpt += "..."
+            line = f"- {'User asked' if message['role'] == 'user' else 'Assistant answered'}: {excerpt}"
+            cost = self.token_counter.count(line)
+            if spent + cost > budget:
+                break
+            lines.append(line)
+            spent += cost
+        if not lines:
+            return ""
+        return "\n".join([header, *reversed(lines)])
+
+    def pack_context(self, documents: list, budget: int):
+        """
+        Joins the highest ranked chunks that fit in budget into context text.
+        Returns (text, indexes of the chunks included).
+        """
+        passages, used = [], []
+        spent = 0
+        separator = self.token_counter.count("\n\n")
+        for index, text in enumerate(documents):
+            if any(text in passage for passage in passages):
+                used.append(index)
+                continue
+
+            position, merged, added = None, None, text
+            for i, passage in enumerate(passages):
+                overlap = overlap_length(passage, text)
+                if overlap:
+                    position, merged, added = i, passage + text[overlap:], text[overlap:]
+                    break
+                overlap = overlap_length(text, passage)
+                if overlap:
+                    position, merged, added = i, text[:-overlap] + passage, text[:-overlap]
+                    break
+
+            cost = self.token_counter.count(added) + (separator if position is None and passages else 0)
+            if spent + cost > budget:
+                continue
+            if position is None:
+                passages.append(text)
+            else:
+                passages[position] = merged
+            used.append(index)
+            spent += cost
+        return "\n\n".join(passages), used
@@ -0,0 +1,146 @@
+import logging
+import os
+from collections import defaultdict
+
+import models
+from config import settings
+from services.collection_router import DEFAULT_COLLECTION
+
+logger = logging.getLogger("pdf-chatbot")
+
+
+def find_indexed_duplicate(db, content_hash: str, exclude_id: int = None):
+    """
+    Returns a READY document whose PDF bytes hash to content_hash, if any.
+    """
+    query = db.query(models.Document).filter(
+        models.Document.content_hash == content_hash,
+        models.Document.status == models.DocumentStatus.READY
+    )
+    if exclude_id is not None:
+        query = query.filter(models.Document.id != exclude_id)
+    return query.first()
+
+
+def link_to_duplicate(doc, source):
+    """
+    Points doc at the chunk set and stored file of an already indexed identical
+    document instead of parsing and embedding it again.
+    """
+    doc.chunk_set_id = source.chunk_set_id
+    doc.vector_collection = source.vector_collection
+    doc.file_path = source.file_path
+    doc.page_count = source.page_count
+    doc.pages_parsed = source.pages_parsed
+    doc.chunk_count = source.chunk_count
+    doc.chunks_embedded = source.chunks_embedded
+    doc.status = models.DocumentStatus.READY
+
+
+# Chunk metadata naming the document a chunk set was first indexed for
+OWNER_FIELDS = ("filename", "document_id", "user_id", "folder_id")
+
+
+def own_sources(sources: list, documents, user_id: int):
+    """
+    Rewrites chat sources in terms of the asking user's documents. A chunk set
+    is shared by every identical upload, so its metadata names whichever
+    document was indexed first, possibly another user's. documents are the
+    user's (chunk_set_id, id, filename, folder_id) rows in the chat's scope;
+    sources from any other chunk set lose their owner fields.
+    """
+    owners = {}
+    for chunk_set_id, document_id, filename, folder_id in documents:
+        owners.setdefault(chunk_set_id, {"filename": filename, "document_id": document_id,
+                                         "user_id": user_id, "folder_id": folder_id})
+    owned = []
+    for source in sources:
+        source = {key: value for key, value in source.items() if key not in OWNER_FIELDS}
+        owner = owners.get(source.get("chunk_set"), {})
+        source.update((key, value) for key, value in owner.items() if value is not None)
+        owned.append(source)
+    return owned
+
+
+def chunk_set_refcount(db, chunk_set_id: str):
+    return db.query(models.Document).filter(models.Document.chunk_set_id == chunk_set_id).count()
+
+
+def chat_scope(rows):
+    """
+    Groups (chunk_set_id, vector_collection) rows into the {collection: [chunk sets]}
+    scope RAGEngine.retrieve searches. Rows without a chunk set are skipped.
+    """
+    scope = defaultdict(list)
+    for chunk_set_id, vector_collection in rows:
+        if chunk_set_id and chunk_set_id not in scope[vector_collection or DEFAULT_COLLECTION]:
+            scope[vector_collection or DEFAULT_COLLECTION].append(chunk_set_id)
+    return dict(scope)
+
+
+def delete_document(db, doc):
+    """
+    Deletes a document row. Returns the vectors and stored files no other
+    document still references, for drop_unreferenced to remove. Dropping
+    them needs no session, so async handlers can run it off the event loop.
+    """
+    document_id, chunk_set_id, file_path = doc.id, doc.chunk_set_id, doc.file_path
+    collection, pending_file_path = doc.vector_collection, doc.pending_file_path
+    db.delete(doc)
+    db.commit()
+
+    chunk_set_unused = not chunk_set_id or chunk_set_refcount(db, chunk_set_id) == 0
+    return {
+        "chunk_set": (chunk_set_id, collection, document_id) if chunk_set_unused else None,
+        "files": [path for path in (file_path, pending_file_path) if file_unused(db, path)],
+    }
+
+
+def drop_unreferenced(rag_engine, unreferenced: dict):
+    if unreferenced["chunk_set"]:
+        drop_chunk_set(rag_engine, *unreferenced["chunk_set"])
+    for file_path in unreferenced["files"]:
+        remove_file(file_path)
+
+
+def release_chunk_set(db, rag_engine, chunk_set_id: str, collection: str, document_id: int = None):
+    """
+    Drops the vectors of a chunk set no document references any more.
+    """
+    if not chunk_set_id or chunk_set_refcount(db, chunk_set_id) == 0:
+        drop_chunk_set(rag_engine, chunk_set_id, collection, document_id)
+
+
+def drop_chunk_set(rag_engine, chunk_set_id: str, collection: str, document_id: int = None):
+    """
+    Legacy documents without a chunk set have their vectors dropped by document id.
+    """
+    if chunk_set_id:
+        rag_engine.delete_chunk_set(chunk_set_id, collection)
+    elif document_id is not None:
+        rag_engine.delete_document_vectors(document_id, collection)
+
+
+def release_file(db, file_path: str):
+    """
+    Removes a stored upload once no document, or pending replacement, uses it.
+    """
+    if file_unused(db, file_path):
+        remove_file(file_path)
+
+
+def file_unused(db, file_path: str) -> bool:
+    # Only files this app spooled are removed; legacy rows stored a bare filename
+    upload_dir = os.path.abspath(settings.UPLOAD_DIR)
+    if not file_path or os.path.dirname(os.path.abspath(file_path)) != upload_dir or not os.path.exists(file_path):
+        return False
+    return not db.query(models.Document).filter(
+        (models.Document.file_path == file_path) | (models.Document.pending_file_path == file_path)
+    ).count()
+
+
+def remove_file(file_path: str):
+    try:
+        os.remove(file_path)
+    except OSError as e:
+        logger.warning(f"Could not remove stored file {file_path}: {e}")
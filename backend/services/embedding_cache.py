@@ -0,0 +1,127 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+from config import settings
+
+
+def chunk_hash(text: str):
+    """
+    sha256 of the chunk text with unicode and whitespace normalised, so
+    re-extractions that only differ in spacing share an entry.
+    """
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk store of embeddings keyed by (model name, chunk hash).
+
+    Vectors are stored as float32 blobs in SQLite (WAL mode, so every worker
+    process can share the file). Entries carry a last-used timestamp and the
+    least recently used ones are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, path: str = settings.EMBEDDING_CACHE_PATH,
+                 max_entries: int = settings.EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: list):
+        """
+        Returns {index: vector} for every text already in the cache.
+        """
+        hashes = [chunk_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            unique = list(set(hashes))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *part]
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE model = ? AND hash IN ({placeholders})",
+                        [time.time(), model, *part]
+                    )
+            self._conn.commit()
+
+            hits = {i: found[h] for i, h in enumerate(hashes) if h in found}
+            self.hits += len(hits)
+            self.misses += len(texts) - len(hits)
+        return hits
+
+    def put_many(self, model: str, texts: list, vectors: list):
+        now = time.time()
+        rows = [
+            (model, chunk_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._size += self._conn.total_changes - before
+            if self._size > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Other worker processes write to the same file, so recount before trimming
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        # Trim an extra 5% so eviction does not run on every insert once full
+        excess = self._size - int(self.max_entries * 0.95)
+        if excess <= 0:
+            return
+        cursor = self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        self._size -= cursor.rowcount
+        self.evictions += cursor.rowcount
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
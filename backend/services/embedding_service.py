@@ -0,0 +1,169 @@
+import asyncio
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from config import settings
+from services.embedding_cache import EmbeddingCache
+from services.metrics import RollingStats
+
+logger = logging.getLogger("pdf-chatbot")
+
+QUERY_PRIORITY = 0
+DOCUMENT_PRIORITY = 1
+
+
+def resolve_device(device: str):
+    """
+    Maps "auto" to the best available torch device.
+    """
+    if device != "auto":
+        return device
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda"
+        if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+            return "mps"
+    except ImportError:
+        pass
+    return "cpu"
+
+
+class EmbeddingService:
+    """
+    Embeds text for every caller in the process through one model instance.
+
+    Requests from concurrent callers are coalesced into micro-batches of up to
+    max_batch_size texts, waiting at most max_wait_ms for a batch to fill. The
+    model runs on a dedicated thread, so async callers never block the event
+    loop, and query requests are served ahead of document chunks.
+
+    Document chunks are looked up in the EmbeddingCache first, so re-ingesting
+    known content does no model forward passes.
+    """
+
+    def __init__(self, model_name: str = settings.EMBEDDING_MODEL,
+                 device: str = settings.EMBEDDING_DEVICE,
+                 max_batch_size: int = settings.EMBEDDING_MAX_BATCH_SIZE,
+                 max_wait_ms: float = settings.EMBEDDING_MAX_WAIT_MS,
+                 cache: EmbeddingCache = None):
+        self.model_name = model_name
+        self.cache = cache
+        self.device = resolve_device(device)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._model = None
+        self._requests = queue.PriorityQueue()
+        self._sequence = itertools.count()
+
+        self.batch_sizes = RollingStats()
+        self.queue_latency_ms = RollingStats()
+        self.encode_latency_ms = RollingStats()
+
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: list, priority: int = DOCUMENT_PRIORITY) -> Future:
+        """
+        Queues texts for embedding; the future resolves to one vector per text.
+        """
+        future = Future()
+        if not texts:
+            future.set_result([])
+            return future
+        self._requests.put((priority, next(self._sequence), list(texts), future, time.perf_counter()))
+        return future
+
+    def embed_documents(self, texts: list):
+        if self.cache is None:
+            return self.submit(texts, DOCUMENT_PRIORITY).result()
+
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = [i for i in range(len(texts)) if i not in vectors]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self.submit(missing_texts, DOCUMENT_PRIORITY).result()
+            self.cache.put_many(self.model_name, missing_texts, computed)
+            vectors.update(zip(missing, computed))
+        return [vectors[i] for i in range(len(texts))]
+
+    def embed_query(self, text: str):
+        return self.submit([text], QUERY_PRIORITY).result()[0]
+
+    async def aembed_query(self, text: str):
+        return (await asyncio.wrap_future(self.submit([text], QUERY_PRIORITY)))[0]
+
+    def metrics(self):
+        return {
+            "model": self.model_name,
+            "device": self.device,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self._requests.qsize(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_latency_ms": self.queue_latency_ms.snapshot(),
+            "encode_latency_ms": self.encode_latency_ms.snapshot(),
+            "cache": self.cache.stats() if self.cache else None,
+        }
+
+    def _load_model(self):
+        from sentence_transformers import SentenceTransformer
+        logger.info(f"Loading embedding model {self.model_name} on {self.device}")
+        return SentenceTransformer(self.model_name, device=self.device)
+
+    def _next_batch(self):
+        """
+        Blocks for the first request, then gathers more until the batch is full
+        or max_wait has elapsed since the first one arrived.
+        """
+        batch = [self._requests.get()]
+        size = len(batch[0][2])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request[2])
+        return batch
+
+    def _run(self):
+        while True:
+            # Callers that gave up (a cancelled aembed_query) are dropped; the
+            # rest can no longer be cancelled, so they are safe to resolve
+            batch = [request for request in self._next_batch() if request[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            texts = [text for request in batch for text in request[2]]
+            try:
+                if self._model is None:
+                    self._model = self._load_model()
+                vectors = self._model.encode(
+                    texts, batch_size=self.max_batch_size, convert_to_numpy=True
+                ).tolist()
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+                for request in batch:
+                    if not request[3].done():
+                        request[3].set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            self.batch_sizes.observe(len(texts))
+            self.encode_latency_ms.observe((finished - started) * 1000)
+
+            offset = 0
+            for _, _, request_texts, future, enqueued in batch:
+                self.queue_latency_ms.observe((started - enqueued) * 1000)
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(request_texts)])
+                offset += len(request_texts)
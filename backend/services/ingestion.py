@@ -0,0 +1,421 @@
+import asyncio
+import functools
+import logging
+from collections import deque
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+
+import models
+from config import settings
+from database import SessionLocal
+from services.pdf_processor import extract_page_range
+from services.document_store import find_indexed_duplicate, link_to_duplicate, release_chunk_set, release_file
+
+logger = logging.getLogger("pdf-chatbot")
+
+
+def new_progress():
+    return {"pages_parsed": 0, "chunks_embedded": 0, "chunks_reused": 0, "total_chunks": None}
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the ingestion queue has reached its depth limit."""
+
+
+class IndexingError(Exception):
+    """Wraps failures from the embedding/indexing stage."""
+
+
+class IngestionQueue:
+    """
+    Drives uploaded documents from PROCESSING to READY/FAILED in the background.
+
+    Parsing runs in a process pool so large PDFs never hold the event loop or the
+    GIL. Up to concurrent_documents documents are indexed at once, each with its
+    own embedding/indexing thread: while one document parses or writes to
+    Chroma, the others' batches keep the model busy, and the EmbeddingService
+    coalesces them (including each document's short final batch) into full
+    micro-batches on its single model thread.
+
+    Database queries and commits run on a thread per concurrent document, so
+    no MySQL round trip holds up requests on the event loop.
+
+    Every gunicorn worker runs a queue. A document is claimed on its row
+    (ingest_owner) before it is ingested, and the claim's heartbeat is
+    refreshed as batches finish, so only one worker ingests it; a claim
+    whose heartbeat is older than lease_seconds is taken over by recovery.
+    """
+
+    def __init__(self, pdf_processor, rag_engine,
+                 max_depth: int = settings.INGEST_QUEUE_MAX_DEPTH,
+                 parse_workers: int = settings.INGEST_PARSE_WORKERS,
+                 embed_batch_size: int = settings.INGEST_EMBED_BATCH_SIZE,
+                 concurrent_documents: int = settings.INGEST_CONCURRENT_DOCUMENTS,
+                 progress_save_seconds: float = settings.INGEST_PROGRESS_SAVE_SECONDS,
+                 lease_seconds: int = settings.INGEST_LEASE_SECONDS):
+        self.pdf_processor = pdf_processor
+        self.rag_engine = rag_engine
+        self.max_depth = max_depth
+        self.parse_workers = parse_workers
+        self.embed_batch_size = embed_batch_size
+        self.concurrent_documents = max(1, concurrent_documents)
+        self.progress_save_seconds = progress_save_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"[-64:]
+        self._queue = asyncio.Queue()
+        self._workers = []
+        self._sweeper = None
+        self._progress = {}
+        self._parse_pool = None
+        self._embed_pool = None
+        self._db_pool = None
+
+    async def start(self):
+        # spawn avoids forking a process that already holds Chroma/model threads
+        self._parse_pool = ProcessPoolExecutor(
+            max_workers=self.parse_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._embed_pool = ThreadPoolExecutor(max_workers=self.concurrent_documents, thread_name_prefix="embed")
+        self._db_pool = ThreadPoolExecutor(max_workers=self.concurrent_documents, thread_name_prefix="ingest-db")
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrent_documents)]
+        self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        tasks = self._workers + ([self._sweeper] if self._sweeper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers, self._sweeper = [], None
+        if self._parse_pool:
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+        if self._embed_pool:
+            self._embed_pool.shutdown(wait=False, cancel_futures=True)
+        if self._db_pool:
+            self._db_pool.shutdown(wait=False, cancel_futures=True)
+
+    def is_full(self) -> bool:
+        return self._queue.qsize() >= self.max_depth
+
+    def enqueue(self, document_id: int):
+        if self.is_full():
+            raise IngestionQueueFull()
+        self._progress[document_id] = new_progress()
+        self._queue.put_nowait(document_id)
+
+    def recover(self):
+        """
+        Claims and re-enqueues documents left in PROCESSING, or with a
+        replacement pending, by a previous crash or restart. Documents another
+        live worker holds are left to it.
+        Recovery bypasses the depth limit so no interrupted upload is dropped.
+        """
+        claimed = self._claim_pending()
+        self._requeue(claimed)
+        return len(claimed)
+
+    async def _sweep(self):
+        # Picks up documents whose worker died, once their claim goes stale
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                claimed = await self._run_db(self._claim_pending)
+            except Exception as e:
+                logger.warning(f"Could not recover pending ingestions: {e}")
+                continue
+            if claimed:
+                logger.info(f"Re-enqueued {len(claimed)} document(s) abandoned by another worker.")
+            self._requeue(claimed)
+
+    def _requeue(self, document_ids):
+        for document_id in document_ids:
+            self._progress[document_id] = new_progress()
+            self._queue.put_nowait(document_id)
+
+    def _claimable(self):
+        stale = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        return or_(models.Document.ingest_owner.is_(None), models.Document.ingest_owner == self.owner,
+                   models.Document.ingest_heartbeat_at < stale)
+
+    def _claim_pending(self):
+        db = SessionLocal()
+        try:
+            pending = db.query(models.Document.id).filter(
+                (models.Document.status == models.DocumentStatus.PROCESSING) |
+                models.Document.pending_content_hash.isnot(None),
+                self._claimable()
+            ).all()
+            return [document_id for (document_id,) in pending
+                    if document_id not in self._progress and self._claim(db, document_id)]
+        finally:
+            db.close()
+
+    def _claim(self, db, document_id: int) -> bool:
+        """
+        Takes the document for this worker unless another live worker holds
+        it; the conditional UPDATE lets only one of several racing workers win.
+        """
+        claimed = db.query(models.Document).filter(
+            models.Document.id == document_id, self._claimable()
+        ).update({models.Document.ingest_owner: self.owner, models.Document.ingest_heartbeat_at: datetime.utcnow()},
+                 synchronize_session=False)
+        db.commit()
+        return claimed == 1
+
+    def _release(self, db, document_id: int):
+        db.rollback()
+        db.query(models.Document).filter(
+            models.Document.id == document_id, models.Document.ingest_owner == self.owner
+        ).update({models.Document.ingest_owner: None, models.Document.ingest_heartbeat_at: None},
+                 synchronize_session=False)
+        db.commit()
+
+    def progress(self, document_id: int):
+        """
+        Returns live progress for a document currently owned by this process, if any.
+        """
+        return self._progress.get(document_id)
+
+    async def _worker(self):
+        while True:
+            document_id = await self._queue.get()
+            try:
+                await self._ingest(document_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion worker error for document {document_id}: {e}", exc_info=True)
+            finally:
+                self._progress.pop(document_id, None)
+                self._queue.task_done()
+
+    async def _run_db(self, function, *args, **kwargs):
+        """
+        Runs a blocking call on a session (queries, commits, releasing files)
+        on the ingestion's database threads.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._db_pool, functools.partial(function, *args, **kwargs)
+        )
+
+    async def _ingest(self, document_id: int):
+        loop = asyncio.get_running_loop()
+        # Attributes are read on the loop after commits, which must not reload them from MySQL
+        db = SessionLocal(expire_on_commit=False)
+        claimed = False
+        try:
+            claimed = await self._run_db(self._claim, db, document_id)
+            if not claimed:
+                logger.info(f"Document {document_id} is being ingested by another worker.")
+                return
+            doc = await self._run_db(lambda: db.query(models.Document).filter(models.Document.id == document_id).first())
+            if doc and doc.pending_content_hash and doc.status == models.DocumentStatus.READY:
+                await self._replace(db, doc)
+                return
+            if not doc or doc.status != models.DocumentStatus.PROCESSING:
+                return
+
+            # An identical file may have finished indexing since this one was queued
+            duplicate = doc.content_hash and await self._run_db(
+                find_indexed_duplicate, db, doc.content_hash, exclude_id=doc.id
+            )
+            if duplicate:
+                link_to_duplicate(doc, duplicate)
+                await self._run_db(db.commit)
+                logger.info(f"Document {document_id} linked to identical document {duplicate.id}.")
+                return
+            if not doc.file_path or not os.path.exists(doc.file_path):
+                await self._run_db(self._fail, db, doc, "Uploaded file is missing.")
+                return
+
+            progress = self._progress.setdefault(document_id, new_progress())
+
+            try:
+                total_pages = await loop.run_in_executor(
+                    self._parse_pool, self.pdf_processor.count_pages, doc.file_path
+                )
+                doc.page_count = total_pages
+                await self._run_db(db.commit)
+            except Exception as e:
+                logger.error(f"PDF processing failed for document {document_id}: {e}")
+                await self._run_db(self._fail, db, doc, "Invalid PDF file or processing error.")
+                return
+
+            try:
+                await self._index(doc, doc.file_path, doc.chunk_set_id, doc.vector_collection, total_pages, progress,
+                                  on_batch=self._progress_saver(db, doc, progress))
+            except IndexingError as e:
+                logger.error(f"Indexing failed for {doc.filename}: {e.__cause__}")
+                await self._run_db(self._fail, db, doc, "Indexing failed.")
+                return
+            except Exception as e:
+                logger.error(f"PDF processing failed for document {document_id}: {e}")
+                await self._run_db(self._fail, db, doc, "Invalid PDF file or processing error.")
+                return
+
+            progress["total_chunks"] = progress["chunks_embedded"]
+            doc.pages_parsed = progress["pages_parsed"]
+            doc.chunk_count = progress["chunks_embedded"]
+            doc.chunks_embedded = progress["chunks_embedded"]
+            doc.status = models.DocumentStatus.READY
+            await self._run_db(db.commit)
+            logger.info(f"Document {document_id} ingested: {doc.page_count} pages, {doc.chunk_count} chunks.")
+        finally:
+            try:
+                if claimed:
+                    await self._run_db(self._release, db, document_id)
+            finally:
+                await self._run_db(db.close)
+
+    def _progress_saver(self, db, doc, progress: dict):
+        """
+        Returns a callback that refreshes the document's claim and, for a new
+        upload, copies progress onto its row for status polls answered by other
+        workers; it writes at most every progress_save_seconds.
+        """
+        saved_at = time.monotonic()
+
+        async def save():
+            nonlocal saved_at
+            if time.monotonic() - saved_at < self.progress_save_seconds:
+                return
+            doc.ingest_heartbeat_at = datetime.utcnow()
+            # A replacement keeps the current version's counters until it flips
+            if doc.status == models.DocumentStatus.PROCESSING:
+                doc.pages_parsed = progress["pages_parsed"]
+                doc.chunks_embedded = progress["chunks_embedded"]
+            await self._run_db(db.commit)
+            saved_at = time.monotonic()
+        return save
+
+    async def _replace(self, db, doc):
+        """
+        Indexes a replacement upload as a new chunk set next to the current
+        one, copying the embeddings of chunks whose text is unchanged, then
+        flips the document to it in a single commit and releases the previous
+        version. Chat keeps using the current version until the flip.
+        """
+        loop = asyncio.get_running_loop()
+        new_path, new_hash = doc.pending_file_path, doc.pending_content_hash
+        previous_set, previous_collection, previous_path = doc.chunk_set_id, doc.vector_collection, doc.file_path
+        progress = self._progress.setdefault(doc.id, new_progress())
+
+        duplicate = await self._run_db(find_indexed_duplicate, db, new_hash, exclude_id=doc.id)
+        if duplicate:
+            link_to_duplicate(doc, duplicate)
+        else:
+            if not new_path or not os.path.exists(new_path):
+                await self._run_db(self._fail_replacement, db, doc, "Replacement file is missing.")
+                return
+            collection = self.rag_engine.router.collection_name(doc.user_id, doc.folder_id, new_hash)
+            try:
+                total_pages = await loop.run_in_executor(self._parse_pool, self.pdf_processor.count_pages, new_path)
+                await self._index(doc, new_path, new_hash, collection, total_pages, progress,
+                                  reuse_from=(previous_set, previous_collection) if previous_set else None,
+                                  on_batch=self._progress_saver(db, doc, progress))
+            except Exception as e:
+                logger.error(f"Replacement of document {doc.id} failed: {e.__cause__ or e}")
+                await self._run_db(self._fail_replacement, db, doc, "Replacement failed: invalid PDF file or indexing error.")
+                return
+            doc.chunk_set_id = new_hash
+            doc.vector_collection = collection
+            doc.file_path = new_path
+            doc.page_count = total_pages
+            doc.pages_parsed = progress["pages_parsed"]
+            doc.chunk_count = doc.chunks_embedded = progress["chunks_embedded"]
+
+        doc.content_hash = new_hash
+        doc.pending_file_path = doc.pending_content_hash = None
+        doc.error_message = None
+        await self._run_db(db.commit)
+
+        # Deleting the previous version's vectors from Chroma takes a while for a large document
+        await self._run_db(release_chunk_set, db, self.rag_engine, previous_set, previous_collection, doc.id)
+        await self._run_db(release_file, db, previous_path)
+        await self._run_db(release_file, db, new_path)
+        logger.info(
+            f"Document {doc.id} replaced: {doc.chunk_count} chunks, "
+            f"{progress.get('chunks_reused', 0)} embeddings reused"
+            + (f", linked to identical document {duplicate.id}." if duplicate else ".")
+        )
+
+    async def _index(self, doc, file_path: str, chunk_set: str, collection: str, total_pages: int,
+                     progress: dict, reuse_from: tuple = None, on_batch=None):
+        """
+        Streams page shards into fixed-size embedding batches; only one batch of
+        chunks and a bounded window of page shards are ever held in memory.
+        on_batch, if given, is awaited after each batch is indexed.
+        """
+        batch = []
+        chunker = self.pdf_processor.new_chunker()
+        async for first_page, page_texts in self._iter_page_shards(file_path, total_pages):
+            progress["pages_parsed"] += len(page_texts)
+            batch.extend(chunker.feed(page_texts, first_page))
+            while len(batch) >= self.embed_batch_size:
+                await self._embed(doc, batch[:self.embed_batch_size], progress, chunk_set, collection, reuse_from)
+                batch = batch[self.embed_batch_size:]
+                if on_batch:
+                    await on_batch()
+        batch.extend(chunker.finish())
+        if batch:
+            await self._embed(doc, batch, progress, chunk_set, collection, reuse_from)
+
+    async def _iter_page_shards(self, file_path: str, total_pages: int):
+        """
+        Extracts page shards on the parse pool and yields them in page order,
+        keeping at most two shards per pool process, shared between the
+        documents being indexed, in flight.
+        """
+        loop = asyncio.get_running_loop()
+        ranges = iter(self.pdf_processor.page_ranges(total_pages))
+        pending = deque()
+        window = max(1, self.parse_workers * 2 // self.concurrent_documents)
+        try:
+            for start, end in ranges:
+                pending.append((start, loop.run_in_executor(self._parse_pool, extract_page_range, file_path, start, end)))
+                if len(pending) >= window:
+                    break
+            while pending:
+                start, shard = pending.popleft()
+                next_range = next(ranges, None)
+                if next_range:
+                    pending.append((next_range[0], loop.run_in_executor(self._parse_pool, extract_page_range, file_path, *next_range)))
+                yield start, await shard
+        finally:
+            for _, shard in pending:
+                shard.cancel()
+
+    async def _embed(self, doc, chunks: list, progress: dict, chunk_set: str, collection: str,
+                     reuse_from: tuple = None):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._embed_pool,
+                lambda: self.rag_engine.add_document(
+                    doc.filename, chunks, folder_id=doc.folder_id,
+                    chunk_set=chunk_set, document_id=doc.id, user_id=doc.user_id,
+                    collection=collection, reuse_from=reuse_from, progress=progress
+                )
+            )
+        except Exception as e:
+            raise IndexingError() from e
+        progress["chunks_embedded"] += len(chunks)
+
+    def _fail(self, db, doc, message: str):
+        doc.status = models.DocumentStatus.FAILED
+        doc.error_message = message
+        db.commit()
+
+    def _fail_replacement(self, db, doc, message: str):
+        # The current version stays READY; only the replacement is dropped
+        pending_path = doc.pending_file_path
+        doc.pending_file_path = doc.pending_content_hash = None
+        doc.error_message = message
+        db.commit()
+        release_file(db, pending_path)
@@ -0,0 +1,220 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from config import settings
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+SEPARATORS = re.compile(r"[-_./:]")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from has have how i if in is it its me my no not of on or "
+    "our so that the their there these this to was we were what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str):
+    """
+    Lower-cased word tokens without stopwords. Identifiers such as
+    INV-2024-0042 or 7.3.2 are kept whole as well as split into their parts,
+    so both exact and partial references match.
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).casefold()):
+        parts = SEPARATORS.split(match)
+        if len(parts) > 1:
+            tokens.append(match)
+        tokens.extend(part for part in parts if part not in STOPWORDS)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    On-disk BM25 inverted index over chunk text, kept next to Chroma.
+
+    Postings are stored per (term, chunk set, write batch) as packed numpy
+    arrays of chunk row ids, term frequencies and chunk lengths, so a query
+    scores candidates without touching the chunks table and a chunk set can
+    be added or dropped without rebuilding anything. Document frequencies and
+    corpus totals are maintained incrementally alongside.
+    """
+
+    def __init__(self, path: str = settings.LEXICAL_INDEX_PATH, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL UNIQUE,
+                chunk_set TEXT NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_chunk_set ON chunks (chunk_set);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                chunk_set TEXT NOT NULL,
+                chunk_rows BLOB NOT NULL,
+                tfs BLOB NOT NULL,
+                lengths BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_postings_term_chunk_set ON postings (term, chunk_set);
+            CREATE INDEX IF NOT EXISTS idx_postings_chunk_set ON postings (chunk_set);
+            CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO totals (name, value) VALUES ('chunks', 0), ('tokens', 0);
+        """)
+        self._conn.commit()
+
+    def add(self, chunk_set: str, chunk_ids: list, texts: list):
+        """
+        Indexes one batch of chunks. Chunk ids already in the index are
+        skipped, so re-running an ingestion is idempotent.
+        """
+        with self._lock:
+            existing = set()
+            for start in range(0, len(chunk_ids), 500):
+                part = chunk_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT chunk_id FROM chunks WHERE chunk_id IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                existing.update(chunk_id for (chunk_id,) in rows)
+
+            postings = defaultdict(list)
+            total_tokens = 0
+            added = 0
+            for chunk_id, text in zip(chunk_ids, texts):
+                if chunk_id in existing:
+                    continue
+                existing.add(chunk_id)
+                tokens = tokenize(text)
+                row = self._conn.execute(
+                    "INSERT INTO chunks (chunk_id, chunk_set, length) VALUES (?, ?, ?)",
+                    (chunk_id, chunk_set, len(tokens))
+                ).lastrowid
+                for term, tf in Counter(tokens).items():
+                    postings[term].append((row, min(tf, 65535), min(len(tokens), 65535)))
+                total_tokens += len(tokens)
+                added += 1
+
+            if added:
+                self._conn.executemany(
+                    "INSERT INTO postings (term, chunk_set, chunk_rows, tfs, lengths) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (term, chunk_set,
+                         np.array([p[0] for p in entries], dtype=np.uint32).tobytes(),
+                         np.array([p[1] for p in entries], dtype=np.uint16).tobytes(),
+                         np.array([p[2] for p in entries], dtype=np.uint16).tobytes())
+                        for term, entries in postings.items()
+                    ]
+                )
+                self._conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                    [(term, len(entries)) for term, entries in postings.items()]
+                )
+                self._update_totals(added, total_tokens)
+            self._conn.commit()
+        return added
+
+    def remove_chunk_set(self, chunk_set: str):
+        with self._lock:
+            df_changes = Counter()
+            for term, chunk_rows in self._conn.execute(
+                "SELECT term, chunk_rows FROM postings WHERE chunk_set = ?", (chunk_set,)
+            ):
+                df_changes[term] += len(chunk_rows) // 4
+            removed, tokens = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks WHERE chunk_set = ?", (chunk_set,)
+            ).fetchone()
+
+            self._conn.executemany("UPDATE terms SET df = df - ? WHERE term = ?",
+                                   [(count, term) for term, count in df_changes.items()])
+            self._conn.execute("DELETE FROM terms WHERE df <= 0")
+            self._conn.execute("DELETE FROM postings WHERE chunk_set = ?", (chunk_set,))
+            self._conn.execute("DELETE FROM chunks WHERE chunk_set = ?", (chunk_set,))
+            self._update_totals(-removed, -tokens)
+            self._conn.commit()
+        return removed
+
+    def search(self, query_text: str, chunk_sets: list, limit: int = 20):
+        """
+        Returns up to limit (chunk_id, chunk_set, score) tuples, best first,
+        scored with BM25 over chunks of the given chunk sets.
+        """
+        terms = sorted(set(tokenize(query_text)))
+        if not terms or not chunk_sets:
+            return []
+
+        with self._lock:
+            total_chunks, total_tokens = self._totals()
+            if not total_chunks:
+                return []
+            term_placeholders = ",".join("?" * len(terms))
+            df = dict(self._conn.execute(
+                f"SELECT term, df FROM terms WHERE term IN ({term_placeholders})", terms
+            ).fetchall())
+
+            rows, scores = [], []
+            average_length = total_tokens / total_chunks
+            for start in range(0, len(chunk_sets), 500):
+                part = list(chunk_sets[start:start + 500])
+                for term, chunk_rows, tfs, lengths in self._conn.execute(
+                    f"SELECT term, chunk_rows, tfs, lengths FROM postings "
+                    f"WHERE term IN ({term_placeholders}) AND chunk_set IN ({','.join('?' * len(part))})",
+                    terms + part
+                ):
+                    n = df.get(term, 0)
+                    idf = math.log(1 + (total_chunks - n + 0.5) / (n + 0.5))
+                    tf = np.frombuffer(tfs, dtype=np.uint16).astype(np.float32)
+                    length = np.frombuffer(lengths, dtype=np.uint16).astype(np.float32)
+                    rows.append(np.frombuffer(chunk_rows, dtype=np.uint32))
+                    scores.append(idf * tf * (self.k1 + 1) /
+                                  (tf + self.k1 * (1 - self.b + self.b * length / average_length)))
+            if not rows:
+                return []
+
+            # Sum the per-term contributions of each chunk
+            unique_rows, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+            totals = np.bincount(inverse, weights=np.concatenate(scores))
+            best = np.argsort(-totals)[:limit]
+            top_rows = [int(unique_rows[i]) for i in best]
+            details = {
+                row: (chunk_id, chunk_set) for row, chunk_id, chunk_set in self._conn.execute(
+                    f"SELECT id, chunk_id, chunk_set FROM chunks WHERE id IN ({','.join('?' * len(top_rows))})",
+                    top_rows
+                )
+            }
+        return [(*details[row], float(totals[i])) for row, i in zip(top_rows, best) if row in details]
+
+    def chunk_sets(self):
+        with self._lock:
+            return [chunk_set for (chunk_set,) in self._conn.execute("SELECT DISTINCT chunk_set FROM chunks")]
+
+    def stats(self):
+        with self._lock:
+            total_chunks, total_tokens = self._totals()
+            terms = self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return {
+            "chunks": total_chunks,
+            "terms": terms,
+            "average_chunk_tokens": round(total_tokens / total_chunks, 1) if total_chunks else 0.0,
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def _totals(self):
+        totals = dict(self._conn.execute("SELECT name, value FROM totals").fetchall())
+        return totals["chunks"], totals["tokens"]
+
+    def _update_totals(self, chunks: int, tokens: int):
+        self._conn.executemany("UPDATE totals SET value = value + ? WHERE name = ?",
+                               [(chunks, "chunks"), (tokens, "tokens")])
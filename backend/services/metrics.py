@@ -0,0 +1,41 @@
+from collections import deque
+import threading
+
+
+class RollingStats:
+    """
+    Lifetime count/mean plus percentiles over the most recent `window` observations.
+    """
+
+    def __init__(self, window: int = 1024):
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        with self._lock:
+            self._recent.append(value)
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def snapshot(self, digits: int = 2):
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total, maximum = self.count, self.total, self.max
+
+        def percentile(p):
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))]
+
+        return {
+            "count": count,
+            "mean": round(total / count, digits) if count else 0.0,
+            "p50": round(percentile(0.50), digits),
+            "p95": round(percentile(0.95), digits),
+            "p99": round(percentile(0.99), digits),
+            "max": round(maximum, digits),
+        }
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import settings
+from services.metrics import RollingStats
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the password hashing queue has reached its limit."""
+
+
+class PasswordHasher:
+    """
+    Runs Argon2 hashing and verification on a small dedicated thread pool
+    (argon2-cffi releases the GIL), so a burst of sign-ins never blocks the
+    event loop serving chat and uploads.
+
+    At most max_pending operations are queued or running; beyond that,
+    callers get PasswordHashingBusy at once rather than waiting behind the
+    burst.
+    """
+
+    def __init__(self, context, workers: int = settings.PASSWORD_HASH_WORKERS,
+                 max_pending: int = settings.PASSWORD_HASH_MAX_PENDING):
+        self.context = context
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rejected = 0
+        self.latency_ms = RollingStats()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+    async def hash(self, password: str):
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        """
+        Returns (verified, new_hash); new_hash is set when the stored hash
+        uses outdated cost parameters and should be replaced.
+        """
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    async def _run(self, function, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHashingBusy()
+            self._pending += 1
+        started = time.perf_counter()
+        try:
+            future = self._pool.submit(function, *args)
+        except BaseException:
+            self._release(started)
+            raise
+        # The slot is held until the pool is done with the job, even if the caller
+        # gives up on it first (a client disconnecting mid-login)
+        future.add_done_callback(lambda _: self._release(started))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, started: float):
+        with self._lock:
+            self._pending -= 1
+        self.latency_ms.observe((time.perf_counter() - started) * 1000)
+
+    def metrics(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "rejected": self.rejected,
+            "latency_ms": self.latency_ms.snapshot(),
+        }
@@ -1,60 +1,177 @@
 import PyPDF2
 from fastapi import UploadFile, HTTPException
-import io
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from config import settings
+from services.chunking import create_chunker
+from contextlib import contextmanager
+import gc
+import hashlib
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import uuid
+
+UPLOAD_READ_SIZE = 1024 * 1024
+# Upper bound on pages held by one reader, which keeps parse memory independent of document size
+MAX_SHARD_PAGES = 128
+
+@contextmanager
+def open_pdf(file_path: str):
+    # PyPDF2 page objects are cyclic, so a closed reader lingers until the cyclic GC
+    # runs; collect it before opening the next one so only one reader is ever alive
+    gc.collect()
+    with open(file_path, "rb") as f:
+        yield PyPDF2.PdfReader(f)
+
+def extract_page_range(file_path: str, start: int, end: int):
+    """
+    Extracts the text of pages [start, end). Each process pool worker opens the
+    PDF itself so only the path, not the parsed document, crosses processes.
+    """
+    with open_pdf(file_path) as pdf_reader:
+        return [pdf_reader.pages[i].extract_text() or "" for i in range(start, end)]
 
 class PDFProcessor:
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+    def __init__(self, chunk_size: int = settings.MAX_CHUNK_SIZE, chunk_overlap: int = settings.CHUNK_OVERLAP,
+                 extract_workers: int = settings.PDF_EXTRACT_WORKERS,
+                 parallel_min_pages: int = settings.PDF_PARALLEL_MIN_PAGES,
+                 chunk_strategy: str = settings.CHUNK_STRATEGY):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.chunk_strategy = chunk_strategy
+        # Fail on a bad strategy or sizes at startup rather than on the first upload
+        self.new_chunker()
+        self.extract_workers = extract_workers
+        self.parallel_min_pages = parallel_min_pages
 
-    async def process_pdf(self, file: UploadFile):
+    async def save_upload(self, file: UploadFile, upload_dir: str):
         """
-        Reads a PDF file, extracts text, and chunks it.
+        Persists an uploaded PDF to disk and returns its path and the sha256 of its bytes.
         """
         if file.content_type != "application/pdf":
             raise HTTPException(status_code=400, detail="File must be a PDF")
-        
+
+        os.makedirs(upload_dir, exist_ok=True)
+        file_path = os.path.join(upload_dir, f"{uuid.uuid4().hex}.pdf")
+        digest = hashlib.sha256()
+        with open(file_path, "wb") as out:
+            while True:
+                data = await file.read(UPLOAD_READ_SIZE)
+                if not data:
+                    break
+                digest.update(data)
+                out.write(data)
+        return file_path, digest.hexdigest()
+
+    async def process_pdf(self, file: UploadFile):
+        """
+        Reads a PDF file, extracts text, and chunks it.
+        """
+        spool_dir = tempfile.mkdtemp()
         try:
-            content = await file.read()
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-            
-            full_text = ""
-            chunks = []
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                text = page.extract_text()
-                if text:
-                    full_text += text
-                    # Simple chunking logic (can be improved)
-                    page_chunks = self._chunk_text(text, page_num)
-                    chunks.extend(page_chunks)
-            
-            return {
-                "filename": file.filename,
-                "total_pages": len(pdf_reader.pages),
-                "chunks": chunks
-            }
-            
+            file_path, _ = await self.save_upload(file, spool_dir)
+            result = self.parse_file(file_path)
+            result["filename"] = file.filename
+            return result
+
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+    def parse_file(self, file_path: str, executor=None):
+        """
+        Extracts and chunks a PDF stored on disk, in parallel for large files.
+        """
+        return {
+            "total_pages": self.count_pages(file_path),
+            "chunks": list(self.iter_chunks(file_path, executor=executor))
+        }
+
+    def count_pages(self, file_path: str):
+        with open_pdf(file_path) as pdf_reader:
+            return len(pdf_reader.pages)
+
+    def is_parallel(self, total_pages: int):
+        return self.extract_workers > 1 and total_pages >= self.parallel_min_pages
+
+    def page_ranges(self, total_pages: int):
+        """
+        Splits [0, total_pages) into contiguous shards of at most MAX_SHARD_PAGES,
+        spread across extract_workers when the document is large enough to parallelise.
+        """
+        shard_size = MAX_SHARD_PAGES
+        if self.is_parallel(total_pages):
+            shard_size = min(shard_size, math.ceil(total_pages / self.extract_workers))
+        return [(start, min(start + shard_size, total_pages)) for start in range(0, total_pages, shard_size)]
+
+    def iter_page_shards(self, file_path: str, executor=None):
+        """
+        Yields (first_page, page_texts) shards in page order. Parallel documents are
+        extracted on `executor` (or a temporary process pool) with at most two shards
+        per worker in flight, so finished text never piles up ahead of the consumer.
+        """
+        total_pages = self.count_pages(file_path)
+        ranges = self.page_ranges(total_pages)
+        if not self.is_parallel(total_pages):
+            for start, end in ranges:
+                yield start, extract_page_range(file_path, start, end)
+            return
+
+        owns_executor = executor is None
+        if owns_executor:
+            executor = ProcessPoolExecutor(
+                max_workers=self.extract_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        try:
+            pending = deque()
+            ranges = iter(ranges)
+            for start, end in ranges:
+                pending.append((start, executor.submit(extract_page_range, file_path, start, end)))
+                if len(pending) >= self.extract_workers * 2:
+                    break
+            while pending:
+                start, future = pending.popleft()
+                next_range = next(ranges, None)
+                if next_range:
+                    pending.append((next_range[0], executor.submit(extract_page_range, file_path, *next_range)))
+                yield start, future.result()
+        finally:
+            if owns_executor:
+                executor.shutdown(cancel_futures=True)
+
+    def extract_pages(self, file_path: str, executor=None):
+        """
+        Returns the text of every page in page order.
+        """
+        page_texts = []
+        for _, texts in self.iter_page_shards(file_path, executor=executor):
+            page_texts.extend(texts)
+        return page_texts
 
-    def _chunk_text(self, text: str, page_num: int):
-        """
-        Splits text into chunks with overlap.
-        """
-        chunks = []
-        start = 0
-        text_len = len(text)
-        
-        while start < text_len:
-            end = start + self.chunk_size
-            chunk_text = text[start:end]
-            
-            chunks.append({
-                "page_number": page_num + 1,
-                "text": chunk_text
-            })
-            
-            start += self.chunk_size - self.chunk_overlap
-            
-        return chunks
+    def new_chunker(self):
+        """
+        A chunker for one document; feed it the document's pages in order.
+        """
+        return create_chunker(self.chunk_strategy, self.chunk_size, self.chunk_overlap)
+
+    def iter_chunks(self, file_path: str, executor=None):
+        """
+        Yields chunks page by page without materialising the document text.
+        """
+        chunker = self.new_chunker()
+        for first_page, texts in self.iter_page_shards(file_path, executor=executor):
+            yield from chunker.feed(texts, first_page)
+        yield from chunker.finish()
+
+    def chunk_pages(self, page_texts: list, first_page: int = 0):
+        """
+        Chunks pages that make up a whole document.
+        """
+        return self.new_chunker().chunk_pages(page_texts, first_page)
@@ -1,88 +1,523 @@
+import asyncio
+import time
+from collections import defaultdict
 import chromadb
-from chromadb.utils import embedding_functions
+import httpx
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from config import settings
+from services.embedding_service import EmbeddingService
+from services.embedding_cache import chunk_hash
+from services.collection_router import CollectionRouter, DEFAULT_COLLECTION
+from services.metrics import RollingStats
+from services.answer_cache import SemanticAnswerCache
+from services.retrieval_cache import RetrievalCache
+from services.lexical_index import LexicalIndex
+from services.reranker import CrossEncoderReranker
+from services.context_builder import ContextBuilder
 import uuid
-from groq import Groq
+from itertools import islice
+from groq import Groq, AsyncGroq
+
+def batched(iterable, batch_size: int):
+    """
+    Yields lists of up to batch_size items without materialising the iterable.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
 
 class RAGEngine:
-    def __init__(self):
+    def __init__(self, embedding_service: EmbeddingService = None, answer_cache: SemanticAnswerCache = None,
+                 retrieval_cache: RetrievalCache = None, lexical_index: LexicalIndex = None,
+                 reranker: CrossEncoderReranker = None, context_builder: ContextBuilder = None):
         self.client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIR)
-        self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name=settings.EMBEDDING_MODEL
+        # Embeddings are computed by the shared EmbeddingService and passed in precomputed
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.answer_cache = answer_cache
+        self.retrieval_cache = retrieval_cache
+        # BM25 index of chunk text for hybrid retrieval; chunk sets only
+        self.lexical_index = lexical_index
+        # Re-orders an over-fetched candidate set before it reaches the prompt
+        self.reranker = reranker
+        self.context_builder = context_builder or ContextBuilder()
+        self.router = CollectionRouter(self.client)
+        # The original shared collection; documents without a vector_collection live here
+        self.collection = self.router.get(DEFAULT_COLLECTION)
+        self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
+        # One pooled connection set shared by every async chat request
+        self.async_groq_client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.GROQ_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.GROQ_MAX_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(settings.CHAT_TIMEOUT_SECONDS, connect=5.0)
+            )
         )
-        self.collection = self.client.get_or_create_collection(
-            name="pdf_documents",
-            embedding_function=self.embedding_fn
+        # Chroma calls block, so async callers run them on a bounded pool
+        self.retrieval_pool = ThreadPoolExecutor(
+            max_workers=settings.RETRIEVAL_WORKERS, thread_name_prefix="retrieval"
         )
-        self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
 
-    def add_document(self, filename: str, chunks: list, folder_id: int = None):
+        self.retrieval_ms = RollingStats()
+        self.ttft_ms = RollingStats()
+        self.answer_ms = RollingStats()
+        self.prompt_tokens = RollingStats()
+
+    def add_document(self, filename: str, chunks, folder_id: int = None, chunk_set: str = None,
+                     document_id: int = None, user_id: int = None, collection: str = None,
+                     batch_size: int = settings.INGEST_EMBED_BATCH_SIZE, reuse_from: tuple = None,
+                     progress: dict = None):
         """
-        Adds document chunks to ChromaDB.
+        Adds document chunks to ChromaDB. `chunks` may be any iterable, including a
+        generator; it is embedded and inserted batch_size chunks at a time.
+
+        With a chunk_set, ids are derived from the chunk text so re-running an
+        ingestion upserts the same vectors instead of duplicating them, and
+        identical chunk text within the set is stored once.
+
+        chunk_set, document_id, user_id and folder_id are written as filterable
+        metadata; ids are stored as ints. `collection` names the shard to write
+        to and defaults to the shared collection. Chunks of a chunk set are also
+        added to the lexical index.
+
+        reuse_from is the (chunk_set, collection) of a previous version of the
+        document: chunks whose text it already holds copy the stored embedding
+        instead of being embedded again, and are counted in
+        progress["chunks_reused"].
         """
-        ids = [str(uuid.uuid4()) for _ in chunks]
-        documents = [chunk["text"] for chunk in chunks]
-        
-        # Metadata must have primitive types for filtering
-        metadatas = []
-        for chunk in chunks:
-            m = {"filename": filename, "page": chunk["page_number"]}
-            if folder_id:
-                m["folder_id"] = str(folder_id)
-            metadatas.append(m)
-        
-        self.collection.add(
-            ids=ids,
-            documents=documents,
-            metadatas=metadatas
-        )
+        target = self.get_collection(collection)
+        added = 0
+        for batch in batched(chunks, batch_size):
+            if chunk_set:
+                unique = {}
+                for chunk in batch:
+                    unique.setdefault(chunk_hash(chunk['text'])[:32], chunk)
+                hashes, batch = list(unique), list(unique.values())
+                ids = [f"{chunk_set}:{text_hash}" for text_hash in hashes]
+            else:
+                ids = [str(uuid.uuid4()) for _ in batch]
+            documents = [chunk["text"] for chunk in batch]
+
+            embeddings = {}
+            if chunk_set and reuse_from:
+                previous_set, previous_collection = reuse_from
+                stored = self.get_collection(previous_collection).get(
+                    ids=[f"{previous_set}:{text_hash}" for text_hash in hashes], include=["embeddings"]
+                )
+                by_hash = {
+                    stored_id.split(":", 1)[1]: np.asarray(embedding).tolist()
+                    for stored_id, embedding in zip(stored["ids"], stored["embeddings"])
+                }
+                embeddings = {i: by_hash[text_hash] for i, text_hash in enumerate(hashes) if text_hash in by_hash}
+                if progress is not None:
+                    progress["chunks_reused"] = progress.get("chunks_reused", 0) + len(embeddings)
+            missing = [i for i in range(len(documents)) if i not in embeddings]
+            if missing:
+                embeddings.update(zip(missing, self.embedding_service.embed_documents([documents[i] for i in missing])))
+
+            # Metadata must have primitive types for filtering
+            metadatas = []
+            for chunk in batch:
+                m = {"filename": filename, "page": chunk["page_number"]}
+                if chunk.get("page_end"):
+                    m["page_end"] = chunk["page_end"]
+                if folder_id:
+                    m["folder_id"] = folder_id
+                if chunk_set:
+                    m["chunk_set"] = chunk_set
+                if document_id:
+                    m["document_id"] = document_id
+                if user_id:
+                    m["user_id"] = user_id
+                metadatas.append(m)
+
+            target.upsert(
+                ids=ids,
+                embeddings=[embeddings[i] for i in range(len(documents))],
+                documents=documents,
+                metadatas=metadatas
+            )
+            if chunk_set and self.lexical_index:
+                self.lexical_index.add(chunk_set, ids, documents)
+            added += len(batch)
+        if chunk_set:
+            self._index_changed(chunk_set)
+        return added
 
-    def query(self, query_text: str, n_results: int = 5, folder_id: int = None, document_id: int = None, history: list = None):
+    def get_collection(self, name: str = None):
+        if not name or name == DEFAULT_COLLECTION:
+            return self.collection
+        return self.router.get(name)
+
+    def delete_chunk_set(self, chunk_set: str, collection: str = None):
         """
-        Searches for relevant chunks and generates an answer using Groq.
+        Removes every vector belonging to a chunk set.
         """
-        where_filter = {}
-        if folder_id:
-            where_filter["folder_id"] = str(folder_id)
-            
-        results = self.collection.query(
-            query_texts=[query_text],
-            n_results=n_results,
-            where=where_filter if where_filter else None
-        )
-        
-        if not results['documents'] or not results['documents'][0]:
-            context = "No relevant context found in the document."
+        self.get_collection(collection).delete(where={"chunk_set": chunk_set})
+        if self.lexical_index:
+            self.lexical_index.remove_chunk_set(chunk_set)
+        self._index_changed(chunk_set)
+
+    def _index_changed(self, chunk_set: str):
+        """
+        Invalidates cached retrievals and answers that depend on a chunk set.
+        """
+        if self.retrieval_cache:
+            self.retrieval_cache.bump(chunk_set)
+        if self.answer_cache:
+            self.answer_cache.invalidate(chunk_set)
+
+    def delete_document_vectors(self, document_id: int, collection: str = None):
+        """
+        Removes vectors tagged with a document id, for documents without a chunk set.
+        """
+        self.get_collection(collection).delete(where={"document_id": document_id})
+
+    def clear_folder(self, folder_id: int, collections: list = None, batch_size: int = 1000):
+        """
+        Drops the folder_id tag from a deleted folder's vectors. The documents
+        themselves outlive the folder, so their vectors are kept where they are.
+        Searches every collection unless told which ones hold the folder.
+        """
+        for name in collections if collections is not None else self.router.names():
+            target = self.get_collection(name)
+            while True:
+                ids = target.get(where={"folder_id": folder_id}, limit=batch_size, include=[])["ids"]
+                if not ids:
+                    break
+                target.update(ids=ids, metadatas=[{"folder_id": None}] * len(ids))
+
+    @staticmethod
+    def scope_filter(chunk_sets: list = None, user_id: int = None):
+        """
+        Builds the narrowest metadata pre-filter for a chat scope: one chunk set
+        for a document, the folder's chunk sets, or everything a user indexed.
+        """
+        if chunk_sets is not None:
+            if len(chunk_sets) == 1:
+                return {"chunk_set": chunk_sets[0]}
+            return {"chunk_set": {"$in": list(chunk_sets)}}
+        if user_id is not None:
+            return {"user_id": user_id}
+        return None
+
+    def retrieve(self, query_text: str, n_results: int = 5, scope: dict = None, user_id: int = None):
+        """
+        Returns the ids, texts and metadata of the closest chunks within a scope.
+
+        `scope` maps collection names to the chunk sets to search in each; an
+        empty scope is empty, not unfiltered. Without a scope, user_id searches
+        one user's vectors in every collection, and neither searches the shared
+        collection unfiltered. With a lexical index, scoped searches are hybrid:
+        vector and BM25 candidates are fused with reciprocal rank fusion.
+        """
+        if scope is not None and not any(scope.values()):
+            return {"ids": [], "documents": [], "metadatas": []}
+        cache_key = self._retrieval_cache_key(query_text, scope, n_results)
+        if cache_key and (cached := self.retrieval_cache.get(cache_key)):
+            return cached
+
+        embedding = self.embedding_service.embed_query(query_text)
+        if self._hybrid(scope):
+            candidates = max(n_results, settings.HYBRID_CANDIDATES)
+            results = self.fuse(
+                self.search(embedding, candidates, scope, user_id),
+                self.lexical_search(query_text, candidates, scope),
+                n_results, scope
+            )
         else:
-            context = "\n\n".join(results['documents'][0])
-        
-        system_prompt = (
-            "You are a helpful assistant. Use the provided context to answer the user's question. "
-            "If the answer is not in the context, say you don't know.\n\n"
-            "Format your response for maximum readability:\n"
-            "1. Use **bold text** for all key terms, names, dates, and important concepts.\n"
-            "2. Use bullet points or numbered lists for steps or multiple items.\n"
-            "3. Use tables for comparisons.\n"
-            "4. Ensure your response is well-structured and easy to scan."
+            results = self.search(embedding, n_results, scope, user_id)
+        if cache_key:
+            self.retrieval_cache.put(cache_key, results)
+        return results
+
+    async def aretrieve(self, query_text: str, n_results: int = 5, scope: dict = None, user_id: int = None,
+                        embedding=None):
+        """
+        retrieve() for async callers: the query is embedded through the shared
+        batcher, unless already embedded, and the vector and BM25 searches run
+        concurrently on the retrieval pool.
+        """
+        if scope is not None and not any(scope.values()):
+            return {"ids": [], "documents": [], "metadatas": []}
+        cache_key = self._retrieval_cache_key(query_text, scope, n_results)
+        if cache_key and (cached := self.retrieval_cache.get(cache_key)):
+            return cached
+
+        loop = asyncio.get_running_loop()
+        if self._hybrid(scope):
+            candidates = max(n_results, settings.HYBRID_CANDIDATES)
+            lexical = loop.run_in_executor(self.retrieval_pool, self.lexical_search, query_text, candidates, scope)
+            if embedding is None:
+                embedding = await self.embedding_service.aembed_query(query_text)
+            vector = loop.run_in_executor(self.retrieval_pool, self.search, embedding, candidates, scope, user_id)
+            vector_results, lexical_hits = await asyncio.gather(vector, lexical)
+            results = await loop.run_in_executor(
+                self.retrieval_pool, self.fuse, vector_results, lexical_hits, n_results, scope
+            )
+        else:
+            if embedding is None:
+                embedding = await self.embedding_service.aembed_query(query_text)
+            results = await loop.run_in_executor(
+                self.retrieval_pool, self.search, embedding, n_results, scope, user_id
+            )
+        if cache_key:
+            self.retrieval_cache.put(cache_key, results)
+        return results
+
+    async def acontext(self, query_text: str, n_results: int = 5, scope: dict = None, user_id: int = None,
+                       embedding=None):
+        """
+        The chunks that go into the prompt. With a reranker, RERANK_CANDIDATES
+        are retrieved and the reranker keeps the best n_results of them.
+        """
+        results = await self.aretrieve(query_text, self._candidate_count(n_results), scope=scope,
+                                       user_id=user_id, embedding=embedding)
+        if self.reranker:
+            results = await self.reranker.arerank(query_text, results, n_results)
+        return results
+
+    def _candidate_count(self, n_results: int):
+        return max(n_results, settings.RERANK_CANDIDATES) if self.reranker else n_results
+
+    def _retrieval_cache_key(self, query_text: str, scope: dict, n_results: int):
+        # Only explicit scopes are cached; a user-wide scope has no version to key on
+        if self.retrieval_cache is None or scope is None:
+            return None
+        return self.retrieval_cache.key(query_text, scope, n_results)
+
+    def _hybrid(self, scope: dict):
+        return self.lexical_index is not None and scope is not None
+
+    def lexical_search(self, query_text: str, limit: int, scope: dict):
+        """
+        BM25 hits as (chunk_id, chunk_set, score) over every chunk set in scope.
+        """
+        chunk_sets = [chunk_set for chunk_sets in scope.values() for chunk_set in chunk_sets]
+        return self.lexical_index.search(query_text, chunk_sets, limit)
+
+    def fuse(self, vector_results: dict, lexical_hits: list, n_results: int, scope: dict):
+        """
+        Reciprocal rank fusion of vector and BM25 rankings. Chunks only the
+        lexical side found are fetched from their collection for their text.
+        """
+        scores = defaultdict(float)
+        for rank, chunk_id in enumerate(vector_results["ids"]):
+            scores[chunk_id] += 1 / (settings.RRF_K + rank + 1)
+        for rank, (chunk_id, _, _) in enumerate(lexical_hits):
+            scores[chunk_id] += 1 / (settings.RRF_K + rank + 1)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:n_results]
+
+        found = {
+            chunk_id: (document, metadata) for chunk_id, document, metadata in
+            zip(vector_results["ids"], vector_results["documents"], vector_results["metadatas"])
+        }
+        collection_of = {chunk_set: name for name, chunk_sets in scope.items() for chunk_set in chunk_sets}
+        missing = defaultdict(list)
+        for chunk_id, chunk_set, _ in lexical_hits:
+            if chunk_id in ranked and chunk_id not in found:
+                missing[collection_of[chunk_set]].append(chunk_id)
+        for name, ids in missing.items():
+            fetched = self.get_collection(name).get(ids=ids, include=["documents", "metadatas"])
+            found.update(zip(fetched["ids"], zip(fetched["documents"], fetched["metadatas"])))
+
+        # A lexical hit whose vector is gone (e.g. garbage-collected) is dropped
+        ranked = [chunk_id for chunk_id in ranked if chunk_id in found]
+        return {
+            "ids": ranked,
+            "documents": [found[chunk_id][0] for chunk_id in ranked],
+            "metadatas": [found[chunk_id][1] for chunk_id in ranked],
+        }
+
+    def search(self, embedding, n_results: int = 5, scope: dict = None, user_id: int = None):
+        """
+        Nearest-neighbour search for an already embedded query; see retrieve().
+        """
+        if scope is not None:
+            searches = [(name, self.scope_filter(chunk_sets)) for name, chunk_sets in scope.items() if chunk_sets]
+        elif user_id is not None:
+            searches = [(name, self.scope_filter(user_id=user_id)) for name in self.router.names()]
+        else:
+            searches = [(DEFAULT_COLLECTION, None)]
+        if not searches:
+            return {"ids": [], "documents": [], "metadatas": []}
+
+        hits = []
+        for name, where in searches:
+            results = self.get_collection(name).query(
+                query_embeddings=[embedding],
+                n_results=n_results,
+                where=where,
+                include=["documents", "metadatas", "distances"]
+            )
+            if results["ids"]:
+                hits.extend(zip(results["distances"][0], results["ids"][0],
+                                results["documents"][0], results["metadatas"][0]))
+
+        # Distances come from the same embedding space, so shards merge by distance
+        hits = sorted(hits, key=lambda hit: hit[0])[:n_results]
+        return {
+            "ids": [hit[1] for hit in hits],
+            "documents": [hit[2] for hit in hits],
+            "metadatas": [hit[3] for hit in hits],
+        }
+
+    def build_prompt(self, query_text: str, results: dict, history: list = None):
+        """
+        Assembles the Groq chat messages within the prompt token budget.
+        Returns {"messages", "prompt_tokens", "sources"}; sources are the
+        metadata of the chunks that made it into the prompt.
+        """
+        prompt = self.context_builder.build(query_text, results, history)
+        self.prompt_tokens.observe(prompt["prompt_tokens"])
+        return {
+            "messages": prompt["messages"],
+            "prompt_tokens": prompt["prompt_tokens"],
+            "sources": [results['metadatas'][i] for i in prompt["used"]],
+        }
+
+    async def _abuild_prompt(self, query_text: str, results: dict, history: list = None):
+        # Token counting, and loading the tokenizer on first use, would hold up the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            self.retrieval_pool, self.build_prompt, query_text, results, history
         )
 
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add history if available
-        if history:
-            for msg in history:
-                messages.append({"role": msg["role"].lower(), "content": msg["content"]})
-        
-        # Add current context and question
-        user_prompt = f"Context:\n{context}\n\nQuestion: {query_text}"
-        messages.append({"role": "user", "content": user_prompt})
-        
+    def query(self, query_text: str, n_results: int = 5, folder_id: int = None, document_id: int = None,
+              history: list = None, scope: dict = None, user_id: int = None):
+        """
+        Searches for relevant chunks and generates an answer using Groq.
+        """
+        results = self.retrieve(query_text, self._candidate_count(n_results), scope=scope, user_id=user_id)
+        if self.reranker:
+            results = self.reranker.rerank(query_text, results, n_results)
+        prompt = self.build_prompt(query_text, results, history)
         chat_completion = self.groq_client.chat.completions.create(
-            messages=messages,
+            messages=prompt["messages"],
             model=settings.GROQ_MODEL,
         )
         
         return {
             "answer": chat_completion.choices[0].message.content,
-            "sources": results['metadatas'][0]
+            "sources": prompt["sources"],
+            "prompt_tokens": prompt["prompt_tokens"]
         }
+
+    async def aquery(self, query_text: str, n_results: int = 5, history: list = None, scope: dict = None,
+                     user_id: int = None, timeout: float = settings.CHAT_TIMEOUT_SECONDS):
+        """
+        query() without blocking the event loop. Raises asyncio.TimeoutError
+        when retrieval and generation together exceed timeout seconds;
+        cancelling the awaiting task aborts the in-flight Groq request.
+        prompt_tokens is None for answers served from the answer cache.
+        """
+        async def answer():
+            started = time.perf_counter()
+            embedding, cached = await self._cached_answer(query_text, scope, history)
+            if cached:
+                self.answer_ms.observe((time.perf_counter() - started) * 1000)
+                return {"answer": cached["answer"], "sources": cached["sources"], "prompt_tokens": None}
+
+            results = await self.acontext(query_text, n_results, scope, user_id, embedding)
+            self.retrieval_ms.observe((time.perf_counter() - started) * 1000)
+            prompt = await self._abuild_prompt(query_text, results, history)
+            generation_started = time.perf_counter()
+            chat_completion = await self.async_groq_client.chat.completions.create(
+                messages=prompt["messages"],
+                model=settings.GROQ_MODEL,
+            )
+            finished = time.perf_counter()
+            self.answer_ms.observe((finished - started) * 1000)
+
+            answer = chat_completion.choices[0].message.content
+            if embedding is not None:
+                self.answer_cache.put(scope, embedding, answer, prompt["sources"], (finished - generation_started) * 1000)
+            return {"answer": answer, "sources": prompt["sources"], "prompt_tokens": prompt["prompt_tokens"]}
+
+        return await asyncio.wait_for(answer(), timeout)
+
+    async def astream(self, query_text: str, n_results: int = 5, history: list = None, scope: dict = None,
+                      user_id: int = None):
+        """
+        Streams an answer: yields ("sources", metadatas) as soon as retrieval is
+        done, ("prompt_tokens", count) unless the answer is cached, then
+        ("token", text) for every piece Groq sends. Time to first token is
+        measured from the call, so it includes retrieval.
+        """
+        started = time.perf_counter()
+        embedding, cached = await self._cached_answer(query_text, scope, history)
+        if cached:
+            yield "sources", cached["sources"]
+            self.ttft_ms.observe((time.perf_counter() - started) * 1000)
+            yield "token", cached["answer"]
+            self.answer_ms.observe((time.perf_counter() - started) * 1000)
+            return
+
+        results = await self.acontext(query_text, n_results, scope, user_id, embedding)
+        self.retrieval_ms.observe((time.perf_counter() - started) * 1000)
+        prompt = await self._abuild_prompt(query_text, results, history)
+        yield "sources", prompt["sources"]
+        yield "prompt_tokens", prompt["prompt_tokens"]
+
+        generation_started = time.perf_counter()
+        parts = []
+        stream = await self.async_groq_client.chat.completions.create(
+            messages=prompt["messages"],
+            model=settings.GROQ_MODEL,
+            stream=True,
+        )
+        first_token = True
+        try:
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if not text:
+                    continue
+                if first_token:
+                    self.ttft_ms.observe((time.perf_counter() - started) * 1000)
+                    first_token = False
+                parts.append(text)
+                yield "token", text
+        finally:
+            # Closing the response on abort stops Groq generating the rest
+            await stream.close()
+        finished = time.perf_counter()
+        self.answer_ms.observe((finished - started) * 1000)
+        if embedding is not None and parts:
+            self.answer_cache.put(scope, embedding, "".join(parts), prompt["sources"],
+                                  (finished - generation_started) * 1000)
+
+    async def _cached_answer(self, query_text: str, scope: dict, history: list = None):
+        """
+        Embeds the question and looks it up in the answer cache. Returns
+        (embedding, cached answer or None); the embedding is None when the
+        question is not cacheable, so callers embed during retrieval as usual
+        and do not cache the answer either.
+
+        Only a conversation's opening question is cacheable: a follow-up such
+        as "and the second one?" means something else in every conversation,
+        and scopes are shared between users who uploaded the same files.
+        """
+        if history:
+            return None, None
+        if self.answer_cache is None or not scope or not any(scope.values()):
+            return None, None
+        embedding = await self.embedding_service.aembed_query(query_text)
+        return embedding, self.answer_cache.get(scope, embedding)
+
+    def metrics(self):
+        return {
+            "retrieval_ms": self.retrieval_ms.snapshot(),
+            "time_to_first_token_ms": self.ttft_ms.snapshot(),
+            "answer_ms": self.answer_ms.snapshot(),
+            "prompt_tokens": self.prompt_tokens.snapshot(),
+            "answer_cache": self.answer_cache.stats() if self.answer_cache else None,
+            "retrieval_cache": self.retrieval_cache.stats() if self.retrieval_cache else None,
+            "lexical_index": self.lexical_index.stats() if self.lexical_index else None,
+            "reranker": self.reranker.metrics() if self.reranker else None,
+        }
+
+    async def aclose(self):
+        await self.async_groq_client.close()
+        self.retrieval_pool.shutdown(wait=False)
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import settings
+from services.metrics import RollingStats
+from services.retrieval_cache import normalize_query
+
+logger = logging.getLogger("pdf-chatbot")
+
+
+class CrossEncoderReranker:
+    """
+    Re-orders retrieved candidates by scoring (question, chunk) pairs with a
+    small cross-encoder on CPU and keeps the best n.
+
+    The model is loaded on first use and runs on a single dedicated thread.
+    Scores are cached per (normalized question, chunk id); chunk ids are
+    content-addressed, so a cached score never goes stale.
+
+    When the pairs already queued plus this request would take longer than
+    latency_budget_ms at the observed per-pair cost, re-ranking is skipped
+    and the retrieval order is kept, so the stage degrades under load
+    instead of queueing.
+    """
+
+    def __init__(self, model_name: str = settings.RERANKER_MODEL,
+                 batch_size: int = settings.RERANK_BATCH_SIZE,
+                 latency_budget_ms: float = settings.RERANK_LATENCY_BUDGET_MS,
+                 cache_size: int = settings.RERANK_CACHE_MAX_ENTRIES):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.latency_budget_ms = latency_budget_ms
+        self.cache_size = cache_size
+        self._model = None
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending_pairs = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+
+        self.reranked = 0
+        self.skipped = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.pair_ms = RollingStats()
+        self.rerank_ms = RollingStats()
+
+    def rerank(self, query_text: str, results: dict, n_results: int):
+        """
+        Returns results (ids, documents, metadatas) cut to the n_results best
+        candidates.
+        """
+        if len(results["ids"]) <= 1:
+            return self._top(results, range(len(results["ids"])), n_results)
+        started = time.perf_counter()
+        query = normalize_query(query_text)
+
+        with self._lock:
+            scores = {}
+            for i, chunk_id in enumerate(results["ids"]):
+                score = self._scores.get((query, chunk_id))
+                if score is not None:
+                    self._scores.move_to_end((query, chunk_id))
+                    scores[i] = score
+            self.cache_hits += len(scores)
+            self.cache_misses += len(results["ids"]) - len(scores)
+            missing = [i for i in range(len(results["ids"])) if i not in scores]
+            if missing:
+                predicted_ms = (self._pending_pairs + len(missing)) * self.pair_ms.snapshot()["mean"]
+                if self.latency_budget_ms and predicted_ms > self.latency_budget_ms:
+                    self.skipped += 1
+                    return self._top(results, range(len(results["ids"])), n_results)
+                self._pending_pairs += len(missing)
+
+        if missing:
+            try:
+                computed = self._executor.submit(
+                    self._score, query_text, [results["documents"][i] for i in missing]
+                ).result()
+            finally:
+                with self._lock:
+                    self._pending_pairs -= len(missing)
+
+            with self._lock:
+                for i, score in zip(missing, computed):
+                    scores[i] = score
+                    self._scores[(query, results["ids"][i])] = score
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+
+        self.reranked += 1
+        self.rerank_ms.observe((time.perf_counter() - started) * 1000)
+        order = sorted(scores, key=scores.get, reverse=True)
+        return self._top(results, order, n_results)
+
+    async def arerank(self, query_text: str, results: dict, n_results: int):
+        loop = asyncio.get_running_loop()
+        # Waits on the scoring thread, so keep it off the retrieval pool as well
+        return await loop.run_in_executor(None, self.rerank, query_text, results, n_results)
+
+    def metrics(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "model": self.model_name,
+            "loaded": self._model is not None,
+            "latency_budget_ms": self.latency_budget_ms,
+            "reranked": self.reranked,
+            "skipped_over_budget": self.skipped,
+            "pending_pairs": self._pending_pairs,
+            "cache_entries": len(self._scores),
+            "cache_hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            "pair_ms": self.pair_ms.snapshot(),
+            "rerank_ms": self.rerank_ms.snapshot(),
+        }
+
+    def _load_model(self):
+        from sentence_transformers import CrossEncoder
+        logger.info(f"Loading re-ranking model {self.model_name} on cpu")
+        return CrossEncoder(self.model_name, device="cpu")
+
+    def _score(self, query_text: str, documents: list):
+        if self._model is None:
+            self._model = self._load_model()
+        started = time.perf_counter()
+        scores = self._model.predict(
+            [(query_text, document) for document in documents], batch_size=self.batch_size
+        )
+        self.pair_ms.observe((time.perf_counter() - started) * 1000 / len(documents))
+        return [float(score) for score in scores]
+
+    @staticmethod
+    def _top(results: dict, order, n_results: int):
+        order = list(order)[:n_results]
+        return {key: [results[key][i] for i in order] for key in ("ids", "documents", "metadatas")}
@@ -0,0 +1,75 @@
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from config import settings
+
+
+def normalize_query(text: str):
+    """
+    Case- and whitespace-insensitive form of a question; the embedding model
+    is uncased, so these variants retrieve the same chunks.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
+
+
+class RetrievalCache:
+    """
+    In-process LRU of retrieval results keyed by (normalized query, scope,
+    n_results).
+
+    Every chunk set has a version counter that bump() increments whenever its
+    vectors are written or deleted. The versions of all chunk sets in a scope
+    are part of the key, so a cached result can never outlive a change to the
+    index it was computed from; superseded entries simply age out.
+    """
+
+    def __init__(self, max_entries: int = settings.RETRIEVAL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def key(self, query_text: str, scope: dict, n_results: int):
+        with self._lock:
+            versioned_scope = tuple(sorted(
+                (collection, chunk_set, self._versions.get(chunk_set, 0))
+                for collection, chunk_sets in scope.items() for chunk_set in chunk_sets
+            ))
+        return normalize_query(query_text), versioned_scope, n_results
+
+    def get(self, key):
+        with self._lock:
+            results = self._entries.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return results
+
+    def put(self, key, results: dict):
+        with self._lock:
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bump(self, chunk_set: str):
+        with self._lock:
+            self._versions[chunk_set] = self._versions.get(chunk_set, 0) + 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
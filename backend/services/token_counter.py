@@ -0,0 +1,71 @@
+import logging
+import threading
+
+from config import settings
+
+logger = logging.getLogger("pdf-chatbot")
+
+# Rough characters per token for English prose, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+# Per-message overhead of the chat format (role markers and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class TokenCounter:
+    """
+    Counts tokens with a local Hugging Face tokenizer, loaded on first use.
+
+    If the tokenizer cannot be loaded (not installed, no network on first
+    start) counts fall back to a characters-per-token estimate, so prompt
+    assembly keeps working with a looser budget.
+    """
+
+    def __init__(self, model_name: str = settings.TOKENIZER_MODEL):
+        self.model_name = model_name
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def count(self, text: str):
+        if not text:
+            return 0
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def count_messages(self, messages: list):
+        return sum(self.count(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+    def clip(self, text: str, max_tokens: int):
+        """
+        Returns the longest prefix of text that is at most max_tokens tokens.
+        """
+        if max_tokens <= 0:
+            return ""
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+        if len(offsets) <= max_tokens:
+            return text
+        return text[:offsets[max_tokens - 1][1]]
+
+    def _get_tokenizer(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._tokenizer = self._load_tokenizer()
+                    self._loaded = True
+        return self._tokenizer
+
+    def _load_tokenizer(self):
+        try:
+            from tokenizers import Tokenizer
+            tokenizer = Tokenizer.from_pretrained(self.model_name)
+            tokenizer.no_truncation()
+            logger.info(f"Loaded tokenizer {self.model_name}")
+            return tokenizer
+        except Exception as e:
+            logger.warning(f"Tokenizer {self.model_name} unavailable, estimating token counts: {e}")
+            return None
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+
+from config import settings
+
+
+class UserCache:
+    """
+    Short-lived LRU of authenticated users keyed by token subject (email), so
+    polling endpoints authenticate without a users query per request.
+
+    Entries expire after ttl_seconds. Changes to a user made through this
+    process call invalidate(); other worker processes see them once their
+    entry expires. Cached users are detached from any session, so callers
+    must only read their column attributes.
+    """
+
+    def __init__(self, ttl_seconds: float = settings.AUTH_USER_CACHE_TTL_SECONDS,
+                 max_entries: int = settings.AUTH_USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, subject: str):
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[subject]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return user
+
+    def put(self, subject: str, user):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[subject] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            if self._entries.pop(subject, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,111 @@
+import json
+import logging
+
+import models
+from services.collection_router import DEFAULT_COLLECTION
+
+logger = logging.getLogger("pdf-chatbot")
+
+
+def _vector_bytes(document: str, metadata: dict, dimensions: int):
+    """
+    Approximate storage held by one vector: float32 embedding, text and metadata.
+    """
+    return dimensions * 4 + len((document or "").encode("utf-8")) + len(json.dumps(metadata or {}))
+
+
+def pending_chunk_sets(db):
+    """
+    Chunk sets of replacement uploads still being indexed; no document points
+    at them yet, but they are not garbage.
+    """
+    return {
+        content_hash for (content_hash,) in
+        db.query(models.Document.pending_content_hash).filter(models.Document.pending_content_hash.isnot(None))
+    }
+
+
+def collect_garbage(db, collection, batch_size: int = 1000, dry_run: bool = False):
+    """
+    Reconciles a Chroma collection against the documents table and purges
+    vectors no document references any more.
+
+    A vector is an orphan when no document whose vectors live in this
+    collection references its chunk_set or, for vectors without a chunk_set,
+    its document_id. Copies left behind in a collection a chunk set has been
+    moved out of are therefore orphans too. Chunk sets of pending
+    replacements are kept. Vectors carrying neither (indexed before either
+    field was written) cannot be attributed and are only counted.
+
+    The collection is scanned batch_size vectors at a time and orphans are
+    deleted batch by batch, so memory stays bounded on large collections.
+    """
+    if collection.name == DEFAULT_COLLECTION:
+        in_collection = models.Document.vector_collection.is_(None) | (
+            models.Document.vector_collection == DEFAULT_COLLECTION
+        )
+    else:
+        in_collection = models.Document.vector_collection == collection.name
+    live_chunk_sets = {
+        chunk_set_id for (chunk_set_id,) in db.query(models.Document.chunk_set_id).filter(in_collection).distinct()
+        if chunk_set_id
+    } | pending_chunk_sets(db)
+    live_documents = {document_id for (document_id,) in db.query(models.Document.id).filter(in_collection)}
+
+    report = {"scanned": 0, "orphaned": 0, "unattributed": 0, "bytes_reclaimed": 0, "dry_run": dry_run}
+    dimensions = None
+    offset = 0
+    while True:
+        page = collection.get(
+            limit=batch_size,
+            offset=offset,
+            include=["metadatas", "documents"] + ([] if dimensions else ["embeddings"])
+        )
+        ids = page["ids"]
+        if not ids:
+            break
+        if dimensions is None:
+            dimensions = len(page["embeddings"][0])
+
+        orphans = []
+        for vector_id, metadata, document in zip(ids, page["metadatas"], page["documents"]):
+            metadata = metadata or {}
+            chunk_set = metadata.get("chunk_set")
+            document_id = metadata.get("document_id")
+            if chunk_set:
+                orphaned = chunk_set not in live_chunk_sets
+            elif document_id is not None:
+                orphaned = int(document_id) not in live_documents
+            else:
+                report["unattributed"] += 1
+                continue
+            if orphaned:
+                orphans.append(vector_id)
+                report["bytes_reclaimed"] += _vector_bytes(document, metadata, dimensions)
+
+        report["scanned"] += len(ids)
+        report["orphaned"] += len(orphans)
+        if orphans and not dry_run:
+            collection.delete(ids=orphans)
+            # Deleted rows no longer occupy the offset window
+            offset += len(ids) - len(orphans)
+        else:
+            offset += len(ids)
+        logger.info(f"GC scanned {report['scanned']} vectors, {report['orphaned']} orphaned so far")
+
+    return report
+
+
+def collect_lexical_garbage(db, lexical_index, dry_run: bool = False):
+    """
+    Drops lexical index entries of chunk sets no document references.
+    """
+    live_chunk_sets = {
+        chunk_set_id for (chunk_set_id,) in db.query(models.Document.chunk_set_id).distinct() if chunk_set_id
+    } | pending_chunk_sets(db)
+    orphaned = [chunk_set for chunk_set in lexical_index.chunk_sets() if chunk_set not in live_chunk_sets]
+    chunks = 0
+    if not dry_run:
+        for chunk_set in orphaned:
+            chunks += lexical_index.remove_chunk_set(chunk_set)
+    return {"chunk_sets": len(orphaned), "chunks": chunks, "dry_run": dry_run}
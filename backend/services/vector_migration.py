@@ -0,0 +1,174 @@
+import logging
+from collections import defaultdict
+
+import models
+from services.collection_router import DEFAULT_COLLECTION
+
+logger = logging.getLogger("pdf-chatbot")
+
+
+def _owner_metadata(doc):
+    return {"document_id": doc.id, "user_id": doc.user_id, "folder_id": doc.folder_id}
+
+
+def backfill_metadata(db, collection, batch_size: int = 1000, dry_run: bool = False):
+    """
+    Brings every vector's metadata up to the scoped-retrieval schema:
+    chunk_set, document_id, user_id and folder_id, with ids stored as ints.
+
+    Vectors that already carry a chunk_set or document_id are attributed
+    directly. Vectors indexed before either existed are matched to documents
+    by (filename, folder_id); when that matches documents of more than one
+    user they are left untouched and counted as ambiguous, since assigning
+    them would leak content across users. Matched legacy documents are given
+    a chunk set so document and folder chat can find them again.
+    """
+    docs = db.query(models.Document).all()
+    by_id = {doc.id: doc for doc in docs}
+    by_chunk_set = defaultdict(list)
+    by_name = defaultdict(list)
+    for doc in docs:
+        if doc.chunk_set_id:
+            by_chunk_set[doc.chunk_set_id].append(doc)
+        by_name[(doc.filename, doc.folder_id)].append(doc)
+
+    report = {"scanned": 0, "updated": 0, "already_current": 0, "unmatched": 0, "ambiguous": 0,
+              "documents_assigned": 0, "dry_run": dry_run}
+
+    def legacy_chunk_set(candidates):
+        chunk_set = next((doc.chunk_set_id for doc in candidates if doc.chunk_set_id), None)
+        chunk_set = chunk_set or f"legacy-{min(doc.id for doc in candidates)}"
+        for doc in candidates:
+            if not doc.chunk_set_id:
+                doc.chunk_set_id = chunk_set
+                by_chunk_set[chunk_set].append(doc)
+                report["documents_assigned"] += 1
+        return chunk_set
+
+    offset = 0
+    while True:
+        page = collection.get(limit=batch_size, offset=offset, include=["metadatas"])
+        ids = page["ids"]
+        if not ids:
+            break
+        offset += len(ids)
+
+        update_ids, update_metadatas = [], []
+        for vector_id, metadata in zip(ids, page["metadatas"]):
+            metadata = metadata or {}
+            chunk_set = metadata.get("chunk_set")
+            document_id = metadata.get("document_id")
+
+            if chunk_set or document_id is not None:
+                if chunk_set:
+                    owners = by_chunk_set.get(chunk_set)
+                else:
+                    owner = by_id.get(int(document_id))
+                    owners = [owner] if owner else None
+                if not owners:
+                    # Attributed to a document or chunk set that no longer exists; left for gc
+                    report["unmatched"] += 1
+                    continue
+                owner = by_id.get(int(document_id)) if document_id is not None else None
+                owner = owner if owner in owners else min(owners, key=lambda doc: doc.id)
+                chunk_set = chunk_set or owner.chunk_set_id or legacy_chunk_set([owner])
+            else:
+                folder_id = metadata.get("folder_id")
+                candidates = by_name.get((metadata.get("filename"), int(folder_id) if folder_id else None), [])
+                if not candidates:
+                    report["unmatched"] += 1
+                    continue
+                if len({doc.user_id for doc in candidates}) > 1:
+                    report["ambiguous"] += 1
+                    continue
+                chunk_set = legacy_chunk_set(candidates)
+                owner = min(candidates, key=lambda doc: doc.id)
+
+            desired = {"chunk_set": chunk_set, **_owner_metadata(owner)}
+            changes = {key: value for key, value in desired.items() if metadata.get(key) != value}
+            if changes:
+                update_ids.append(vector_id)
+                update_metadatas.append(changes)
+            else:
+                report["already_current"] += 1
+
+        report["scanned"] += len(ids)
+        report["updated"] += len(update_ids)
+        if update_ids and not dry_run:
+            # A None value removes the key, e.g. folder_id of an uncategorized document
+            collection.update(ids=update_ids, metadatas=update_metadatas)
+        logger.info(f"Metadata backfill scanned {report['scanned']} vectors, {report['updated']} updated so far")
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+    return report
+
+
+def redistribute(db, rag_engine, batch_size: int = 1000, dry_run: bool = False):
+    """
+    Moves every chunk set into the collection the router currently assigns it,
+    e.g. after switching VECTOR_SHARDING from single to folder.
+
+    A chunk set shared by several documents follows its oldest document. Each
+    chunk set is copied, its documents repointed and committed, and only then
+    removed from the old collection, so an interrupted run can simply be
+    re-run; any copies it leaves behind are reclaimed by `gc`. Documents
+    without a chunk set must go through migrate-metadata first.
+    """
+    router = rag_engine.router
+    chunk_sets = defaultdict(list)
+    report = {"chunk_sets": 0, "chunk_sets_moved": 0, "vectors_moved": 0, "skipped_unmigrated": 0,
+              "collections": defaultdict(int), "collections_dropped": 0, "dry_run": dry_run}
+    for doc in db.query(models.Document).order_by(models.Document.id):
+        if doc.chunk_set_id:
+            chunk_sets[doc.chunk_set_id].append(doc)
+        else:
+            report["skipped_unmigrated"] += 1
+
+    for chunk_set, docs in chunk_sets.items():
+        report["chunk_sets"] += 1
+        target = router.route(docs[0])
+        report["collections"][target] += 1
+        sources = {doc.vector_collection or DEFAULT_COLLECTION for doc in docs} - {target}
+        if not sources:
+            continue
+        report["chunk_sets_moved"] += 1
+        if dry_run:
+            continue
+
+        destination = rag_engine.get_collection(target)
+        for source in sources:
+            collection = rag_engine.get_collection(source)
+            offset = 0
+            while True:
+                page = collection.get(
+                    where={"chunk_set": chunk_set}, limit=batch_size, offset=offset,
+                    include=["embeddings", "documents", "metadatas"]
+                )
+                if not page["ids"]:
+                    break
+                destination.upsert(
+                    ids=page["ids"], embeddings=page["embeddings"],
+                    documents=page["documents"], metadatas=page["metadatas"]
+                )
+                report["vectors_moved"] += len(page["ids"])
+                offset += len(page["ids"])
+
+        for doc in docs:
+            doc.vector_collection = target
+        db.commit()
+        # Straight from the collection: the chunk set itself, and its lexical index entries, live on
+        for source in sources:
+            rag_engine.get_collection(source).delete(where={"chunk_set": chunk_set})
+        logger.info(f"Moved chunk set {chunk_set} to {target}")
+
+    if not dry_run:
+        for name in router.names():
+            if name != DEFAULT_COLLECTION and rag_engine.get_collection(name).count() == 0:
+                router.drop(name)
+                report["collections_dropped"] += 1
+
+    report["collections"] = dict(report["collections"])
+    return report
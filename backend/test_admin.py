@@ -2,6 +2,18 @@ import requests
 
 BASE_URL = "http://localhost:8000"
 
+def list_all(path, key, cursor_param, headers):
+    # The admin listings are paged; follow next_cursor to the end
+    items, params = [], {}
+    while True:
+        res = requests.get(f"{BASE_URL}{path}", headers=headers, params=params)
+        assert res.status_code == 200
+        body = res.json()
+        items.extend(body[key])
+        if body["next_cursor"] is None:
+            return items
+        params = {cursor_param: body["next_cursor"]}
+
 def test_admin():
     # 1. Admin Login
     print("Testing Admin Login...")
@@ -19,12 +31,7 @@ def test_admin():
 
     # 2. List Users
     print("Testing Admin List Users...")
-    res = requests.get(f"{BASE_URL}/api/admin/users", headers={
-        "Authorization": f"Bearer {token}"
-    })
-    print(f"List Users Response: {res.status_code}")
-    assert res.status_code == 200
-    users = res.json()
+    users = list_all("/api/admin/users", "users", "after", {"Authorization": f"Bearer {token}"})
     print(f"Found {len(users)} users.")
     for u in users:
         print(f"- {u['name']} ({u['email']}) Admin: {u['is_admin']}")
@@ -2,6 +2,18 @@ import requests
 
 BASE_URL = "http://127.0.0.1:8000"
 
+def list_all(path, key, cursor_param, headers):
+    # The admin listings are paged; follow next_cursor to the end
+    items, params = [], {}
+    while True:
+        res = requests.get(f"{BASE_URL}{path}", headers=headers, params=params)
+        assert res.status_code == 200
+        body = res.json()
+        items.extend(body[key])
+        if body["next_cursor"] is None:
+            return items
+        params = {cursor_param: body["next_cursor"]}
+
 def test_enhanced_admin():
     # 1. Admin Login
     print("Testing Admin Login...")
@@ -14,8 +26,7 @@ def test_enhanced_admin():
 
     # 2. Toggle Status (Test with a regular user)
     # First find a regular user (not admin)
-    res = requests.get(f"{BASE_URL}/api/admin/users", headers={"Authorization": f"Bearer {token}"})
-    users = res.json()
+    users = list_all("/api/admin/users", "users", "after", {"Authorization": f"Bearer {token}"})
     print(f"Users found: {users}")
     reg_user = next((u for u in users if u["email"] != "admin@deepdoc.ai"), None)
     
@@ -34,10 +45,7 @@ def test_enhanced_admin():
 
     # 3. List Global Documents
     print("Testing Global Document Listing...")
-    res = requests.get(f"{BASE_URL}/api/admin/documents", headers={"Authorization": f"Bearer {token}"})
-    print(f"Global Docs Response: {res.status_code}")
-    assert res.status_code == 200
-    docs = res.json()
+    docs = list_all("/api/admin/documents", "documents", "before", {"Authorization": f"Bearer {token}"})
     print(f"Found {len(docs)} documents in total.")
     for d in docs:
         print(f"- {d['filename']} | Owner: {d['owner']['name']} | Status: {d['status']}")
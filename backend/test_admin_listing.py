@@ -0,0 +1,101 @@
+import json
+from datetime import datetime, timedelta
+
+from app_harness import add_user, client, headers_for, reset_database, session
+import models
+from config import settings
+
+def seed(documents: int):
+    """
+    An admin, two owners (one deactivated) and documents alternating between
+    the owners, one hour apart, every third one FAILED.
+    """
+    reset_database()
+    admin = add_user("admin@example.com", is_admin=True)
+    owners = [add_user("a_b@example.com"), add_user("axb@example.com", is_active=0)]
+    started = datetime(2024, 1, 1)
+    with session() as db:
+        db.add_all([
+            models.Document(user_id=owners[i % 2].id, filename=f"report-{i}.pdf", created_at=started + timedelta(hours=i),
+                            status=models.DocumentStatus.FAILED if i % 3 == 0 else models.DocumentStatus.READY)
+            for i in range(documents)
+        ])
+        db.commit()
+    return headers_for(admin), owners
+
+def all_pages(path: str, headers: dict, cursor_param: str, key: str, **params):
+    pages, totals, cursor = [], [], None
+    while True:
+        query = dict(params, **({cursor_param: cursor} if cursor is not None else {}))
+        body = client.get(path, params=query, headers=headers).json()
+        pages.append([row["id"] for row in body[key]])
+        totals.append(body["total"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages, totals
+
+def test_document_pages_newest_first_with_total_once():
+    headers, _ = seed(7)
+
+    pages, totals = all_pages("/api/admin/documents", headers, "before", "documents", limit=3)
+
+    assert pages == [[7, 6, 5], [4, 3, 2], [1]]
+    assert totals == [7, None, None]
+
+def test_document_filters_page_and_count_together():
+    headers, owners = seed(12)
+
+    failed, totals = all_pages("/api/admin/documents", headers, "before", "documents", limit=2, status="FAILED")
+    assert failed == [[10, 7], [4, 1]]
+    assert totals == [4, None]
+
+    owned, _ = all_pages("/api/admin/documents", headers, "before", "documents", limit=50, user_id=owners[1].id)
+    assert owned == [[12, 10, 8, 6, 4, 2]]
+
+    # created_from is inclusive, created_to exclusive
+    window = client.get("/api/admin/documents", headers=headers, params={
+        "created_from": "2024-01-01T02:00:00", "created_to": "2024-01-01T05:00:00"}).json()
+    assert [row["id"] for row in window["documents"]] == [5, 4, 3]
+    assert window["total"] == 3
+    assert window["documents"][0]["owner"] == {"name": "a_b", "email": "a_b@example.com"}
+
+def test_user_pages_and_filters():
+    headers, _ = seed(0)
+
+    pages, totals = all_pages("/api/admin/users", headers, "after", "users", limit=2)
+    assert pages == [[1, 2], [3]]
+    assert totals == [3, None]
+
+    # The underscore is matched literally, not as a LIKE wildcard
+    search = client.get("/api/admin/users", headers=headers, params={"search": "a_"}).json()
+    assert [row["email"] for row in search["users"]] == ["a_b@example.com"]
+    inactive = client.get("/api/admin/users", headers=headers, params={"is_active": False}).json()
+    assert [row["email"] for row in inactive["users"]] == ["axb@example.com"]
+    assert "hashed_password" not in search["users"][0]
+
+def test_export_streams_every_match():
+    headers, _ = seed(6)
+    page_size = settings.ADMIN_MAX_PAGE_SIZE
+    # Small batches, so the export crosses batch boundaries, including one at the very end
+    settings.ADMIN_MAX_PAGE_SIZE = 2
+    try:
+        ready = client.get("/api/admin/documents/export", headers=headers, params={"status": "READY"})
+        everything = client.get("/api/admin/documents/export", headers=headers)
+    finally:
+        settings.ADMIN_MAX_PAGE_SIZE = page_size
+
+    assert [json.loads(line)["id"] for line in ready.text.splitlines()] == [6, 5, 3, 2]
+    assert [json.loads(line)["id"] for line in everything.text.splitlines()] == [6, 5, 4, 3, 2, 1]
+
+def test_listing_needs_an_admin():
+    _, owners = seed(1)
+
+    assert client.get("/api/admin/documents", headers=headers_for(owners[0])).status_code == 403
+
+if __name__ == "__main__":
+    test_document_pages_newest_first_with_total_once()
+    test_document_filters_page_and_count_together()
+    test_user_pages_and_filters()
+    test_export_streams_every_match()
+    test_listing_needs_an_admin()
+    print("\n✅ Admin listing checks passed!")
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.answer_cache import SemanticAnswerCache
+from services.rag_engine import RAGEngine
+
+SCOPE = {"docs": ["a" * 64]}
+HISTORY = [{"role": "USER", "content": "List the report's findings."},
+           {"role": "ASSISTANT", "content": "1. Costs rose. 2. Sales fell."}]
+
+class FixedEmbeddingService:
+    """Stands in for the embedding model: every question embeds to the same vector."""
+    def __init__(self):
+        self.calls = 0
+
+    async def aembed_query(self, text):
+        self.calls += 1
+        return [1.0, 0.0, 0.0]
+
+def make_engine():
+    engine = RAGEngine.__new__(RAGEngine)
+    engine.embedding_service = FixedEmbeddingService()
+    engine.answer_cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    return engine
+
+def test_opening_question_is_cached():
+    engine = make_engine()
+    embedding, cached = asyncio.run(engine._cached_answer("And the second one?", SCOPE))
+    assert cached is None
+    engine.answer_cache.put(SCOPE, embedding, "Sales fell.", [], 100.0)
+
+    _, cached = asyncio.run(engine._cached_answer("And the second one?", SCOPE))
+    assert cached["answer"] == "Sales fell."
+
+def test_follow_up_bypasses_the_cache():
+    engine = make_engine()
+    embedding, _ = asyncio.run(engine._cached_answer("And the second one?", SCOPE))
+    engine.answer_cache.put(SCOPE, embedding, "An answer from another conversation.", [], 100.0)
+    calls = engine.embedding_service.calls
+
+    embedding, cached = asyncio.run(engine._cached_answer("And the second one?", SCOPE, HISTORY))
+
+    # No lookup, and no embedding to store the answer under afterwards
+    assert cached is None
+    assert embedding is None
+    assert engine.embedding_service.calls == calls
+
+def test_answers_stay_within_their_scope():
+    cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    folder = {"docs": ["a" * 64, "b" * 64]}
+    cache.put(folder, [1.0, 0.0, 0.0], "From both reports.", [], 100.0)
+
+    # Same question over a different set of documents
+    assert cache.get(SCOPE, [1.0, 0.0, 0.0]) is None
+    assert cache.get({"docs": ["a" * 64, "c" * 64]}, [1.0, 0.0, 0.0]) is None
+    # The same documents listed in another order are the same scope
+    assert cache.get({"docs": ["b" * 64, "a" * 64]}, [1.0, 0.0, 0.0])["answer"] == "From both reports."
+
+def test_only_similar_questions_hit():
+    cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    cache.put(SCOPE, [1.0, 0.0, 0.0], "Sales fell.", [], 100.0)
+
+    assert cache.get(SCOPE, [0.99, 0.05, 0.0])["answer"] == "Sales fell."
+    assert cache.get(SCOPE, [0.6, 0.8, 0.0]) is None
+
+def test_reindexing_a_chunk_set_invalidates_every_scope_with_it():
+    cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    folder = {"docs": ["a" * 64, "b" * 64]}
+    other = {"docs": ["c" * 64]}
+    for scope in (SCOPE, folder, other):
+        cache.put(scope, [1.0, 0.0, 0.0], "An answer.", [], 100.0)
+
+    cache.invalidate("a" * 64)
+
+    assert cache.get(SCOPE, [1.0, 0.0, 0.0]) is None
+    assert cache.get(folder, [1.0, 0.0, 0.0]) is None
+    assert cache.get(other, [1.0, 0.0, 0.0]) is not None
+    assert cache.stats()["entries"] == 1
+
+if __name__ == "__main__":
+    test_opening_question_is_cached()
+    test_follow_up_bypasses_the_cache()
+    test_answers_stay_within_their_scope()
+    test_only_similar_questions_hit()
+    test_reindexing_a_chunk_set_invalidates_every_scope_with_it()
+    print("\n✅ Answer cache checks passed!")
@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from bench_pdf_extract import make_synthetic_pdf
+import models
+from services.bulk_ingest import BulkIngester, Checkpoint
+
+class FlakyRAGEngine:
+    """Stands in for RAGEngine; indexing fails for the files named in failing."""
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.indexed = []
+        self.router = self
+
+    def route(self, doc):
+        return "docs"
+
+    def add_document(self, filename, chunks, **kwargs):
+        if filename in self.failing:
+            raise RuntimeError("database connection lost")
+        self.indexed.append(filename)
+        return len(chunks)
+
+def write_pdfs(directory: str, names):
+    paths = []
+    for name in names:
+        path = os.path.join(directory, f"{name}.pdf")
+        with open(path, "wb") as f:
+            f.write(make_synthetic_pdf(2, words_per_page=50, label=name))
+        paths.append(path)
+    return paths
+
+def test_failed_pdfs_are_retried_on_resume():
+    workdir = tempfile.mkdtemp()
+    paths = write_pdfs(workdir, ["alpha", "beta"])
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        db.add(models.User(id=1, email="reader@example.com", name="Reader", hashed_password="x"))
+        db.commit()
+    checkpoint_path = os.path.join(workdir, "checkpoint.jsonl")
+
+    def run(rag_engine):
+        ingester = BulkIngester(session_factory, rag_engine, user_id=1, parse_workers=1,
+                                upload_dir=os.path.join(workdir, "uploads"))
+        return ingester.run(paths, Checkpoint(checkpoint_path))
+
+    first = run(FlakyRAGEngine(failing={"beta.pdf"}))
+    retry_engine = FlakyRAGEngine()
+    second = run(retry_engine)
+
+    assert (first["indexed"], first["failed"]) == (1, 1)
+    assert (second["skipped"], second["indexed"], second["failed"]) == (1, 1, 0)
+    assert retry_engine.indexed == ["beta.pdf"]
+    assert all(Checkpoint(checkpoint_path).is_finished(path) for path in paths)
+    with session_factory() as db:
+        # The failed attempt's row is indexed again rather than duplicated
+        rows = db.query(models.Document.filename, models.Document.status).order_by(models.Document.id).all()
+    assert rows == [("alpha.pdf", models.DocumentStatus.READY), ("beta.pdf", models.DocumentStatus.READY)]
+
+if __name__ == "__main__":
+    test_failed_pdfs_are_retried_on_resume()
+    print("\n✅ Bulk ingest resume check passed!")
@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+from app_harness import add_user, reset_database, session
+from fakes import GatedModel
+import database
+import main
+import models
+
+class FakeRequest:
+    """Stands in for the HTTP request; reports a disconnect once disconnected() says so."""
+    def __init__(self, disconnected=lambda: False):
+        self.disconnected = disconnected
+
+    async def is_disconnected(self):
+        return self.disconnected()
+
+async def fake_completion(messages, model, stream=False):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="An answer"))])
+
+def seed():
+    reset_database()
+    user = add_user("reader@example.com")
+    with session() as db:
+        doc = models.Document(user_id=user.id, filename="report.pdf", content_hash="a" * 64,
+                              chunk_set_id="a" * 64, status=models.DocumentStatus.READY)
+        doc.vector_collection = main.rag_engine.router.route(doc)
+        db.add(doc)
+        db.commit()
+        return user, doc.id
+
+async def ask(user, document_id, question, http_request):
+    async with database.AsyncSessionLocal() as db:
+        return await main.chat(main.ChatRequest(question=question, document_id=document_id), http_request, db, user)
+
+async def disconnect_time_out_then_answer(model, user, document_id):
+    # The client goes away while its question is being embedded
+    disconnected = await ask(user, document_id, "What is in the report?", FakeRequest(model.encoding.is_set))
+
+    # The next question waits behind it in the batcher until the chat times out
+    aquery = main.rag_engine.aquery
+    main.rag_engine.aquery = lambda *args, **kwargs: aquery(*args, timeout=0.2, **kwargs)
+    try:
+        timed_out = await ask(user, document_id, "Who wrote the report?", FakeRequest())
+    finally:
+        main.rag_engine.aquery = aquery
+
+    model.gate.set()
+    answered = await asyncio.wait_for(ask(user, document_id, "When was it published?", FakeRequest()), timeout=10)
+    return disconnected, timed_out, answered
+
+def test_chat_is_served_after_cancelled_embeddings():
+    model = GatedModel()
+    main.embedding_service._load_model = lambda: model
+    main.rag_engine.async_groq_client = SimpleNamespace(chat=SimpleNamespace(
+        completions=SimpleNamespace(create=fake_completion)))
+    user, document_id = seed()
+
+    disconnected, timed_out, answered = asyncio.run(disconnect_time_out_then_answer(model, user, document_id))
+
+    assert disconnected.status_code == 499
+    assert timed_out.status_code == 504
+    assert answered["answer"] == "An answer"
+    assert main.embedding_service._thread.is_alive()
+
+if __name__ == "__main__":
+    test_chat_is_served_after_cancelled_embeddings()
+    print("\n✅ Chat cancellation check passed!")
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from app_harness import add_user, client, reset_database, session
+import models
+
+def seed_conversation(messages: int):
+    """
+    One document conversation of alternating turns, plus another
+    conversation's messages at the same times. Every timestamp is shared by
+    two consecutive messages, so pages must break ties by id.
+    """
+    reset_database()
+    user = add_user("reader@example.com")
+    with session() as db:
+        doc = models.Document(user_id=user.id, filename="report.pdf", status=models.DocumentStatus.READY)
+        db.add(doc)
+        db.commit()
+        conv, other = (models.Conversation(user_id=user.id, document_id=doc.id),
+                       models.Conversation(user_id=user.id, document_id=None))
+        db.add_all([conv, other])
+        db.commit()
+        started = datetime(2024, 1, 1)
+        for i in range(messages):
+            created_at = started + timedelta(seconds=i // 2)
+            db.add(models.Message(conversation_id=conv.id, content=f"message {i}", created_at=created_at,
+                                  role=models.Role.USER if i % 2 == 0 else models.Role.ASSISTANT))
+            db.add(models.Message(conversation_id=other.id, content="elsewhere", created_at=created_at,
+                                  role=models.Role.USER))
+            db.commit()
+        return doc.id
+
+def all_pages(document_id: int, limit: int):
+    pages, before = [], None
+    while True:
+        params = {"limit": limit} if before is None else {"limit": limit, "before": before}
+        body = client.get(f"/api/chat/history/{document_id}", params=params).json()
+        pages.append([message["content"] for message in body["messages"]])
+        before = body["next_cursor"]
+        if before is None:
+            return pages
+
+def test_pages_cover_history_once_in_order():
+    document_id = seed_conversation(7)
+
+    pages = all_pages(document_id, limit=3)
+
+    assert pages == [["message 4", "message 5", "message 6"],
+                     ["message 1", "message 2", "message 3"],
+                     ["message 0"]]
+
+def test_last_full_page_has_no_cursor():
+    document_id = seed_conversation(6)
+
+    pages = all_pages(document_id, limit=3)
+
+    assert pages == [["message 3", "message 4", "message 5"], ["message 0", "message 1", "message 2"]]
+
+def test_limit_is_clamped():
+    document_id = seed_conversation(3)
+
+    body = client.get(f"/api/chat/history/{document_id}", params={"limit": 0}).json()
+
+    assert [message["content"] for message in body["messages"]] == ["message 2"]
+    assert body["next_cursor"] is not None
+
+def test_unknown_conversation_and_bad_cursor():
+    document_id = seed_conversation(2)
+
+    assert client.get("/api/chat/history/999").json() == {"messages": [], "next_cursor": None}
+    response = client.get(f"/api/chat/history/{document_id}", params={"before": "not-a-cursor"})
+    assert response.status_code == 400
+
+if __name__ == "__main__":
+    test_pages_cover_history_once_in_order()
+    test_last_full_page_has_no_cursor()
+    test_limit_is_clamped()
+    test_unknown_conversation_and_bad_cursor()
+    print("\n✅ Chat history pagination checks passed!")
@@ -0,0 +1,60 @@
+import json
+
+from app_harness import add_user, client, headers_for, reset_database, session
+import main
+import models
+
+CHUNK_SET = "a" * 64
+
+def seed():
+    """
+    Two users upload the same PDF. The chunk set was indexed for the first
+    one, so its chunk metadata names their document.
+    """
+    reset_database()
+    first, second = add_user("first@example.com"), add_user("second@example.com")
+    with session() as db:
+        folder = models.Folder(user_id=second.id, name="Reports")
+        db.add(folder)
+        db.commit()
+        original = models.Document(user_id=first.id, filename="q3-board-pack.pdf", content_hash=CHUNK_SET,
+                                   chunk_set_id=CHUNK_SET, status=models.DocumentStatus.READY)
+        copy = models.Document(user_id=second.id, folder_id=folder.id, filename="report.pdf",
+                               content_hash=CHUNK_SET, chunk_set_id=CHUNK_SET, status=models.DocumentStatus.READY)
+        db.add_all([original, copy])
+        db.commit()
+        source = {"filename": original.filename, "page": 3, "chunk_set": CHUNK_SET,
+                  "document_id": original.id, "user_id": first.id}
+        return second, copy, source
+
+def answering_with(source):
+    async def aquery(question, history=None, scope=None):
+        return {"answer": "An answer", "sources": [source], "prompt_tokens": 10}
+
+    async def astream(question, history=None, scope=None):
+        yield "sources", [source]
+        yield "token", "An answer"
+    return aquery, astream
+
+def test_sources_name_the_askers_own_document():
+    user, copy, source = seed()
+    rag_aquery, rag_astream = main.rag_engine.aquery, main.rag_engine.astream
+    main.rag_engine.aquery, main.rag_engine.astream = answering_with(source)
+    try:
+        by_document = client.post("/api/chat/ask", json={"question": "Q?", "document_id": copy.id},
+                                  headers=headers_for(user)).json()
+        stream = client.post("/api/chat/stream", json={"question": "Q?", "folder_id": copy.folder_id},
+                             headers=headers_for(user)).text
+    finally:
+        main.rag_engine.aquery, main.rag_engine.astream = rag_aquery, rag_astream
+
+    expected = [{"filename": "report.pdf", "page": 3, "chunk_set": CHUNK_SET, "document_id": copy.id,
+                 "user_id": user.id, "folder_id": copy.folder_id}]
+    assert by_document["sources"] == expected
+    sources_event = stream.split("\n\n")[0]
+    assert sources_event.startswith("event: sources")
+    assert json.loads(sources_event.split("data: ", 1)[1]) == expected
+
+if __name__ == "__main__":
+    test_sources_name_the_askers_own_document()
+    print("\n✅ Chat source attribution check passed!")
@@ -0,0 +1,162 @@
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from config import settings
+from services import document_store
+
+class RecordingRAGEngine:
+    """Stands in for RAGEngine; records which vectors would be deleted."""
+    def __init__(self):
+        self.deleted = []
+
+    def delete_chunk_set(self, chunk_set_id, collection):
+        self.deleted.append(("chunk_set", chunk_set_id, collection))
+
+    def delete_document_vectors(self, document_id, collection):
+        self.deleted.append(("document", document_id, collection))
+
+def new_session():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(models.User(id=1, email="reader@example.com", name="Reader", hashed_password="x"))
+    db.commit()
+    return db
+
+def stored_file(name: str):
+    path = os.path.join(settings.UPLOAD_DIR, name)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4")
+    return path
+
+def indexed(db, content_hash: str, file_path: str, collection: str = "docs"):
+    doc = models.Document(user_id=1, filename="report.pdf", file_path=file_path, content_hash=content_hash,
+                          chunk_set_id=content_hash, vector_collection=collection, page_count=3, pages_parsed=3,
+                          chunk_count=12, chunks_embedded=12, status=models.DocumentStatus.READY)
+    db.add(doc)
+    db.commit()
+    return doc
+
+def delete(db, rag_engine, doc):
+    document_store.drop_unreferenced(rag_engine, document_store.delete_document(db, doc))
+
+UPLOAD_DIR = settings.UPLOAD_DIR
+
+def setup_function():
+    # Stored files are only ever removed from the upload directory
+    settings.UPLOAD_DIR = tempfile.mkdtemp()
+
+def teardown_function():
+    settings.UPLOAD_DIR = UPLOAD_DIR
+
+def test_identical_upload_shares_the_chunk_set():
+    db = new_session()
+    source = indexed(db, "a" * 64, stored_file("a.pdf"))
+    pending = models.Document(user_id=1, filename="copy.pdf", content_hash="a" * 64, status=models.DocumentStatus.PROCESSING)
+    db.add(pending)
+    db.commit()
+
+    duplicate = document_store.find_indexed_duplicate(db, "a" * 64, exclude_id=pending.id)
+    document_store.link_to_duplicate(pending, duplicate)
+    db.commit()
+
+    assert duplicate.id == source.id
+    assert (pending.chunk_set_id, pending.vector_collection, pending.file_path) == \
+           (source.chunk_set_id, source.vector_collection, source.file_path)
+    assert pending.status == models.DocumentStatus.READY
+    assert pending.chunk_count == 12
+    assert document_store.chunk_set_refcount(db, "a" * 64) == 2
+    # Only READY documents are reused
+    assert document_store.find_indexed_duplicate(db, "b" * 64) is None
+
+def test_shared_chunk_set_is_released_with_its_last_document():
+    db = new_session()
+    rag_engine = RecordingRAGEngine()
+    path = stored_file("a.pdf")
+    first, second = indexed(db, "a" * 64, path), indexed(db, "a" * 64, path)
+    other = indexed(db, "b" * 64, stored_file("b.pdf"))
+
+    delete(db, rag_engine, first)
+    assert rag_engine.deleted == []
+    assert os.path.exists(path)
+
+    delete(db, rag_engine, second)
+    assert rag_engine.deleted == [("chunk_set", "a" * 64, "docs")]
+    assert not os.path.exists(path)
+    assert os.path.exists(other.file_path)
+
+def test_legacy_document_vectors_are_dropped_by_id():
+    db = new_session()
+    rag_engine = RecordingRAGEngine()
+    legacy = models.Document(user_id=1, filename="old.pdf", file_path="old.pdf", status=models.DocumentStatus.READY)
+    db.add(legacy)
+    db.commit()
+    legacy_id = legacy.id
+
+    delete(db, rag_engine, legacy)
+
+    assert rag_engine.deleted == [("document", legacy_id, None)]
+
+def test_pending_replacement_keeps_its_file():
+    db = new_session()
+    rag_engine = RecordingRAGEngine()
+    replacement = stored_file("b.pdf")
+    doc = indexed(db, "a" * 64, stored_file("a.pdf"))
+    doc.pending_file_path = replacement
+    doc.pending_content_hash = "b" * 64
+    db.commit()
+
+    document_store.release_file(db, replacement)
+    assert os.path.exists(replacement)
+
+    delete(db, rag_engine, doc)
+    assert not os.path.exists(replacement)
+
+def test_files_outside_the_upload_dir_are_never_removed():
+    db = new_session()
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        outside = f.name
+    try:
+        document_store.release_file(db, outside)
+        assert os.path.exists(outside)
+    finally:
+        os.remove(outside)
+
+def test_release_chunk_set_keeps_a_referenced_set():
+    db = new_session()
+    rag_engine = RecordingRAGEngine()
+    indexed(db, "a" * 64, stored_file("a.pdf"))
+
+    document_store.release_chunk_set(db, rag_engine, "a" * 64, "docs")
+    document_store.release_chunk_set(db, rag_engine, "c" * 64, "docs")
+
+    assert rag_engine.deleted == [("chunk_set", "c" * 64, "docs")]
+
+def test_sources_outside_the_askers_documents_lose_owner_fields():
+    shared = {"filename": "theirs.pdf", "page": 1, "chunk_set": "a" * 64, "document_id": 1, "user_id": 1}
+    other = {"filename": "other.pdf", "page": 2, "chunk_set": "b" * 64, "document_id": 2, "user_id": 1,
+             "folder_id": 4}
+
+    sources = document_store.own_sources([shared, other], [("a" * 64, 7, "mine.pdf", None)], user_id=2)
+
+    assert sources == [{"filename": "mine.pdf", "page": 1, "chunk_set": "a" * 64, "document_id": 7, "user_id": 2},
+                       {"page": 2, "chunk_set": "b" * 64}]
+
+if __name__ == "__main__":
+    for test in (test_identical_upload_shares_the_chunk_set, test_shared_chunk_set_is_released_with_its_last_document,
+                 test_legacy_document_vectors_are_dropped_by_id, test_pending_replacement_keeps_its_file,
+                 test_files_outside_the_upload_dir_are_never_removed, test_release_chunk_set_keeps_a_referenced_set,
+                 test_sources_outside_the_askers_documents_lose_owner_fields):
+        setup_function()
+        try:
+            test()
+        finally:
+            teardown_function()
+    print("\n✅ Chunk set refcount checks passed!")
@@ -0,0 +1,42 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import GatedModel
+from services.embedding_service import EmbeddingService
+
+class GatedEmbeddingService(EmbeddingService):
+    def __init__(self, model):
+        self.gated_model = model
+        super().__init__(model_name="gated", device="cpu", max_batch_size=8, max_wait_ms=1)
+
+    def _load_model(self):
+        return self.gated_model
+
+async def cancel_then_query(service: EmbeddingService, model: GatedModel):
+    # One query held inside the model, one waiting behind it on the queue; both give up
+    running = asyncio.create_task(service.aembed_query("held"))
+    await asyncio.get_running_loop().run_in_executor(None, model.encoding.wait, 5)
+    queued = asyncio.create_task(service.aembed_query("queued"))
+    await asyncio.sleep(0.05)
+    running.cancel()
+    queued.cancel()
+    await asyncio.gather(running, queued, return_exceptions=True)
+    model.gate.set()
+    return await asyncio.wait_for(service.aembed_query("after"), timeout=5)
+
+def test_cancelled_query_does_not_stop_the_batcher():
+    model = GatedModel()
+    service = GatedEmbeddingService(model)
+
+    vector = asyncio.run(cancel_then_query(service, model))
+
+    assert vector == [5.0, 1.0, 0.0]
+    assert service._thread.is_alive()
+    assert service.embed_query("sync") == [4.0, 1.0, 0.0]
+
+if __name__ == "__main__":
+    test_cancelled_query_does_not_stop_the_batcher()
+    print("\n✅ Embedding batcher cancellation check passed!")
@@ -0,0 +1,121 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app_harness import add_user, reset_database, scratch, session
+import models
+from services.ingestion import IngestionQueue
+
+class PageChunker:
+    """One chunk per page."""
+    def feed(self, page_texts, first_page):
+        return [{"text": text, "page": first_page + i} for i, text in enumerate(page_texts)]
+
+    def finish(self):
+        return []
+
+class FakePDFProcessor:
+    def __init__(self, pages: int):
+        self.pages = pages
+
+    def count_pages(self, file_path):
+        return self.pages
+
+    def new_chunker(self):
+        return PageChunker()
+
+class RowWatchingRAGEngine:
+    """Records, at each batch, the progress another worker would read from the document row."""
+    def __init__(self, document_id: int):
+        self.document_id = document_id
+        self.seen = []
+
+    def add_document(self, filename, chunks, **kwargs):
+        with session() as db:
+            doc = db.get(models.Document, self.document_id)
+            self.seen.append((doc.pages_parsed, doc.chunks_embedded))
+
+class ThreadedIngestionQueue(IngestionQueue):
+    """Parses fake pages on threads instead of PDFs in a process pool."""
+    async def start(self):
+        await super().start()
+        self._parse_pool.shutdown()
+        self._parse_pool = ThreadPoolExecutor(max_workers=1)
+
+    async def _iter_page_shards(self, file_path, total_pages):
+        for first_page in range(0, total_pages, 2):
+            yield first_page, [f"page {i}" for i in range(first_page, min(first_page + 2, total_pages))]
+
+def processing_document(user, **columns):
+    path = os.path.join(scratch, "report.pdf")
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4")
+    with session() as db:
+        doc = models.Document(user_id=user.id, filename="report.pdf", file_path=path, content_hash="abc",
+                              chunk_set_id="abc", vector_collection="docs",
+                              status=models.DocumentStatus.PROCESSING, **columns)
+        db.add(doc)
+        db.commit()
+        return doc.id
+
+async def ingest(queue: IngestionQueue, document_id: int):
+    await queue.start()
+    try:
+        await queue._ingest(document_id)
+    finally:
+        await queue.stop()
+
+def test_progress_reaches_the_row_while_indexing():
+    reset_database()
+    document_id = processing_document(add_user("reader@example.com"))
+    rag_engine = RowWatchingRAGEngine(document_id)
+    queue = ThreadedIngestionQueue(FakePDFProcessor(pages=6), rag_engine, parse_workers=1,
+                                   embed_batch_size=2, concurrent_documents=1, progress_save_seconds=0)
+
+    asyncio.run(ingest(queue, document_id))
+
+    assert rag_engine.seen == [(0, 0), (2, 2), (4, 4)]
+    with session() as db:
+        doc = db.get(models.Document, document_id)
+        assert doc.status == models.DocumentStatus.READY
+        assert (doc.pages_parsed, doc.chunks_embedded) == (6, 6)
+        assert doc.ingest_owner is None
+
+def test_recovery_leaves_documents_other_workers_hold():
+    reset_database()
+    user = add_user("reader@example.com")
+    now = datetime.utcnow()
+    unclaimed = processing_document(user)
+    held = processing_document(user, ingest_owner="other-worker", ingest_heartbeat_at=now)
+    abandoned = processing_document(user, ingest_owner="dead-worker", ingest_heartbeat_at=now - timedelta(hours=1))
+    first, second = (IngestionQueue(FakePDFProcessor(pages=1), None, lease_seconds=60) for _ in range(2))
+    second.owner = "second-worker"
+
+    assert first.recover() == 2
+    assert second.recover() == 0
+    assert sorted(first._progress) == [unclaimed, abandoned]
+    with session() as db:
+        owners = {doc.id: doc.ingest_owner for doc in db.query(models.Document)}
+    assert owners == {unclaimed: first.owner, held: "other-worker", abandoned: first.owner}
+
+def test_document_held_elsewhere_is_not_ingested():
+    reset_database()
+    document_id = processing_document(add_user("reader@example.com"), ingest_owner="other-worker",
+                                      ingest_heartbeat_at=datetime.utcnow())
+    rag_engine = RowWatchingRAGEngine(document_id)
+    queue = ThreadedIngestionQueue(FakePDFProcessor(pages=6), rag_engine, parse_workers=1,
+                                   embed_batch_size=2, concurrent_documents=1)
+
+    asyncio.run(ingest(queue, document_id))
+
+    assert rag_engine.seen == []
+    with session() as db:
+        doc = db.get(models.Document, document_id)
+        assert (doc.status, doc.ingest_owner) == (models.DocumentStatus.PROCESSING, "other-worker")
+
+if __name__ == "__main__":
+    test_progress_reaches_the_row_while_indexing()
+    test_recovery_leaves_documents_other_workers_hold()
+    test_document_held_elsewhere_is_not_ingested()
+    print("\n✅ Ingestion checks passed!")
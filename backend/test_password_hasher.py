@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+from app_harness import add_user, client, reset_database
+import auth
+from services.password_hasher import PasswordHasher, PasswordHashingBusy
+
+class GatedContext:
+    """Stands in for the passlib context; hashing waits until the test opens the gate."""
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def hash(self, password):
+        self.gate.wait(timeout=5)
+        return f"hashed:{password}"
+
+    def verify_and_update(self, password, hashed_password):
+        self.gate.wait(timeout=5)
+        return hashed_password == f"hashed:{password}", None
+
+async def burst(hasher: PasswordHasher, context: GatedContext, attempts: int):
+    """
+    Starts attempts hashes at once; returns the ones rejected before the gate
+    opens and the results of the rest.
+    """
+    tasks = [asyncio.ensure_future(hasher.hash(f"password-{i}")) for i in range(attempts)]
+    await asyncio.sleep(0.05)
+    rejected = [task for task in tasks if task.done() and isinstance(task.exception(), PasswordHashingBusy)]
+    context.gate.set()
+    accepted = await asyncio.gather(*(task for task in tasks if task not in rejected))
+    return len(rejected), accepted
+
+def test_burst_beyond_max_pending_is_rejected_at_once():
+    context = GatedContext()
+    hasher = PasswordHasher(context, workers=1, max_pending=2)
+
+    rejected, accepted = asyncio.run(burst(hasher, context, attempts=5))
+
+    assert rejected == 3
+    assert accepted == ["hashed:password-0", "hashed:password-1"]
+    assert hasher.metrics()["rejected"] == 3
+    assert hasher.metrics()["pending"] == 0
+    # Capacity is back once the burst drains
+    assert asyncio.run(hasher.hash("later")) == "hashed:later"
+
+async def give_up_while_hashing(hasher: PasswordHasher, context: GatedContext):
+    """
+    Cancels a hash the pool is running, as a disconnecting client would;
+    returns whether another hash was admitted before and after it finished.
+    """
+    running = asyncio.ensure_future(hasher.hash("abandoned"))
+    await asyncio.sleep(0.05)
+    running.cancel()
+    await asyncio.gather(running, return_exceptions=True)
+    try:
+        await hasher.hash("while-running")
+        admitted_while_running = True
+    except PasswordHashingBusy:
+        admitted_while_running = False
+    context.gate.set()
+    while hasher.metrics()["pending"]:
+        await asyncio.sleep(0.01)
+    return admitted_while_running, await hasher.hash("after")
+
+def test_cancelled_hash_holds_its_slot_until_the_pool_finishes_it():
+    context = GatedContext()
+    hasher = PasswordHasher(context, workers=1, max_pending=1)
+
+    admitted_while_running, after = asyncio.run(give_up_while_hashing(hasher, context))
+
+    assert admitted_while_running is False
+    assert after == "hashed:after"
+    assert hasher.metrics()["pending"] == 0
+
+def test_busy_hasher_answers_503_with_retry_after():
+    reset_database()
+    add_user("reader@example.com")
+    hasher = auth.password_hasher
+    context = GatedContext()
+    context.gate.set()
+    auth.password_hasher = PasswordHasher(context, workers=1, max_pending=0)
+    try:
+        login = client.post("/api/auth/login", json={"email": "reader@example.com", "password": "pw"})
+        signup = client.post("/api/auth/signup", json={"email": "new@example.com", "password": "pw", "name": "New"})
+    finally:
+        auth.password_hasher = hasher
+
+    for response in (login, signup):
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+if __name__ == "__main__":
+    test_burst_beyond_max_pending_is_rejected_at_once()
+    test_cancelled_hash_holds_its_slot_until_the_pool_finishes_it()
+    test_busy_hasher_answers_503_with_retry_after()
+    print("\n✅ Password hasher checks passed!")
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.answer_cache import SemanticAnswerCache
+from services.metrics import RollingStats
+from services.rag_engine import RAGEngine
+
+RESULTS = {"ids": ["1"], "documents": ["Costs rose."], "metadatas": [{"page": 1}]}
+
+class SlowContextBuilder:
+    """Stands in for the context builder while its tokenizer loads; records where it ran."""
+    def __init__(self):
+        self.threads = []
+
+    def build(self, query_text, results, history):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(0.3)
+        return {"messages": [{"role": "user", "content": query_text}], "prompt_tokens": 10, "used": [0]}
+
+class FixedEmbeddingService:
+    async def aembed_query(self, text):
+        return [1.0, 0.0, 0.0]
+
+class FakeStream:
+    def __init__(self, texts):
+        self.texts = texts
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for text in self.texts:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    async def close(self):
+        pass
+
+def make_engine():
+    engine = RAGEngine.__new__(RAGEngine)
+    engine.context_builder = SlowContextBuilder()
+    engine.embedding_service = FixedEmbeddingService()
+    engine.answer_cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    engine.retrieval_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrieval")
+    for stats in ("retrieval_ms", "ttft_ms", "answer_ms", "prompt_tokens"):
+        setattr(engine, stats, RollingStats())
+
+    async def acontext(query_text, n_results, scope, user_id, embedding):
+        return RESULTS
+    engine.acontext = acontext
+
+    async def create(messages, model, stream=False):
+        if stream:
+            return FakeStream(["Costs ", "rose."])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Costs rose."))])
+    engine.async_groq_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return engine
+
+async def ticks_while(work):
+    """Runs work and counts how often the event loop got to run something else meanwhile."""
+    ticks = 0
+    task = asyncio.ensure_future(work)
+    while not task.done():
+        ticks += 1
+        await asyncio.sleep(0.01)
+    return await task, ticks
+
+async def collect(stream):
+    return [event async for event in stream]
+
+def test_prompt_is_built_off_the_event_loop():
+    engine = make_engine()
+
+    answer, answer_ticks = asyncio.run(ticks_while(engine.aquery("What happened?", timeout=5)))
+    events, stream_ticks = asyncio.run(ticks_while(collect(engine.astream("What happened to costs?"))))
+
+    assert answer["answer"] == "Costs rose."
+    assert events[0] == ("sources", [{"page": 1}])
+    assert all(name.startswith("retrieval") for name in engine.context_builder.threads)
+    assert len(engine.context_builder.threads) == 2
+    # The 0.3s builds would allow no ticks at all on the loop's thread
+    assert answer_ticks > 10 and stream_ticks > 10
+
+if __name__ == "__main__":
+    test_prompt_is_built_off_the_event_loop()
+    print("\n✅ Prompt assembly check passed!")
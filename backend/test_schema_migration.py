@@ -0,0 +1,81 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+import models
+
+# The documents table as the first release created it
+FIRST_RELEASE_DOCUMENTS = """
+CREATE TABLE documents (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id),
+    folder_id INTEGER REFERENCES folders(id),
+    filename VARCHAR(255),
+    file_path VARCHAR(500),
+    chroma_collection_id VARCHAR(100) UNIQUE,
+    page_count INTEGER,
+    status VARCHAR(10),
+    created_at DATETIME
+)
+"""
+
+def first_release_database():
+    engine = create_engine("sqlite://")
+    tables = [table for name, table in models.Base.metadata.tables.items() if name != "documents"]
+    models.Base.metadata.create_all(engine, tables=tables)
+    models.message_history_index.drop(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(FIRST_RELEASE_DOCUMENTS))
+        conn.execute(text("INSERT INTO users (id, email, name, hashed_password) VALUES (1, 'a@example.com', 'A', 'x')"))
+        conn.execute(text("INSERT INTO documents (id, user_id, filename, file_path, page_count, status) "
+                          "VALUES (1, 1, 'report.pdf', 'report.pdf', 3, 'READY')"))
+    return engine
+
+def test_migration_adds_columns_and_indexes():
+    engine = first_release_database()
+
+    models.migrate_schema(engine)
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("documents")}
+    assert {attribute.key for attribute in models.ADDED_COLUMNS} <= columns
+    indexes = {index["name"] for table in ("documents", "messages") for index in inspector.get_indexes(table)}
+    assert {index.name for index in models.ADDED_INDEXES} <= indexes
+
+    # Existing rows load through the current model
+    with sessionmaker(bind=engine)() as db:
+        doc = db.get(models.Document, 1)
+        assert doc.status == models.DocumentStatus.READY
+        assert doc.chunk_set_id is None
+        assert doc.chunk_count == 0
+
+def test_migration_is_idempotent():
+    engine = first_release_database()
+    models.migrate_schema(engine)
+    indexes = inspect(engine).get_indexes("documents")
+
+    models.migrate_schema(engine)
+
+    assert inspect(engine).get_indexes("documents") == indexes
+
+def test_indexes_created_under_other_names_are_kept():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    models.document_status_index.drop(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX idx_documents_status_manual ON documents (status)"))
+
+    models.migrate_schema(engine)
+
+    status_indexes = [index for index in inspect(engine).get_indexes("documents") if index["column_names"] == ["status"]]
+    assert [index["name"] for index in status_indexes] == ["idx_documents_status_manual"]
+
+if __name__ == "__main__":
+    test_migration_adds_columns_and_indexes()
+    test_migration_is_idempotent()
+    test_indexes_created_under_other_names_are_kept()
+    print("\n✅ Schema migration checks passed!")
@@ -0,0 +1,74 @@
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pdf_extract import make_synthetic_pdf
+from services.pdf_processor import PDFProcessor
+from services.rag_engine import RAGEngine
+
+BATCH_SIZE = 64
+
+class RecordingCollection:
+    """Stands in for the Chroma collection; keeps batch sizes, drops the data."""
+    def __init__(self):
+        self.batch_sizes = []
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.batch_sizes.append(len(ids))
+
+class NullEmbeddingService:
+    """Stands in for the embedding model, which is not what this test measures."""
+    def embed_documents(self, texts):
+        return [[0.0]] * len(texts)
+
+def measure_ingest(num_pages: int):
+    """
+    Returns (pipeline overhead bytes, batch sizes) for streaming a synthetic PDF
+    through PDFProcessor.iter_chunks into RAGEngine.add_document.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(make_synthetic_pdf(num_pages, words_per_page=100))
+        pdf_path = f.name
+
+    processor = PDFProcessor(extract_workers=1)
+    engine = RAGEngine.__new__(RAGEngine)
+    engine.collection = RecordingCollection()
+    engine.embedding_service = NullEmbeddingService()
+    engine.lexical_index = None
+    try:
+        gc.collect()
+        tracemalloc.start()
+        # PyPDF2 keeps an index of every page object while a reader is open; that
+        # baseline is the parser's, so it is measured separately and subtracted.
+        processor.count_pages(pdf_path)
+        _, index_peak = tracemalloc.get_traced_memory()
+        gc.collect()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+
+        engine.add_document("synthetic.pdf", processor.iter_chunks(pdf_path), batch_size=BATCH_SIZE)
+
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak - current - index_peak, engine.collection.batch_sizes
+    finally:
+        os.remove(pdf_path)
+
+def test_streaming_memory_is_flat():
+    small_overhead, small_batches = measure_ingest(100)
+    large_overhead, large_batches = measure_ingest(1000)
+    print(f"100 pages: {small_overhead / 1024:.0f} KiB over parser index, {sum(small_batches)} chunks")
+    print(f"1000 pages: {large_overhead / 1024:.0f} KiB over parser index, {sum(large_batches)} chunks")
+
+    assert sum(large_batches) > 9 * sum(small_batches)
+    assert max(large_batches) <= BATCH_SIZE
+    # 10x the pages must not mean materially more memory
+    assert large_overhead < small_overhead * 1.5 + 256 * 1024
+
+if __name__ == "__main__":
+    test_streaming_memory_is_flat()
+    print("\n✅ Streaming memory check passed!")
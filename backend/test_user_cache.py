@@ -0,0 +1,66 @@
+import time
+
+from app_harness import add_user, client, headers_for, reset_database
+import auth
+from services.user_cache import UserCache
+
+def test_entries_expire_and_evict():
+    cache = UserCache(ttl_seconds=0.05, max_entries=2)
+    cache.put("a@example.com", "A")
+    cache.put("b@example.com", "B")
+    assert cache.get("a@example.com") == "A"
+
+    # b is now least recently used
+    cache.put("c@example.com", "C")
+    assert cache.get("b@example.com") is None
+    assert cache.stats()["evictions"] == 1
+
+    time.sleep(0.06)
+    assert cache.get("a@example.com") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_disabled_cache_stores_nothing():
+    cache = UserCache(ttl_seconds=0, max_entries=10)
+    cache.put("a@example.com", "A")
+    assert cache.get("a@example.com") is None
+
+def test_requests_reuse_the_cached_user():
+    reset_database()
+    user = add_user("reader@example.com")
+
+    for _ in range(3):
+        assert client.get("/api/documents", headers=headers_for(user)).status_code == 200
+
+    stats = auth.user_cache.stats()
+    assert (stats["misses"], stats["hits"]) == (1, 2)
+
+def test_status_change_invalidates_the_cached_user():
+    reset_database()
+    admin = add_user("admin@example.com", is_admin=True)
+    user = add_user("reader@example.com")
+    client.get("/api/documents", headers=headers_for(user))
+    assert auth.user_cache.get(user.email).is_active == 1
+
+    response = client.patch(f"/api/admin/users/{user.id}/status", headers=headers_for(admin))
+
+    assert response.json()["is_active"] is False
+    assert auth.user_cache.get(user.email) is None
+    # The next request loads the user as they are now
+    client.get("/api/documents", headers=headers_for(user))
+    assert auth.user_cache.get(user.email).is_active == 0
+
+def test_unknown_subject_is_rejected_and_not_cached():
+    reset_database()
+    user = add_user("reader@example.com")
+    reset_database()
+
+    assert client.get("/api/documents", headers=headers_for(user)).status_code == 401
+    assert auth.user_cache.stats()["entries"] == 0
+
+if __name__ == "__main__":
+    test_entries_expire_and_evict()
+    test_disabled_cache_stores_nothing()
+    test_requests_reuse_the_cached_user()
+    test_status_change_invalidates_the_cached_user()
+    test_unknown_subject_is_rejected_and_not_cached()
+    print("\n✅ User cache checks passed!")
@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import sys
 import os
@@ -7,46 +8,98 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent / "backend"))
 
 try:
-    from services.pdf_processor import PDFProcessor
     from services.rag_engine import RAGEngine
-    from fastapi import UploadFile
 except ImportError as e:
     print(f"Error importing modules: {e}")
     print("Please ensure you are in the project root and have installed dependencies.")
     sys.exit(1)
 
-async def main():
+# Seeded by the API on startup
+DEFAULT_USER_EMAIL = "admin@deepdoc.ai"
+
+def find_user(email: str):
+    from database import SessionLocal
+    import models
+
+    db = SessionLocal()
+    try:
+        return db.query(models.User).filter(models.User.email == email).first()
+    finally:
+        db.close()
+
+def ingestion_rag_engine():
+    """
+    A RAGEngine that indexes as the API does: cached embeddings and, with
+    hybrid search, the lexical index.
+    """
+    from config import settings
+    from services.embedding_cache import EmbeddingCache
+    from services.embedding_service import EmbeddingService
+    from services.lexical_index import LexicalIndex
+
+    return RAGEngine(
+        EmbeddingService(cache=EmbeddingCache()),
+        lexical_index=LexicalIndex() if settings.HYBRID_SEARCH_ENABLED else None
+    )
+
+def index_pdfs(rag, user_id: int, paths: list):
+    """
+    Indexes PDFs for a user through BulkIngester, so they get document rows
+    and chunk sets as uploads do, show up in the app and are reclaimed by gc
+    once deleted. Returns the chat scope covering them.
+    """
+    from database import SessionLocal
+    import models
+    from services import document_store
+    from services.bulk_ingest import BulkIngester, Checkpoint
+
+    print(f"\nTraining on {len(paths)} PDF(s)...")
+    # Nothing to resume in an interactive session
+    checkpoint = Checkpoint(os.devnull)
+    report = BulkIngester(SessionLocal, rag, user_id).run(paths, checkpoint)
+    for path, error in report["failures"]:
+        print(f"Skipped {path}: {error}")
+
+    document_ids = [record["document_id"] for record in checkpoint.done.values() if record.get("document_id")]
+    db = SessionLocal()
+    try:
+        rows = db.query(models.Document.chunk_set_id, models.Document.vector_collection).filter(
+            models.Document.id.in_(document_ids),
+            models.Document.status == models.DocumentStatus.READY
+        ).all()
+    finally:
+        db.close()
+
+    minutes = report["seconds"] / 60
+    print(f"Index complete! Extracted {report['chunks']} chunks from {report['indexed']} PDFs "
+          f"({report['indexed'] / minutes if minutes else 0:.1f} docs/min); "
+          f"linked {report['duplicates']} duplicates of already indexed PDFs.")
+    return document_store.chat_scope(rows)
+
+async def chat(args):
     print("=== AI-Powered PDF Chatbot CLI ===")
-    
+
+    user_email = getattr(args, "user_email", DEFAULT_USER_EMAIL)
+    user = find_user(user_email)
+    if not user:
+        print(f"Error: no user with email {user_email}. Start the API once to seed the admin, or pass --user-email.")
+        return
+
     # Initialize services
-    processor = PDFProcessor()
-    rag = RAGEngine()
+    from services.bulk_ingest import find_pdfs
+    rag = ingestion_rag_engine()
 
     # Step 1: Upload (Train)
-    pdf_path = input("\nEnter the path to your PDF file: ").strip()
+    pdf_path = input("\nEnter the path to your PDF file or a folder of PDFs: ").strip()
     if not os.path.exists(pdf_path):
         print("Error: File not found.")
         return
 
-    print(f"\nTraining on {os.path.basename(pdf_path)}...")
-    
-    # Simulate FastAPI UploadFile
-    with open(pdf_path, "rb") as f:
-        # Simple wrapper to mimic UploadFile
-        class MockFile:
-            def __init__(self, name, content):
-                self.filename = name
-                self.content = content
-                self.content_type = "application/pdf"
-            async def read(self):
-                return self.content
-        
-        mock_file = MockFile(os.path.basename(pdf_path), f.read())
-        result = await processor.process_pdf(mock_file)
-        
-        # Index in ChromaDB
-        rag.add_document(result["filename"], result["chunks"])
-        print(f"Index complete! Extracted {len(result['chunks'])} chunks.")
+    paths = find_pdfs(pdf_path) if os.path.isdir(pdf_path) else [os.path.abspath(pdf_path)]
+    scope = index_pdfs(rag, user.id, paths)
+    if not any(scope.values()):
+        print("Error: nothing could be indexed.")
+        return
 
     # Step 2: Chat
     print("\nYou can now ask questions about the PDF (type 'exit' to quit).")
@@ -57,7 +110,7 @@ async def main():
         
         print("Thinking...")
         try:
-            response = rag.query(question)
+            response = rag.query(question, scope=scope)
             print(f"\nAnswer: {response['answer']}")
             print("-" * 20)
             print("Sources (Pages):", ", ".join(set(str(m['page']) for m in response['sources'])))
@@ -65,5 +118,177 @@ async def main():
             print(f"Error querying Groq: {e}")
             print("Hint: Make sure your GROQ_API_KEY is correct in .env")
 
+def gc(args):
+    """
+    Purges vectors whose documents no longer exist in MySQL.
+    """
+    from config import settings
+    from database import SessionLocal
+    from services.lexical_index import LexicalIndex
+    from services.vector_gc import collect_garbage, collect_lexical_garbage
+
+    rag = RAGEngine()
+    db = SessionLocal()
+    try:
+        if settings.HYBRID_SEARCH_ENABLED:
+            report = collect_lexical_garbage(db, LexicalIndex(), dry_run=args.dry_run)
+            if args.dry_run:
+                print(f"[lexical index] Would drop {report['chunk_sets']} orphaned chunk sets.")
+            else:
+                print(f"[lexical index] Dropped {report['chunk_sets']} orphaned chunk sets ({report['chunks']} chunks).")
+        for name in rag.router.names():
+            collection = rag.get_collection(name)
+            before = collection.count()
+            report = collect_garbage(db, collection, batch_size=args.batch_size, dry_run=args.dry_run)
+
+            verb = "Would reclaim" if args.dry_run else "Reclaimed"
+            print(f"[{name}] Scanned {report['scanned']} of {before} vectors.")
+            print(f"[{name}] {verb} {report['orphaned']} orphaned vectors "
+                  f"(~{report['bytes_reclaimed'] / (1024 * 1024):.1f} MiB).")
+            if report["unattributed"]:
+                print(f"[{name}] Skipped {report['unattributed']} vectors with no chunk_set or document_id.")
+    finally:
+        db.close()
+
+def migrate_metadata(args):
+    """
+    Backfills chunk_set, document_id, user_id and folder_id on indexed vectors.
+    """
+    from database import SessionLocal
+    from services.vector_migration import backfill_metadata
+
+    rag = RAGEngine()
+    db = SessionLocal()
+    try:
+        for name in rag.router.names():
+            report = backfill_metadata(db, rag.get_collection(name), batch_size=args.batch_size, dry_run=args.dry_run)
+
+            verb = "Would update" if args.dry_run else "Updated"
+            print(f"[{name}] Scanned {report['scanned']} vectors, {report['already_current']} already current.")
+            print(f"[{name}] {verb} {report['updated']} vectors and assigned chunk sets "
+                  f"to {report['documents_assigned']} documents.")
+            if report["unmatched"]:
+                print(f"[{name}] Skipped {report['unmatched']} vectors with no matching document (run `gc` to purge them).")
+            if report["ambiguous"]:
+                print(f"[{name}] Skipped {report['ambiguous']} vectors whose filename matches documents of several users.")
+    finally:
+        db.close()
+
+def reshard(args):
+    """
+    Moves existing vectors into the collections chosen by VECTOR_SHARDING.
+    """
+    from database import SessionLocal
+    from services.vector_migration import redistribute
+
+    rag = RAGEngine()
+    db = SessionLocal()
+    try:
+        report = redistribute(db, rag, batch_size=args.batch_size, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"Routing strategy: {rag.router.strategy}")
+    print(f"{verb} {report['chunk_sets_moved']} of {report['chunk_sets']} chunk sets "
+          f"({report['vectors_moved']} vectors) into {len(report['collections'])} collections.")
+    if report["collections_dropped"]:
+        print(f"Dropped {report['collections_dropped']} collections left empty.")
+    if report["skipped_unmigrated"]:
+        print(f"Skipped {report['skipped_unmigrated']} documents without a chunk set (run `migrate-metadata` first).")
+
+def ingest(args):
+    """
+    Indexes every PDF under a directory for one user, without the API.
+    """
+    from database import SessionLocal
+    from services.bulk_ingest import BulkIngester, Checkpoint, find_pdfs
+
+    user = find_user(args.user_email)
+    if not user:
+        print(f"Error: no user with email {args.user_email}.")
+        sys.exit(1)
+
+    directory = os.path.abspath(args.directory)
+    paths = find_pdfs(directory)
+    checkpoint = Checkpoint(args.checkpoint)
+    rag = ingestion_rag_engine()
+    ingester = BulkIngester(
+        SessionLocal, rag, user.id, folder_id=args.folder_id,
+        parse_workers=args.workers, concurrent_documents=args.concurrent_documents
+    )
+    print(f"Found {len(paths)} PDFs in {directory}; {sum(checkpoint.is_finished(path) for path in paths)} "
+          f"already done according to {checkpoint.path}.")
+
+    def throughput(report):
+        seconds = report["seconds"] or 1e-9
+        return f"{report['pages'] / seconds:.1f} pages/s, {report['chunks'] / seconds:.1f} chunks/s"
+
+    def show_progress(report):
+        finished = report["indexed"] + report["duplicates"] + report["failed"]
+        print(f"[{finished}/{report['files'] - report['skipped']}] {report['pages']} pages, "
+              f"{report['chunks']} chunks, {throughput(report)}")
+
+    report = ingester.run(paths, checkpoint, on_progress=show_progress)
+
+    print(f"\nIndexed {report['indexed']} PDFs ({report['pages']} pages, {report['chunks']} chunks) "
+          f"in {report['seconds']:.1f}s: {throughput(report)}.")
+    print(f"Linked {report['duplicates']} duplicates of already indexed PDFs; "
+          f"skipped {report['skipped']} finished in an earlier run.")
+    if report["failures"]:
+        print(f"Failed {report['failed']} PDFs:")
+        for path, error in report["failures"]:
+            print(f"  {path}: {error}")
+
+def main():
+    from config import settings
+
+    parser = argparse.ArgumentParser(description="AI-Powered PDF Chatbot CLI")
+    commands = parser.add_subparsers(dest="command")
+    chat_parser = commands.add_parser("chat", help="Index a PDF or a folder of PDFs and chat with it interactively (default)")
+    chat_parser.add_argument("--user-email", default=DEFAULT_USER_EMAIL,
+                             help="Owner of the indexed documents (default: the seeded admin)")
+
+    gc_parser = commands.add_parser("gc", help="Delete vectors of documents that no longer exist")
+    gc_parser.add_argument("--batch-size", type=int, default=1000)
+    gc_parser.add_argument("--dry-run", action="store_true", help="Report orphans without deleting them")
+
+    migrate_parser = commands.add_parser(
+        "migrate-metadata", help="Tag existing vectors with the ids used for scoped retrieval"
+    )
+    migrate_parser.add_argument("--batch-size", type=int, default=1000)
+    migrate_parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+
+    reshard_parser = commands.add_parser(
+        "reshard", help="Redistribute vectors into the collections chosen by VECTOR_SHARDING"
+    )
+    reshard_parser.add_argument("--batch-size", type=int, default=1000)
+    reshard_parser.add_argument("--dry-run", action="store_true", help="Report moves without copying vectors")
+
+    ingest_parser = commands.add_parser(
+        "ingest", help="Index every PDF under a directory for a user, resuming from a checkpoint"
+    )
+    ingest_parser.add_argument("directory")
+    ingest_parser.add_argument("--user-email", required=True, help="Owner of the new documents")
+    ingest_parser.add_argument("--folder-id", type=int, default=None)
+    ingest_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                               help="Processes parsing PDFs")
+    ingest_parser.add_argument("--concurrent-documents", type=int, default=settings.INGEST_CONCURRENT_DOCUMENTS,
+                               help="PDFs embedded and written at once (default: INGEST_CONCURRENT_DOCUMENTS)")
+    ingest_parser.add_argument("--checkpoint", default="ingest-checkpoint.jsonl",
+                               help="Progress file; re-running with it skips PDFs already indexed and retries failed ones")
+
+    args = parser.parse_args()
+    if args.command == "gc":
+        gc(args)
+    elif args.command == "migrate-metadata":
+        migrate_metadata(args)
+    elif args.command == "reshard":
+        reshard(args)
+    elif args.command == "ingest":
+        ingest(args)
+    else:
+        asyncio.run(chat(args))
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -11,6 +11,11 @@ import AdminDashboard from './pages/AdminDashboard';
 import { useAuth } from './context/AuthContext';
 import { Shield } from 'lucide-react';
 
+// Matches the server's UPLOAD_BATCH_MAX_FILES default
+const UPLOAD_BATCH_SIZE = 50;
+// How often the document list is refreshed while uploads are being indexed
+const STATUS_POLL_MS = 2000;
+
 const ProtectedRoute = ({ children }) => {
   const { user, loading } = useAuth();
   if (loading) return (
@@ -40,7 +45,10 @@ const Dashboard = () => {
   const [folders, setFolders] = useState([]);
   const [selectedDoc, setSelectedDoc] = useState(null);
   const [selectedFolder, setSelectedFolder] = useState(null);
+  // A single upload to open in chat once the server has indexed it
+  const [awaitingDocId, setAwaitingDocId] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [historyCursor, setHistoryCursor] = useState(null);
   const [input, setInput] = useState('');
   const [newFolderName, setNewFolderName] = useState('');
   const [showFolderModal, setShowFolderModal] = useState(false);
@@ -49,12 +57,14 @@ const Dashboard = () => {
     chatting: false,
     fetchingDocs: false,
     fetchingHistory: false,
+    fetchingOlder: false,
     creatingFolder: false
   });
   const [uploadProgress, setUploadProgress] = useState({ current: 0, total: 0 });
   const [error, setError] = useState(null);
   const fileInputRef = useRef(null);
   const messagesEndRef = useRef(null);
+  const keepScrollRef = useRef(false);
 
   useEffect(() => {
     fetchDocuments();
@@ -76,6 +86,30 @@ const Dashboard = () => {
   }, [selectedFolder, activeTab]);
 
   useEffect(() => {
+    // Uploads are indexed in the background; refresh until none is still PROCESSING
+    if (!documents.some(doc => doc.status === 'PROCESSING')) return;
+    const timer = setTimeout(fetchDocuments, STATUS_POLL_MS);
+    return () => clearTimeout(timer);
+  }, [documents]);
+
+  useEffect(() => {
+    const doc = awaitingDocId && documents.find(d => d.id === awaitingDocId);
+    if (!doc || doc.status === 'PROCESSING') return;
+    setAwaitingDocId(null);
+    if (doc.status === 'READY') {
+      setSelectedDoc(doc);
+      setActiveTab('chat');
+    } else {
+      setError(`${doc.filename} could not be indexed${doc.error_message ? `: ${doc.error_message}` : ''}`);
+    }
+  }, [documents, awaitingDocId]);
+
+  useEffect(() => {
+    // Older messages go above the ones being read, so stay put
+    if (keepScrollRef.current) {
+      keepScrollRef.current = false;
+      return;
+    }
     scrollToBottom();
   }, [messages]);
 
@@ -83,6 +117,9 @@ const Dashboard = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   };
 
+  // The server answers 400 for a document that is not indexed yet
+  const selectedDocIndexing = !selectedFolder && !!selectedDoc && selectedDoc.status !== 'READY';
+
   const fetchDocuments = async () => {
     setLoading(prev => ({ ...prev, fetchingDocs: true }));
     try {
@@ -91,6 +128,11 @@ const Dashboard = () => {
       if (res.data && res.data.length > 0 && !selectedDoc && !selectedFolder) {
         setSelectedDoc(res.data[0]);
       }
+      // Pick up the selected document's status without reloading its chat on every refresh
+      setSelectedDoc(prev => {
+        const fresh = prev && res.data.find(doc => doc.id === prev.id);
+        return fresh && fresh.status !== prev.status ? fresh : prev;
+      });
     } catch (err) {
       console.error("Fetch documents failed:", err.response || err);
       setError("Failed to fetch documents");
@@ -126,9 +168,11 @@ const Dashboard = () => {
 
   const loadChatHistory = async (id, isFolder) => {
     setLoading(prev => ({ ...prev, fetchingHistory: true }));
+    setHistoryCursor(null);
     try {
       const res = await chatApi.getHistory(id, isFolder);
-      setMessages(res.data);
+      setMessages(res.data.messages);
+      setHistoryCursor(res.data.next_cursor);
     } catch (err) {
       console.error("Load history failed:", err.response || err);
     } finally {
@@ -136,6 +180,23 @@ const Dashboard = () => {
     }
   };
 
+  const loadOlderMessages = async () => {
+    const isFolder = !!selectedFolder;
+    const id = isFolder ? selectedFolder.id : selectedDoc?.id;
+    if (!id || !historyCursor) return;
+    setLoading(prev => ({ ...prev, fetchingOlder: true }));
+    try {
+      const res = await chatApi.getHistory(id, isFolder, historyCursor);
+      keepScrollRef.current = true;
+      setMessages(prev => [...res.data.messages, ...prev]);
+      setHistoryCursor(res.data.next_cursor);
+    } catch (err) {
+      console.error("Load older messages failed:", err.response || err);
+    } finally {
+      setLoading(prev => ({ ...prev, fetchingOlder: false }));
+    }
+  };
+
   const handleFileUpload = async (event) => {
     const files = Array.from(event.target.files);
     if (!files.length) return;
@@ -144,15 +205,24 @@ const Dashboard = () => {
     setUploadProgress({ current: 0, total: files.length });
     setError(null);
     try {
-      let count = 0;
-      for (const file of files) {
-        const res = await documentApi.upload(file, selectedFolder?.id);
-        count++;
-        setUploadProgress({ current: count, total: files.length });
-        // Only switch view if it's the last file and we are currently not in a folder chat
+      if (files.length === 1) {
+        const res = await documentApi.upload(files[0], selectedFolder?.id);
+        setUploadProgress({ current: 1, total: 1 });
         if (!selectedFolder) {
-          setSelectedDoc(res.data);
-          setActiveTab('chat');
+          // The upload comes back PROCESSING; chat opens once it is READY
+          setAwaitingDocId(res.data.id);
+        }
+      } else {
+        // Send the files in batches so the server indexes them together
+        const rejected = [];
+        for (let start = 0; start < files.length; start += UPLOAD_BATCH_SIZE) {
+          const batch = files.slice(start, start + UPLOAD_BATCH_SIZE);
+          const res = await documentApi.uploadBatch(batch, selectedFolder?.id);
+          rejected.push(...res.data.documents.filter(doc => doc.status === 'rejected'));
+          setUploadProgress({ current: start + batch.length, total: files.length });
+        }
+        if (rejected.length) {
+          setError(`${rejected.length} file(s) were not uploaded: ${rejected.map(doc => `${doc.filename} (${doc.error})`).join(', ')}`);
         }
       }
       await fetchDocuments();
@@ -166,7 +236,7 @@ const Dashboard = () => {
 
   const handleSendMessage = async (e) => {
     e.preventDefault();
-    if (!input.trim() || (!selectedDoc && !selectedFolder) || loading.chatting) return;
+    if (!input.trim() || (!selectedDoc && !selectedFolder) || loading.chatting || selectedDocIndexing) return;
 
     const userMsg = { role: 'USER', content: input };
     setMessages(prev => [...prev, userMsg]);
@@ -174,11 +244,23 @@ const Dashboard = () => {
     setLoading(prev => ({ ...prev, chatting: true }));
 
     try {
-      const res = await chatApi.ask(input, {
+      let streamError = null;
+      await chatApi.stream(input, {
         documentId: selectedDoc?.id,
         folderId: selectedFolder?.id
+      }, (event, data) => {
+        if (event === 'token') {
+          // The first token opens the assistant message; later ones extend it
+          setMessages(prev => {
+            const last = prev[prev.length - 1];
+            if (last?.role !== 'ASSISTANT') return [...prev, { role: 'ASSISTANT', content: data.text }];
+            return [...prev.slice(0, -1), { ...last, content: last.content + data.text }];
+          });
+        } else if (event === 'error') {
+          streamError = data.message;
+        }
       });
-      setMessages(prev => [...prev, { role: 'ASSISTANT', content: res.data.answer }]);
+      if (streamError) setError(streamError);
     } catch (err) {
       console.error("Ask query failed:", err.response || err);
       setError("Failed to get response");
@@ -419,6 +501,18 @@ const Dashboard = () => {
                   </div>
                 ) : (
                   <div className="max-w-4xl mx-auto space-y-8 pb-32">
+                    {historyCursor && (
+                      <div className="flex justify-center">
+                        <button
+                          onClick={loadOlderMessages}
+                          disabled={loading.fetchingOlder}
+                          className="flex items-center gap-2 text-xs font-bold text-slate-500 hover:text-primary-600 uppercase tracking-widest px-4 py-2 rounded-xl hover:bg-white transition-all disabled:opacity-50"
+                        >
+                          {loading.fetchingOlder && <Loader2 className="animate-spin" size={14} />}
+                          Load earlier messages
+                        </button>
+                      </div>
+                    )}
                     {messages.map((msg, idx) => (
                       <div key={idx} className={`flex ${msg.role?.toUpperCase() === 'USER' ? 'justify-end' : 'justify-start'} animate-in fade-in slide-in-from-bottom-2 duration-300`}>
                         <div className={`max-w-[85%] rounded-3xl px-6 py-4 shadow-sm ${msg.role?.toUpperCase() === 'USER'
@@ -456,7 +550,7 @@ const Dashboard = () => {
                         </div>
                       </div>
                     )}
-                    {loading.chatting && (
+                    {loading.chatting && messages[messages.length - 1]?.role !== 'ASSISTANT' && (
                       <div className="flex justify-start animate-in fade-in duration-300">
                         <div className="bg-white border border-slate-200 rounded-3xl rounded-tl-none px-6 py-4 shadow-sm flex items-center gap-3">
                           <Loader2 className="animate-spin text-primary-500" size={18} />
@@ -480,12 +574,15 @@ const Dashboard = () => {
                       type="text"
                       value={input}
                       onChange={(e) => setInput(e.target.value)}
-                      placeholder={`Ask about ${selectedFolder ? selectedFolder.name : (selectedDoc?.filename || 'document')}...`}
+                      disabled={selectedDocIndexing}
+                      placeholder={selectedDocIndexing
+                        ? `${selectedDoc.filename} ${selectedDoc.status === 'FAILED' ? 'could not be indexed' : 'is still being indexed...'}`
+                        : `Ask about ${selectedFolder ? selectedFolder.name : (selectedDoc?.filename || 'document')}...`}
                       className="flex-1 px-4 py-3 outline-none text-slate-800 font-medium placeholder:text-slate-400"
                     />
                     <button
                       type="submit"
-                      disabled={!input.trim() || loading.chatting}
+                      disabled={!input.trim() || loading.chatting || selectedDocIndexing}
                       className="w-12 h-12 bg-slate-900 hover:bg-black disabled:bg-slate-200 text-white rounded-xl flex items-center justify-center transition-all shadow-lg active:scale-95"
                     >
                       <Send size={20} />
@@ -4,28 +4,59 @@ import api from '../services/api';
 import { Users, Upload, Shield, Search, UserPlus, Loader2, CheckCircle2, AlertCircle, ChevronRight, FileText } from 'lucide-react';
 import { Link } from 'react-router-dom';
 
+// The listings are paged by the server; "Load more" follows next_cursor
+const EMPTY_PAGE = { items: [], nextCursor: null, total: 0 };
+
 const AdminDashboard = () => {
     const [users, setUsers] = useState([]);
-    const [allDocuments, setAllDocuments] = useState([]);
-    const [loading, setLoading] = useState({ fetch: true, upload: false, files: true });
+    const [usersPage, setUsersPage] = useState({ nextCursor: null, total: 0 });
+    const [userSearch, setUserSearch] = useState('');
+    const [documentsPage, setDocumentsPage] = useState(EMPTY_PAGE);
+    const [documentFilters, setDocumentFilters] = useState({ status: '', userId: '', from: '', to: '' });
+    const [loading, setLoading] = useState({ fetch: true, upload: false, files: true, more: false });
     const [error, setError] = useState('');
     const [success, setSuccess] = useState('');
     const [selectedUserId, setSelectedUserId] = useState('');
     const [uploadFile, setUploadFile] = useState(null);
 
     useEffect(() => {
-        fetchUsers();
+        const timer = setTimeout(() => fetchUsers(), 300);
+        return () => clearTimeout(timer);
+    }, [userSearch]);
+
+    useEffect(() => {
         fetchAllDocuments();
-    }, []);
+    }, [documentFilters]);
+
+    const documentParams = () => {
+        const params = {};
+        if (documentFilters.status) params.status = documentFilters.status;
+        if (documentFilters.userId) params.user_id = documentFilters.userId;
+        if (documentFilters.from) params.created_from = documentFilters.from;
+        if (documentFilters.to) {
+            // The server's upper bound is exclusive; include the whole chosen day
+            const end = new Date(documentFilters.to);
+            end.setDate(end.getDate() + 1);
+            params.created_to = end.toISOString().slice(0, 10);
+        }
+        return params;
+    };
 
-    const fetchAllDocuments = async () => {
+    const fetchAllDocuments = async (before = null) => {
+        setLoading(prev => ({ ...prev, [before ? 'more' : 'files']: true }));
         try {
-            const res = await api.get('/api/admin/documents');
-            setAllDocuments(res.data);
+            const params = documentParams();
+            if (before) params.before = before;
+            const res = await api.get('/api/admin/documents', { params });
+            setDocumentsPage(prev => ({
+                items: before ? [...prev.items, ...res.data.documents] : res.data.documents,
+                nextCursor: res.data.next_cursor,
+                total: before ? prev.total : res.data.total
+            }));
         } catch (err) {
             console.error("Failed to load documents", err);
         } finally {
-            setLoading(prev => ({ ...prev, files: false }));
+            setLoading(prev => ({ ...prev, [before ? 'more' : 'files']: false }));
         }
     };
 
@@ -40,10 +71,17 @@ const AdminDashboard = () => {
         }
     };
 
-    const fetchUsers = async () => {
+    const fetchUsers = async (after = null) => {
         try {
-            const res = await api.get('/api/admin/users');
-            setUsers(res.data);
+            const params = {};
+            if (userSearch) params.search = userSearch;
+            if (after) params.after = after;
+            const res = await api.get('/api/admin/users', { params });
+            setUsers(prev => after ? [...prev, ...res.data.users] : res.data.users);
+            setUsersPage(prev => ({
+                nextCursor: res.data.next_cursor,
+                total: after ? prev.total : res.data.total
+            }));
         } catch (err) {
             setError("Failed to load users");
         } finally {
@@ -101,10 +139,17 @@ const AdminDashboard = () => {
                             <div className="flex items-center gap-2">
                                 <Users className="text-primary-600" size={24} />
                                 <h2 className="text-2xl font-black text-slate-900 tracking-tight">System Users</h2>
+                                <span className="text-xs font-bold text-slate-400">{usersPage.total}</span>
                             </div>
                             <div className="bg-slate-50 border border-slate-100 px-3 py-1.5 rounded-xl flex items-center gap-2">
                                 <Search size={16} className="text-slate-400" />
-                                <input type="text" placeholder="Search accounts..." className="bg-transparent text-sm outline-none font-medium w-40" />
+                                <input
+                                    type="text"
+                                    placeholder="Search by email..."
+                                    value={userSearch}
+                                    onChange={(e) => setUserSearch(e.target.value)}
+                                    className="bg-transparent text-sm outline-none font-medium w-40"
+                                />
                             </div>
                         </div>
 
@@ -150,6 +195,14 @@ const AdminDashboard = () => {
                                         ))}
                                     </tbody>
                                 </table>
+                                {usersPage.nextCursor && (
+                                    <button
+                                        onClick={() => fetchUsers(usersPage.nextCursor)}
+                                        className="w-full mt-4 py-3 text-xs font-black uppercase tracking-widest text-slate-400 hover:text-primary-600 hover:bg-slate-50 rounded-2xl transition-all"
+                                    >
+                                        Load more users ({users.length} of {usersPage.total})
+                                    </button>
+                                )}
                             </div>
                         )}
                     </div>
@@ -237,10 +290,41 @@ const AdminDashboard = () => {
                         <div className="flex items-center gap-2">
                             <FileText className="text-orange-600" size={24} />
                             <h2 className="text-2xl font-black text-slate-900 tracking-tight">System Global Files</h2>
+                            <span className="text-xs font-bold text-slate-400">{documentsPage.total}</span>
                         </div>
-                        <div className="bg-slate-50 border border-slate-100 px-3 py-1.5 rounded-xl flex items-center gap-2">
-                            <Search size={16} className="text-slate-400" />
-                            <input type="text" placeholder="Filter files..." className="bg-transparent text-sm outline-none font-medium w-40" />
+                        <div className="flex items-center gap-2 text-sm font-medium">
+                            <select
+                                value={documentFilters.status}
+                                onChange={(e) => setDocumentFilters(prev => ({ ...prev, status: e.target.value }))}
+                                className="bg-slate-50 border border-slate-100 px-3 py-1.5 rounded-xl outline-none"
+                            >
+                                <option value="">All statuses</option>
+                                <option value="PROCESSING">Processing</option>
+                                <option value="READY">Ready</option>
+                                <option value="FAILED">Failed</option>
+                            </select>
+                            <select
+                                value={documentFilters.userId}
+                                onChange={(e) => setDocumentFilters(prev => ({ ...prev, userId: e.target.value }))}
+                                className="bg-slate-50 border border-slate-100 px-3 py-1.5 rounded-xl outline-none max-w-[12rem]"
+                            >
+                                <option value="">All owners</option>
+                                {users.map(u => (
+                                    <option key={u.id} value={u.id}>{u.email}</option>
+                                ))}
+                            </select>
+                            <input
+                                type="date"
+                                value={documentFilters.from}
+                                onChange={(e) => setDocumentFilters(prev => ({ ...prev, from: e.target.value }))}
+                                className="bg-slate-50 border border-slate-100 px-3 py-1.5 rounded-xl outline-none"
+                            />
+                            <input
+                                type="date"
+                                value={documentFilters.to}
+                                onChange={(e) => setDocumentFilters(prev => ({ ...prev, to: e.target.value }))}
+                                className="bg-slate-50 border border-slate-100 px-3 py-1.5 rounded-xl outline-none"
+                            />
                         </div>
                     </div>
 
@@ -262,7 +346,7 @@ const AdminDashboard = () => {
                                     </tr>
                                 </thead>
                                 <tbody className="divide-y divide-slate-50">
-                                    {allDocuments.map(doc => (
+                                    {documentsPage.items.map(doc => (
                                         <tr key={doc.id} className="group hover:bg-slate-50 transition-colors">
                                             <td className="py-4 pl-2 font-black text-slate-900 flex items-center gap-2">
                                                 <div className="w-8 h-8 bg-slate-50 rounded-lg flex items-center justify-center text-slate-400">
@@ -288,7 +372,7 @@ const AdminDashboard = () => {
                                             <td className="py-4 text-slate-300 font-mono text-xs">#{doc.id}</td>
                                         </tr>
                                     ))}
-                                    {allDocuments.length === 0 && (
+                                    {documentsPage.items.length === 0 && (
                                         <tr>
                                             <td colSpan="5" className="py-20 text-center text-slate-400 font-bold uppercase tracking-widest grayscale opacity-30">
                                                 No documents found in ecosystem
@@ -297,6 +381,16 @@ const AdminDashboard = () => {
                                     )}
                                 </tbody>
                             </table>
+                            {documentsPage.nextCursor && (
+                                <button
+                                    onClick={() => fetchAllDocuments(documentsPage.nextCursor)}
+                                    disabled={loading.more}
+                                    className="w-full mt-4 py-3 text-xs font-black uppercase tracking-widest text-slate-400 hover:text-primary-600 hover:bg-slate-50 rounded-2xl transition-all flex items-center justify-center gap-2 disabled:opacity-50"
+                                >
+                                    {loading.more && <Loader2 className="animate-spin" size={14} />}
+                                    Load more files ({documentsPage.items.length} of {documentsPage.total})
+                                </button>
+                            )}
                         </div>
                     )}
                 </div>
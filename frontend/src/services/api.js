@@ -43,6 +43,15 @@ export const documentApi = {
             headers: { 'Content-Type': 'multipart/form-data' },
         });
     },
+    // Many PDFs in one request; the response lists a document id or an error per file
+    uploadBatch: (files, folderId = null) => {
+        const formData = new FormData();
+        files.forEach(file => formData.append('files', file));
+        const url = folderId ? `/api/documents/upload-batch?folder_id=${folderId}` : '/api/documents/upload-batch';
+        return api.post(url, formData, {
+            headers: { 'Content-Type': 'multipart/form-data' },
+        });
+    },
     list: () => api.get('/api/documents'),
     delete: (id) => api.delete(`/api/documents/${id}`),
 };
@@ -54,8 +63,55 @@ export const chatApi = {
         if (folderId) payload.folder_id = folderId;
         return api.post('/api/chat/ask', payload);
     },
-    getHistory: (id, isFolder = false) =>
-        api.get(`/api/chat/history/${id}${isFolder ? '?is_folder=true' : ''}`),
+    // Streams the answer over Server-Sent Events, calling onEvent(event, data)
+    // for the sources, token, done and error events
+    stream: async (question, { documentId = null, folderId = null }, onEvent) => {
+        const payload = { question };
+        if (documentId) payload.document_id = documentId;
+        if (folderId) payload.folder_id = folderId;
+
+        const token = localStorage.getItem('token');
+        const response = await fetch(`${api.defaults.baseURL}/api/chat/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                ...(token ? { Authorization: `Bearer ${token}` } : {}),
+            },
+            body: JSON.stringify(payload),
+        });
+        if (!response.ok) {
+            throw new Error(`Chat stream failed with status ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                for (const line of block.split('\n')) {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                }
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    },
+    // Newest page of messages; pass the response's next_cursor as `before` for older ones
+    getHistory: (id, isFolder = false, before = null) => {
+        const params = {};
+        if (isFolder) params.is_folder = true;
+        if (before) params.before = before;
+        return api.get(`/api/chat/history/${id}`, { params });
+    },
 };
 
 export default api;